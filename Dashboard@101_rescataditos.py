@@ -8,13 +8,22 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import folium
-from streamlit_folium import folium_static
+from folium.plugins import MarkerCluster, MeasureControl, MiniMap
 from streamlit.components.v1 import html
-import calendar
-import json
 import re
 from datetime import datetime, timedelta
-from utils.data_loader import cargar_datos
+from utils.refresco import obtener_datos
+from utils.esquema import COLUMNAS_PERIODO, a_pesos, agregar_columnas_periodo
+from utils.colores import color_principal, composicion, tabla_porcentajes
+from utils.ubicaciones import obtener_nomenclador
+from utils.agregados import CuboMetricas
+from utils.balance import balance_mensual
+from utils.periodos import nombre_mes, opciones_meses
+from utils.comparacion import MESES_TENDENCIA, comparar, variacion, ventana_desde_filtros
+from utils.memo import clave_filtros, obtener_cache_vistas
+from utils.figuras import clave_vista, figura_en_cache
+from utils.mapas import DensidadRescates, coleccion_puntos, conteo_ubicaciones, mapa_en_cache
+from utils.indice_temporal import esta_ordenado, filas_año, filas_fechas, filas_mes, filas_periodos, ordenar_por_fecha
 import os
 
 # ------------------------------------
@@ -411,7 +420,7 @@ def aplicar_estilo_general():
     }
     </style>
     """, unsafe_allow_html=True)
-def crear_tarjeta_metrica(titulo, valor, icono, tendencia=None, tendencia_valor=None, color="#3498db"):
+def crear_tarjeta_metrica(titulo, valor, icono, tendencia=None, tendencia_valor=None, color="#3498db", tendencia_detalle=None):
     """
     Crea una tarjeta de métrica con estilo mejorado, incluyendo ícono y tendencia.
     
@@ -422,6 +431,7 @@ def crear_tarjeta_metrica(titulo, valor, icono, tendencia=None, tendencia_valor=
         tendencia (str, opcional): Dirección de la tendencia ('up', 'down', 'neutral')
         tendencia_valor (str, opcional): Valor de la tendencia (ej: '12%')
         color (str, opcional): Color principal de la tarjeta
+        tendencia_detalle (str, opcional): Otras comparaciones, se muestran al pasar el mouse
     
     Returns:
         str: HTML de la tarjeta de métrica
@@ -441,7 +451,8 @@ def crear_tarjeta_metrica(titulo, valor, icono, tendencia=None, tendencia_valor=
             tendencia_clase = "metric-trend-neutral"
             tendencia_simbolo = "→"
             
-        tendencia_html = f'<div class="metric-trend {tendencia_clase}">{tendencia_simbolo} {tendencia_valor}</div>'
+        titulo_tendencia = f' title="{tendencia_detalle}"' if tendencia_detalle else ""
+        tendencia_html = f'<div class="metric-trend {tendencia_clase}"{titulo_tendencia}>{tendencia_simbolo} {tendencia_valor}</div>'
     
     # Crear la tarjeta HTML
     html = f"""
@@ -506,158 +517,174 @@ def procesar_datos_mascotas(df):
         
     Returns:
         pd.DataFrame: DataFrame procesado
+
+    Raises:
+        Exception: Si los datos no se pueden procesar (el llamador decide qué mostrar)
     """
-    try:
-        if df.empty:
-            return df
-            
-        # Crear una copia para no modificar el original
-        df = df.copy()
-        
-        # Normalizar nombres de columnas
-        df.columns = df.columns.str.strip().str.upper()
-        
-        # Renombrar columnas al formato final deseado
-        rename_mapping = {
-            'ID': 'ID',
-            'NOMBRE': 'Nombre',
-            'FECHA': 'Fecha',
-            'TIPO ANIMAL': 'TipoAnimal',
-            'UBICACION': 'Ubicacion',
-            'EDAD': 'Edad',
-            'COLOR DE PELO': 'ColorPelo',
-            'CONDICIÓN DE SALUD INICIAL': 'CondicionSaludInicial',
-            'ESTADO ACTUAL': 'EstadoActual',
-            'FECHA DE ADOPCION': 'FechaAdopcion',
-            'ADOPTANTE': 'Adoptante',
-            'ID_POST': 'ID_Post',
-            'URL_INSTAGRAM': 'URL_Instagram',
-            'URL_DRIVE': 'URL_Drive',
-            'MESAÑO': 'MesAño'
-        }
-        
-        # Aplicar renombrado donde las columnas existan
-        for old_col, new_col in rename_mapping.items():
-            if old_col in df.columns:
-                df = df.rename(columns={old_col: new_col})
-        
-        # Procesar fechas
-        if 'Fecha' in df.columns:
-            df['Fecha'] = pd.to_datetime(df['Fecha'],format="%d/%m/%Y %H:%M:%S", errors='coerce')
-            
-        if 'FechaAdopcion' in df.columns:
-            df['FechaAdopcion'] = pd.to_datetime(df['FechaAdopcion'],format="%d/%m/%Y", errors='coerce')
-        else:
-            # Si no existe, intentar derivarla del estado
-            df['FechaAdopcion'] = None
-            adoptados_mask = df['EstadoActual'].str.contains('Adoptado', case=False, na=False)
-            df.loc[adoptados_mask, 'FechaAdopcion'] = df.loc[adoptados_mask, 'Fecha'] + pd.Timedelta(days=30)
-        
-        # Procesar colores de pelo
-        if 'ColorPelo' in df.columns and df['ColorPelo'].dtype == object:
-            def extract_main_color(color_json):
-                try:
-                    if pd.isna(color_json) or color_json == '':
-                        return 'No especificado'
-                    
-                    # Si es un JSON como string
-                    if isinstance(color_json, str) and ('[' in color_json or '{' in color_json):
-                        colors = json.loads(color_json.replace("'", "\""))
-                        if isinstance(colors, list) and len(colors) > 0:
-                            # Tomar el color con mayor porcentaje
-                            main_color = max(colors, key=lambda x: x.get('porcentaje', 0))
-                            return main_color.get('color', 'No especificado')
-                    
-                    # Si es un string simple
-                    return color_json
-                except:
-                    return 'No especificado'
-            
-            df['ColorPrincipal'] = df['ColorPelo'].apply(extract_main_color)
-        
-        # Extraer edad si está en una ubicación diferente
-        if 'Edad' not in df.columns and 'Ubicacion' in df.columns:
-            def extract_age(location):
-                if pd.isna(location):
-                    return 'No especificado'
-                
-                age_pattern = r'(\d+)\s*(mes|meses|año|años|semanas?|días?)'
-                match = re.search(age_pattern, str(location))
-                if match:
-                    return match.group(0)
-                return 'No especificado'
-            
-            df['Edad'] = df['Ubicacion'].apply(extract_age)
+    if df.empty:
+        return df
         
-        # Asignar coordenadas aproximadas para ubicaciones
-        # Define coordenadas base para Capital Federal y GBA
-        location_coords = {
-            'villa 1 11 14': (-34.6383, -58.4344),
-            'BAJO FLORES': (-34.6415, -58.4267),
-            'CABA': (-34.6037, -58.3816),
-            'CABALLITO': (-34.6186, -58.4336),
-            'CIUDAD AUTÓNOMA DE BUENOS AIRES': (-34.6037, -58.3816),
-            'FLORES': (-34.6315, -58.4503),
-            'LUGANO': (-34.6740, -58.4745),
-            'POMPEYA': (-34.6555, -58.4097),
-            'VILLA CRESPO': (-34.5974, -58.4321),
-            'SOLDATI': (-34.6778, -58.4608),
-        }
+    # Copia sin las columnas de período de la carga: se recalculan después de
+    # renombrar (si no, quedarían duplicadas como AÑO, MES, PERIODO...)
+    df = df.drop(columns=list(COLUMNAS_PERIODO), errors='ignore')
+    
+    # Normalizar nombres de columnas
+    df.columns = df.columns.str.strip().str.upper()
+    
+    # Renombrar columnas al formato final deseado
+    rename_mapping = {
+        'ID': 'ID',
+        'NOMBRE': 'Nombre',
+        'FECHA': 'Fecha',
+        'TIPO ANIMAL': 'TipoAnimal',
+        'UBICACION': 'Ubicacion',
+        'EDAD': 'Edad',
+        'COLOR DE PELO': 'ColorPelo',
+        'CONDICIÓN DE SALUD INICIAL': 'CondicionSaludInicial',
+        'ESTADO ACTUAL': 'EstadoActual',
+        'FECHA DE ADOPCION': 'FechaAdopcion',
+        'ADOPTANTE': 'Adoptante',
+        'ID_POST': 'ID_Post',
+        'URL_INSTAGRAM': 'URL_Instagram',
+        'URL_DRIVE': 'URL_Drive'
+    }
+    
+    # Aplicar renombrado donde las columnas existan
+    for old_col, new_col in rename_mapping.items():
+        if old_col in df.columns:
+            df = df.rename(columns={old_col: new_col})
+    
+    # Procesar fechas
+    if 'Fecha' in df.columns:
+        df['Fecha'] = pd.to_datetime(df['Fecha'],format="%d/%m/%Y %H:%M:%S", errors='coerce')
         
-        # Función para determinar las coordenadas
-        def get_coordinates(location):
+    if 'FechaAdopcion' in df.columns:
+        df['FechaAdopcion'] = pd.to_datetime(df['FechaAdopcion'],format="%d/%m/%Y", errors='coerce')
+    else:
+        # Si no existe, intentar derivarla del estado
+        df['FechaAdopcion'] = None
+        adoptados_mask = df['EstadoActual'].str.contains('Adoptado', case=False, na=False)
+        df.loc[adoptados_mask, 'FechaAdopcion'] = df.loc[adoptados_mask, 'Fecha'] + pd.Timedelta(days=30)
+    
+    # Procesar colores de pelo (cada valor distinto se interpreta una vez)
+    if 'ColorPelo' in df.columns:
+        df['ColorPrincipal'] = color_principal(df['ColorPelo'])
+    
+    # Extraer edad si está en una ubicación diferente
+    if 'Edad' not in df.columns and 'Ubicacion' in df.columns:
+        def extract_age(location):
             if pd.isna(location):
-                return (-34.6037, -58.3816)  # Coordenadas por defecto (Capital)
-            
-            # Buscar coincidencias exactas primero
-            for key, coords in location_coords.items():
-                if key.lower() in str(location).lower():
-                    return coords
+                return 'No especificado'
             
-            # Si no hay coincidencia, asignar coordenadas por defecto
-            return (-34.6037, -58.3816)
-        
-        # Aplicar la función para obtener coordenadas
-        df['Coordenadas'] = df['Ubicacion'].apply(get_coordinates)
-        df['Latitud'] = df['Coordenadas'].apply(lambda x: x[0])
-        df['Longitud'] = df['Coordenadas'].apply(lambda x: x[1])
+            age_pattern = r'(\d+)\s*(mes|meses|año|años|semanas?|días?)'
+            match = re.search(age_pattern, str(location))
+            if match:
+                return match.group(0)
+            return 'No especificado'
+        
+        df['Edad'] = df['Ubicacion'].apply(extract_age)
+    
+    # Asignar coordenadas aproximadas para ubicaciones (barrios en utils/datos/barrios.csv)
+    if 'Ubicacion' in df.columns:
+        df['Latitud'], df['Longitud'] = obtener_nomenclador().coordenadas(df['Ubicacion'])
+    
+    # Asegurarse de que las columnas necesarias estén presentes
+    required_fields = ['Nombre', 'Fecha', 'TipoAnimal', 'Ubicacion', 'EstadoActual']
+    for field in required_fields:
+        if field not in df.columns:
+            if field == 'TipoAnimal' and 'TIPO ANIMAL' in df.columns:
+                df['TipoAnimal'] = df['TIPO ANIMAL']
+            elif field == 'TipoAnimal' and 'Tipo' in df.columns:
+                df['TipoAnimal'] = df['Tipo']
+            else:
+                df[field] = 'No especificado'
+    
+    # Limpiar el DataFrame
+    df = df.dropna(subset=['Fecha'])  # Eliminar filas sin fecha
+    
+    # Añadir columnas de año, mes y periodo para filtrado (con los nombres ya finales)
+    df = agregar_columnas_periodo(df)
+    
+    # Mantener el orden por Fecha para filtrar con búsqueda binaria
+    return ordenar_por_fecha(df)
+
+
+@st.cache_resource(max_entries=2)
+def obtener_mascotas_procesadas(_df, version):
+    """
+    Devuelve los datos de mascotas procesados, calculándolos una sola vez
+    por versión de la hoja "Datos" y compartiéndolos entre sesiones.
+    
+    Args:
+        _df (pd.DataFrame): Hoja "Datos" cruda (no se usa como clave)
+        version (str): Versión de la hoja, clave del cache
         
-        # Añadir columnas de año y mes para filtrado
-        df['año'] = df['Fecha'].dt.year
-        df['mes'] = df['Fecha'].dt.month
+    Returns:
+        pd.DataFrame: DataFrame procesado (solo lectura)
+    """
+    return procesar_datos_mascotas(_df)
+
+
+@st.cache_resource(max_entries=2)
+def obtener_tabla_colores(_df_mascotas, version):
+    """
+    Devuelve la composición de colores de pelo de cada mascota (un registro
+    por color, con su porcentaje), una vez por versión de la hoja "Datos".
+    
+    Args:
+        _df_mascotas (pd.DataFrame): Datos de mascotas procesados (no se usa como clave)
+        version (str): Versión de la hoja, clave del cache
         
-        # Asegurarse de que las columnas necesarias estén presentes
-        required_fields = ['Nombre', 'Fecha', 'TipoAnimal', 'Ubicacion', 'EstadoActual']
-        for field in required_fields:
-            if field not in df.columns:
-                if field == 'TipoAnimal' and 'TIPO ANIMAL' in df.columns:
-                    df['TipoAnimal'] = df['TIPO ANIMAL']
-                elif field == 'TipoAnimal' and 'Tipo' in df.columns:
-                    df['TipoAnimal'] = df['Tipo']
-                else:
-                    df[field] = 'No especificado'
+    Returns:
+        pd.DataFrame: Columnas fila, color y porcentaje (solo lectura)
+    """
+    if 'ColorPelo' not in _df_mascotas.columns:
+        return pd.DataFrame(columns=['fila', 'color', 'porcentaje'])
+    return tabla_porcentajes(_df_mascotas['ColorPelo'])
+
+
+@st.cache_resource(max_entries=2)
+def obtener_cubo_metricas(_df_mascotas, _df_gastos, _df_donaciones, version):
+    """
+    Devuelve el cubo de agregados de las métricas principales, armado una
+    sola vez por versión del conjunto de datos.
+    
+    Args:
+        _df_mascotas (pd.DataFrame): Mascotas procesadas (no se usa como clave)
+        _df_gastos (pd.DataFrame): Hoja Gastos (no se usa como clave)
+        _df_donaciones (pd.DataFrame): Hoja Transaccion donaciones (no se usa como clave)
+        version (str): Versión del conjunto de datos, clave del cache
         
-        # Limpiar el DataFrame
-        df = df.dropna(subset=['Fecha'])  # Eliminar filas sin fecha
+    Returns:
+        CuboMetricas: Cubo de solo lectura
+    """
+    return CuboMetricas.construir(_df_mascotas, _df_gastos, _df_donaciones)
+
+
+@st.cache_resource(max_entries=2)
+def obtener_densidad_rescates(_df_mascotas, version):
+    """
+    Devuelve los rescates agrupados en la rejilla hexagonal por periodo,
+    calculados una sola vez por versión del conjunto de datos.
+    
+    Args:
+        _df_mascotas (pd.DataFrame): Mascotas procesadas (no se usa como clave)
+        version (str): Versión del conjunto de datos, clave del cache
         
-        return df
-    except Exception as e:
-        st.error(f"Error al procesar datos de mascotas: {str(e)}")
-        # Devolver un DataFrame mínimo para evitar errores posteriores
-        return pd.DataFrame({
-            'Nombre': ['Error'], 
-            'Fecha': [datetime.now()],
-            'TipoAnimal': ['Error'],
-            'EstadoActual': ['Error'],
-            'año': [datetime.now().year],
-            'mes': [datetime.now().month]
-        })
+    Returns:
+        DensidadRescates: Conteos de solo lectura
+    """
+    return DensidadRescates.construir(_df_mascotas)
 
 
 def filtrar_datos(_df, filtros):
     """
     Filtra un DataFrame según los filtros aplicados, manejando correctamente "Todos".
     
+    Si el DataFrame está ordenado por Fecha (como los que entrega la carga),
+    año, mes y rango de fechas se resuelven con cortes posicionales que no
+    copian los datos; el resultado es de solo lectura.
+    
     Args:
         _df (pd.DataFrame): DataFrame a filtrar
         filtros (dict): Diccionario con filtros a aplicar
@@ -669,25 +696,38 @@ def filtrar_datos(_df, filtros):
         if _df.empty:
             return _df
             
-        # Crear una copia para no modificar el original
-        df = _df.copy()
-           # Filtrar por año si está especificado (y no es "Todos")
-        if 'año' in filtros and filtros['año'] != "Todos" and 'año' in df.columns:
-            df = df[df['año'] == filtros['año']]
-        # Filtrar por mes si está especificado (y no es "Todos")
-        if 'mes' in filtros and filtros['mes'] != "Todos" and 'mes' in df.columns:
-            # Extraer el número de mes y filtrar
-            mes_num = int(filtros['mes'].split(" - ")[0])
-            df = df[df['mes'] == mes_num]
-           
-        # Filtrar por rango de fechas solo si no se han seleccionado filtros específicos de año o mes
-        if (('año' not in filtros or filtros['año'] == "Todos") and
-            ('mes' not in filtros or filtros['mes'] == "Todos") and
-            'fecha_inicio' in filtros and 'fecha_fin' in filtros and 'Fecha' in df.columns):
-            df = df[
-                (df['Fecha'].dt.date >= filtros['fecha_inicio']) &
-                (df['Fecha'].dt.date <= filtros['fecha_fin'])
-            ]
+        df = _df
+        año = filtros.get('año', "Todos")
+        mes = filtros.get('mes', "Todos")
+        mes_num = int(mes.split(" - ")[0]) if mes != "Todos" else None
+        usar_rango = (año == "Todos" and mes_num is None and
+                      'fecha_inicio' in filtros and 'fecha_fin' in filtros)
+
+        if esta_ordenado(df):
+            # Datos ordenados por Fecha: cortes por búsqueda binaria, sin copiar
+            if año != "Todos" and mes_num is not None:
+                periodo = int(año) * 100 + mes_num
+                df = df.iloc[filas_periodos(df, periodo, periodo)]
+            elif año != "Todos":
+                df = df.iloc[filas_año(df, int(año))]
+            elif mes_num is not None:
+                df = df.iloc[filas_mes(df, mes_num)]
+            # Filtrar por rango de fechas solo si no se han seleccionado filtros específicos de año o mes
+            elif usar_rango:
+                df = df.iloc[filas_fechas(df, filtros['fecha_inicio'], filtros['fecha_fin'])]
+        else:
+            # Filtrar por año si está especificado (y no es "Todos")
+            if año != "Todos" and 'año' in df.columns:
+                df = df[df['año'] == int(año)]
+            # Filtrar por mes si está especificado (y no es "Todos")
+            if mes_num is not None and 'mes' in df.columns:
+                df = df[df['mes'] == mes_num]
+            # Filtrar por rango de fechas solo si no se han seleccionado filtros específicos de año o mes
+            if usar_rango and 'Fecha' in df.columns:
+                df = df[
+                    (df['Fecha'] >= pd.Timestamp(filtros['fecha_inicio'])) &
+                    (df['Fecha'] < pd.Timestamp(filtros['fecha_fin']) + pd.Timedelta(days=1))
+                ]
             
         # Filtro por mascota (para gastos)
         if 'mascota' in filtros and filtros['mascota'] != "Todas" and 'MASCOTA' in df.columns:
@@ -705,124 +745,73 @@ def filtrar_datos(_df, filtros):
         return _df  # Devolver el DataFrame original en caso de error
 
 
-def calcular_tendencias(df_actual, df_anterior, columna_valor):
+def obtener_vistas_filtradas(datos, df_mascotas, filtros):
     """
-    Calcula las tendencias comparando con un período anterior.
+    Devuelve los datos filtrados y sus agregados para una selección de
+    filtros, usando el cache LRU compartido (clave: filtros + versión de los
+    datos). Volver a una selección reciente no recorre los DataFrames.
     
     Args:
-        df_actual (pd.DataFrame): DataFrame del período actual
-        df_anterior (pd.DataFrame): DataFrame del período anterior
-        columna_valor (str): Nombre de la columna de valores a comparar
+        datos (ConjuntoDatos): Conjunto de datos vigente
+        df_mascotas (pd.DataFrame): Mascotas procesadas
+        filtros (dict): Filtros aplicados
         
     Returns:
-        tuple: (tendencia, porcentaje_cambio)
-            tendencia: 'up', 'down' o 'neutral'
-            porcentaje_cambio: variación porcentual
+        dict: mascotas, gastos, donaciones (filtrados), comparacion y balance
+            mensual (solo lectura)
     """
-    try:
-        if df_actual.empty or df_anterior.empty or columna_valor not in df_actual.columns:
-            return None, None
-            
-        valor_actual = df_actual[columna_valor].sum()
-        valor_anterior = df_anterior[columna_valor].sum()
-        
-        if valor_anterior == 0:
-            return 'neutral', '∞%'
-            
-        cambio = valor_actual - valor_anterior
-        porcentaje = (cambio / valor_anterior) * 100
-        
-        if abs(porcentaje) < 1:
-            return 'neutral', '0%'
-        elif porcentaje > 0:
-            return 'up', f"{porcentaje:.1f}%"
-        else:
-            return 'down', f"{abs(porcentaje):.1f}%"
-            
-    except Exception as e:
-        st.error(f"Error al calcular tendencias: {str(e)}")
-        return None, None
+    def calcular():
+        cubo = obtener_cubo_metricas(df_mascotas, datos.hojas["Gastos"],
+                                     datos.hojas["Transaccion donaciones"], datos.version)
+        vistas = {
+            'mascotas': filtrar_datos(df_mascotas, filtros),
+            'gastos': filtrar_datos(datos.hojas["Gastos"], filtros),
+            'donaciones': filtrar_datos(datos.hojas["Transaccion donaciones"], filtros),
+            'comparacion': comparar(cubo, ventana_desde_filtros(filtros, cubo)),
+        }
+        vistas['balance'] = balance_mensual(vistas['gastos'], vistas['donaciones'])
+        return vistas
+    
+    return obtener_cache_vistas().obtener(datos.version, clave_filtros(filtros), calcular)
 
 # ------------------------------------
 # COMPONENTES DE DASHBOARD
 # ------------------------------------
-def crear_seccion_metricas(df_mascotas, df_gastos, df_donaciones,df_mascotas_orig, df_gastos_orig, df_donaciones_orig, filtros):
+def crear_seccion_metricas(comparacion):
         """
         Crea la sección de métricas principales con diseño mejorado, evitando espacios en blanco.
         
         Args:
-            df_mascotas (pd.DataFrame): DataFrame de mascotas
-            df_gastos (pd.DataFrame): DataFrame de gastos
-            df_donaciones (pd.DataFrame): DataFrame de donaciones
-            filtros (dict): Filtros aplicados
+            comparacion (dict): Totales del período actual y de sus líneas de base
+                (período anterior, mismo período del año anterior y promedio de
+                los últimos meses), calculados con utils.comparacion.comparar
         """
 
-        # Calcular las métricas actuales
-        total_rescatados = len(df_mascotas)
-        total_adoptados = df_mascotas[df_mascotas['EstadoActual'] == 'Adoptado'].shape[0]
-        total_gastos = df_gastos['Monto'].sum() if 'Monto' in df_gastos.columns else 0
-        total_donaciones = df_donaciones['Monto'].sum() if 'Monto' in df_donaciones.columns else 0
-        
-        # Crear filtros para período anterior (para calcular tendencias)
-        
-        filtros_periodo_anterior = filtros.copy()
-        
-        # Estrategia para determinar período anterior basado en filtros aplicados
-       # Caso 1: Filtro por mes específico en un año específico
-        if filtros.get('mes') != "Todos" and filtros.get('año') != "Todos":
-            mes_actual = int(filtros['mes'].split(" - ")[0])  # Extraer número de mes como int
-            año_actual = int(filtros['año'])  # Convertir año a int para cálculos
-            
-            if mes_actual == 1:
-                mes_anterior = 12
-                año_anterior = año_actual - 1
-            else:
-                mes_anterior = mes_actual - 1
-                año_anterior = año_actual
-
-            filtros_periodo_anterior['mes'] =  f"{mes_anterior} - {calendar.month_name[mes_anterior]}"  # Final en INT
-            filtros_periodo_anterior['año'] = año_anterior  # Final en INT
-
-        # Caso 2: Filtro solo por año específico (mes = Todos)
-        elif filtros.get('año') != "Todos" and filtros.get('mes') == "Todos":
-            año_actual = int(filtros['año'])
-            filtros_periodo_anterior['año'] = año_actual - 1  # Final en INT
-            filtros_periodo_anterior['mes'] = "Todos"         # Mes sigue siendo string
+        actuales = comparacion['actual']
+        anteriores = comparacion['anterior'] or {}
 
-        # Caso 3: No hay filtros específicos (ambos en "Todos")
-        elif filtros.get('año') == "Todos" and filtros.get('mes') == "Todos":
-            if 'fecha_inicio' in filtros and 'fecha_fin' in filtros:
-                dias_periodo = (filtros['fecha_fin'] - filtros['fecha_inicio']).days + 1
-                filtros_periodo_anterior['fecha_fin'] = filtros['fecha_fin'] - timedelta(days=1)
-                filtros_periodo_anterior['fecha_inicio'] = filtros['fecha_inicio']
-                print("periodo anterior",filtros_periodo_anterior)
-        # Obtener datos del período anterior
-        df_mascotas_anterior = filtrar_datos(df_mascotas_orig, filtros_periodo_anterior)
-        df_gastos_anterior = filtrar_datos(df_gastos_orig, filtros_periodo_anterior)
-        df_donaciones_anterior = filtrar_datos(df_donaciones_orig, filtros_periodo_anterior)
-
-        # Calcular métricas del período anterior
-        total_rescatados_anterior = len(df_mascotas_anterior)
-        total_adoptados_anterior = df_mascotas_anterior[df_mascotas_anterior['EstadoActual'] == 'Adoptado'].shape[0]
-        total_gastos_anterior = df_gastos_anterior['Monto'].sum() if 'Monto' in df_gastos_anterior.columns else 0
-        total_donaciones_anterior = df_donaciones_anterior['Monto'].sum() if 'Monto' in df_donaciones_anterior.columns else 0
-        
-        # Calcular tendencias
-        tendencia_rescatados = ('up' if total_rescatados > total_rescatados_anterior else 
-                             'down' if total_rescatados < total_rescatados_anterior else 'neutral')
-        pct_rescatados = f"{abs((total_rescatados - total_rescatados_anterior) / max(1, total_rescatados_anterior) * 100):.1f}%"
-        
-        tendencia_adoptados = ('up' if total_adoptados > total_adoptados_anterior else 
-                             'down' if total_adoptados < total_adoptados_anterior else 'neutral')
-        pct_adoptados = f"{abs((total_adoptados - total_adoptados_anterior) / max(1, total_adoptados_anterior) * 100):.1f}%"
-        
-        tendencia_gastos = ('down' if total_gastos < total_gastos_anterior else 
-                          'up' if total_gastos > total_gastos_anterior else 'neutral')
-        pct_gastos = f"{abs((total_gastos - total_gastos_anterior) / max(1, total_gastos_anterior) * 100):.1f}%"
-        
-        tendencia_donaciones = ('up' if total_donaciones > total_donaciones_anterior else 
-                             'down' if total_donaciones < total_donaciones_anterior else 'neutral')
-        pct_donaciones = f"{abs((total_donaciones - total_donaciones_anterior) / max(1, total_donaciones_anterior) * 100):.1f}%"
+        total_rescatados = actuales['rescates']
+        total_adoptados = actuales['adopciones']
+        total_gastos = a_pesos(actuales['gastos_monto'])
+        total_donaciones = a_pesos(actuales['donaciones_monto'])
+        
+        # Tendencia contra el período anterior (sin flecha si no hay datos previos)
+        tendencia_rescatados, pct_rescatados = variacion(actuales['rescates'], anteriores.get('rescates'))
+        tendencia_adoptados, pct_adoptados = variacion(actuales['adopciones'], anteriores.get('adopciones'))
+        tendencia_gastos, pct_gastos = variacion(actuales['gastos_monto'], anteriores.get('gastos_monto'))
+        tendencia_donaciones, pct_donaciones = variacion(actuales['donaciones_monto'], anteriores.get('donaciones_monto'))
+        
+        # Resto de las comparaciones, como detalle de cada tarjeta
+        def detalle(medida):
+            lineas = []
+            for nombre, etiqueta in (('año_anterior', "mismo período del año anterior"),
+                                     (f'ultimos_{MESES_TENDENCIA}', f"promedio de los últimos {MESES_TENDENCIA} meses")):
+                base = comparacion.get(nombre)
+                tendencia, pct = variacion(actuales[medida], base[medida] if base else None)
+                if tendencia:
+                    simbolo = {'up': "↑", 'down': "↓"}.get(tendencia, "→")
+                    lineas.append(f"vs. {etiqueta}: {simbolo} {pct}")
+            return " · ".join(lineas) or None
         
         # Crear las columnas para las métricas
         # IMPORTANTE: Envolvemos todo en un solo contenedor para evitar espacios
@@ -837,7 +826,8 @@ def crear_seccion_metricas(df_mascotas, df_gastos, df_donaciones,df_mascotas_ori
                         "🐾", 
                         tendencia_rescatados, 
                         pct_rescatados,
-                        COLORES['rescate']
+                        COLORES['rescate'],
+                        detalle('rescates')
                     ), 
                     unsafe_allow_html=True
                 )
@@ -850,7 +840,8 @@ def crear_seccion_metricas(df_mascotas, df_gastos, df_donaciones,df_mascotas_ori
                         "🏠", 
                         tendencia_adoptados, 
                         pct_adoptados,
-                        COLORES['adopcion']
+                        COLORES['adopcion'],
+                        detalle('adopciones')
                     ), 
                     unsafe_allow_html=True
                 )
@@ -863,7 +854,8 @@ def crear_seccion_metricas(df_mascotas, df_gastos, df_donaciones,df_mascotas_ori
                         "💰", 
                         tendencia_gastos, 
                         pct_gastos,
-                        COLORES['gastos']
+                        COLORES['gastos'],
+                        detalle('gastos_monto')
                     ), 
                     unsafe_allow_html=True
                 )
@@ -876,45 +868,12 @@ def crear_seccion_metricas(df_mascotas, df_gastos, df_donaciones,df_mascotas_ori
                         "💸", 
                         tendencia_donaciones, 
                         pct_donaciones,
-                        COLORES['donaciones']
+                        COLORES['donaciones'],
+                        detalle('donaciones_monto')
                     ), 
                     unsafe_allow_html=True
                 )
         
-        # Información del período de comparación para mostrar en mensaje
-        periodo_actual = ""
-        periodo_anterior = ""
-        
-        # Asegurarse que existen los valores en filtros
-        if filtros.get('mes') is not None and filtros.get('año') is not None:
-            if filtros['mes'] != "Todos" and filtros['año'] != "Todos":
-                # Ambos son específicos: año y mes
-                mes_actual_nombre = filtros['mes'].split(" - ")[1]
-                mes_anterior_nombre = filtros_periodo_anterior['mes'].split(" - ")[1]
-                periodo_actual = f"{mes_actual_nombre} {filtros['año']}"
-                periodo_anterior = f"{mes_anterior_nombre} {filtros_periodo_anterior['año']}"
-            elif filtros['mes'] == "Todos" and filtros['año'] != "Todos":
-                # Mes = Todos, pero año específico
-                periodo_actual = f"{filtros['año']}"
-                periodo_anterior = f"{filtros_periodo_anterior['año']}"
-            else:
-                # Mes = Todos y Año = Todos
-                periodo_actual = "Todos"
-                periodo_anterior = "Todos"
-
-        elif filtros.get('año') is not None:
-            if filtros['año'] != "Todos":
-                periodo_actual = f"{filtros['año']}"
-                periodo_anterior = f"{filtros_periodo_anterior['año']}"
-            else:
-                periodo_actual = "Todos"
-                periodo_anterior = "Todos"
-        else:
-            # Caso muy raro: no hay nada
-            periodo_actual = "Todos"
-            periodo_anterior = "Todos"
-
-            
         # Mostrar mensaje con insight principal
         # IMPORTANTE: Lo ponemos en el mismo contenedor para evitar espacios adicionales
         mensaje_insight = None
@@ -932,241 +891,182 @@ def crear_seccion_metricas(df_mascotas, df_gastos, df_donaciones,df_mascotas_ori
  
 
 
-def crear_grafico_distribucion_tipo(df_mascotas):
+def crear_grafico_distribucion_tipo(df_mascotas, clave=None):
     """
     Crea el gráfico de distribución por tipo de animal.
     
     Args:
         df_mascotas (pd.DataFrame): DataFrame de mascotas filtrado
+        clave (tuple, opcional): Clave de la vista para el cache de figuras
     """
     try:
         if df_mascotas.empty or 'TipoAnimal' not in df_mascotas.columns:
             st.warning("No hay datos suficientes para mostrar la distribución por tipo de animal.")
             return
             
-        # Calcular distribución por tipo
-        type_counts = df_mascotas['TipoAnimal'].value_counts().reset_index()
-        type_counts.columns = ['TipoAnimal', 'Cantidad']
-        
-        # Crear gráfico de torta con diseño mejorado
-        fig_pie = px.pie(
-            type_counts,
-            values='Cantidad',
-            names='TipoAnimal',
-            hole=0.4,
-            color_discrete_sequence=[COLORES['primario'], COLORES['adopcion'], COLORES['rescate'], COLORES['alerta']],
-        )
-        
-        fig_pie.update_traces(
-            textposition='inside', 
-            textinfo='percent+label',
-            marker=dict(line=dict(color=COLORES['fondo'], width=2))
-        )
-        
-        fig_pie.update_layout(
-            height=350,
-            margin=dict(l=10, r=10, t=30, b=10),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=-0.2,
-                xanchor="center",
-                x=0.5
-            ),
-            font=dict(family="Arial", size=12),
-            paper_bgcolor=COLORES['fondo'],
-            plot_bgcolor=COLORES['fondo']
-        )
+        def construir():
+            # Calcular distribución por tipo
+            type_counts = df_mascotas['TipoAnimal'].value_counts().reset_index()
+            type_counts.columns = ['TipoAnimal', 'Cantidad']
+            # TipoAnimal es categórica: descartar tipos sin animales en el filtro
+            type_counts = type_counts[type_counts['Cantidad'] > 0]
+            
+            # Crear gráfico de torta con diseño mejorado
+            fig_pie = px.pie(
+                type_counts,
+                values='Cantidad',
+                names='TipoAnimal',
+                hole=0.4,
+                color_discrete_sequence=[COLORES['primario'], COLORES['adopcion'], COLORES['rescate'], COLORES['alerta']],
+            )
+            
+            fig_pie.update_traces(
+                textposition='inside', 
+                textinfo='percent+label',
+                marker=dict(line=dict(color=COLORES['fondo'], width=2))
+            )
+            
+            fig_pie.update_layout(
+                height=350,
+                margin=dict(l=10, r=10, t=30, b=10),
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=-0.2,
+                    xanchor="center",
+                    x=0.5
+                ),
+                font=dict(family="Arial", size=12),
+                paper_bgcolor=COLORES['fondo'],
+                plot_bgcolor=COLORES['fondo']
+            )
+            return fig_pie, None
         
+        fig_pie, _ = figura_en_cache('distribucion_tipo', clave, construir)
         st.plotly_chart(fig_pie, use_container_width=True)
-        
-        # Mostrar estadísticas adicionales
-        total_animales = type_counts['Cantidad'].sum()
-        adoptados = df_mascotas[df_mascotas['EstadoActual'] == 'Adoptado'].shape[0] 
   
     except Exception as e:
         st.error(f"Error al crear gráfico de distribución: {str(e)}")
 
-def crear_grafico_gastos_donaciones(df_gastos, df_donaciones):
+def crear_grafico_gastos_donaciones(balance, clave=None):
     """
     Crea el gráfico de comparación entre gastos y donaciones.
     
     Args:
-        df_gastos (pd.DataFrame): DataFrame de gastos filtrado
-        df_donaciones (pd.DataFrame): DataFrame de donaciones filtrado
+        balance (pd.DataFrame): Balance mensual de los datos filtrados (utils.balance)
+        clave (tuple, opcional): Clave de la vista para el cache de figuras
     """
     try:
-        if (df_gastos.empty or 'Monto' not in df_gastos.columns or 
-            df_donaciones.empty or 'Monto' not in df_donaciones.columns):
+        if balance.empty or not balance['num_gastos'].any() or not balance['num_donaciones'].any():
             st.warning("No hay datos suficientes para mostrar el gráfico de gastos y donaciones.")
             return
         
-        # Preparar datos de gastos mensuales
-        gastos_mensuales = df_gastos.groupby(['año', 'mes']).agg(
-            total_gastos=('Monto', 'sum'),
-            num_registros=('Monto', 'count')
-        ).reset_index()
-        
-        # Preparar datos de donaciones mensuales
-        donaciones_mensuales = df_donaciones.groupby(['año', 'mes']).agg(
-            total_donaciones=('Monto', 'sum')
-        ).reset_index()
-        
-        # Crear columna de fecha para ordenamiento y visualización
-        gastos_mensuales['fecha'] = pd.to_datetime(
-            gastos_mensuales['año'].astype(str) + '-' + 
-            gastos_mensuales['mes'].astype(str) + '-01'
-        )
-        gastos_mensuales = gastos_mensuales.sort_values('fecha')
-        gastos_mensuales['mes_año'] = gastos_mensuales['fecha'].dt.strftime('%b %Y')
-        
-        donaciones_mensuales['fecha'] = pd.to_datetime(
-            donaciones_mensuales['año'].astype(str) + '-' + 
-            donaciones_mensuales['mes'].astype(str) + '-01'
-        )
-        donaciones_mensuales = donaciones_mensuales.sort_values('fecha')
-        donaciones_mensuales['mes_año'] = donaciones_mensuales['fecha'].dt.strftime('%b %Y')
-        
-        # Crear figura para ambas líneas
-        fig = go.Figure()
-        
-        # Agregar línea de gastos
-        fig.add_trace(go.Scatter(
-            x=gastos_mensuales['fecha'],
-            y=gastos_mensuales['total_gastos'],
-            mode='lines+markers',
-            name='Gastos',
-            line=dict(color=COLORES['gastos'], width=3),
-            marker=dict(size=8, line=dict(width=2, color=COLORES['fondo']))
-        ))
-        
-        # Agregar línea de donaciones
-        fig.add_trace(go.Scatter(
-            x=donaciones_mensuales['fecha'],
-            y=donaciones_mensuales['total_donaciones'],
-            mode='lines+markers',
-            name='Donaciones',
-            line=dict(color=COLORES['donaciones'], width=3),
-            marker=dict(size=8, line=dict(width=2, color=COLORES['fondo']))
-        ))
-        
-        # Configurar diseño del gráfico
-        fig.update_layout(
-            title='',
-            xaxis_title='Mes',
-            yaxis_title='Monto ($)',
-            xaxis=dict(
-                tickformat='%b %Y', 
-                tickangle=-45,
-                tickfont=dict(size=10)
-            ),
-            yaxis=dict(gridcolor=COLORES['borde']),
-            hovermode='x unified',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            template='plotly_white',
-            margin=dict(l=10, r=10, t=20, b=10),
-            paper_bgcolor=COLORES['fondo'],
-            plot_bgcolor=COLORES['fondo']
-        )
-        
-        # Añadir área sombreada para déficit (cuando gastos > donaciones)
-        for i in range(len(gastos_mensuales)):
-            if i < len(donaciones_mensuales):
-                fecha = gastos_mensuales.iloc[i]['fecha']
-                gasto = gastos_mensuales.iloc[i]['total_gastos']
-                
-                # Encontrar la donación correspondiente al mismo mes/año
-                donacion_mismo_periodo = donaciones_mensuales[
-                    (donaciones_mensuales['año'] == gastos_mensuales.iloc[i]['año']) & 
-                    (donaciones_mensuales['mes'] == gastos_mensuales.iloc[i]['mes'])
-                ]
-                
-                if not donacion_mismo_periodo.empty:
-                    donacion = donacion_mismo_periodo.iloc[0]['total_donaciones']
-                    
-                    # Si hay déficit, añadir área sombreada
-                    if gasto > donacion:
-                        fig.add_trace(go.Scatter(
-                            x=[fecha, fecha],
-                            y=[donacion, gasto],
-                            fill='tonexty',
-                            fillcolor='rgba(231, 76, 60, 0.2)',
-                            line=dict(color='rgba(0,0,0,0)'),
-                            showlegend=False,
-                            hoverinfo='none'
-                        ))
+        def construir():
+            # Cada línea solo tiene puntos en los meses con registros de su tipo
+            fechas = balance['fecha']
+            total_gastos = a_pesos(balance['gastos']).where(balance['num_gastos'] > 0)
+            total_donaciones = a_pesos(balance['donaciones']).where(balance['num_donaciones'] > 0)
+        
+            # Crear figura para ambas líneas
+            fig = go.Figure()
+        
+            # Agregar línea de gastos
+            fig.add_trace(go.Scatter(
+                x=fechas,
+                y=total_gastos,
+                mode='lines+markers',
+                connectgaps=True,
+                name='Gastos',
+                line=dict(color=COLORES['gastos'], width=3),
+                marker=dict(size=8, line=dict(width=2, color=COLORES['fondo']))
+            ))
+        
+            # Agregar línea de donaciones
+            fig.add_trace(go.Scatter(
+                x=fechas,
+                y=total_donaciones,
+                mode='lines+markers',
+                connectgaps=True,
+                name='Donaciones',
+                line=dict(color=COLORES['donaciones'], width=3),
+                marker=dict(size=8, line=dict(width=2, color=COLORES['fondo']))
+            ))
+        
+            # Configurar diseño del gráfico
+            fig.update_layout(
+                title='',
+                xaxis_title='Mes',
+                yaxis_title='Monto ($)',
+                xaxis=dict(
+                    tickformat='%b %Y', 
+                    tickangle=-45,
+                    tickfont=dict(size=10)
+                ),
+                yaxis=dict(gridcolor=COLORES['borde']),
+                hovermode='x unified',
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1
+                ),
+                template='plotly_white',
+                margin=dict(l=10, r=10, t=20, b=10),
+                paper_bgcolor=COLORES['fondo'],
+                plot_bgcolor=COLORES['fondo']
+            )
         
+            # Añadir área sombreada para déficit (cuando gastos > donaciones):
+            # un único polígono entre las donaciones y el máximo de ambas series,
+            # que solo tiene alto en los meses con déficit
+            ambos = balance[(balance['num_gastos'] > 0) & (balance['num_donaciones'] > 0)]
+            if (ambos['gastos'] > ambos['donaciones']).any():
+                superior = a_pesos(np.maximum(ambos['gastos'], ambos['donaciones']).to_numpy())
+                inferior = a_pesos(ambos['donaciones'].to_numpy())
+                fechas_deficit = ambos['fecha'].to_numpy()
+                fig.add_trace(go.Scatter(
+                    x=np.concatenate([fechas_deficit, fechas_deficit[::-1]]),
+                    y=np.concatenate([superior, inferior[::-1]]),
+                    fill='toself',
+                    fillcolor='rgba(231, 76, 60, 0.2)',
+                    line=dict(color='rgba(0,0,0,0)'),
+                    mode='lines',
+                    showlegend=False,
+                    hoverinfo='skip'
+                ))
+            return fig, None
+        
+        fig, _ = figura_en_cache('gastos_donaciones', clave, construir)
         st.plotly_chart(fig, use_container_width=True)
         
     except Exception as e:
         st.error(f"Error al crear gráfico de gastos y donaciones: {str(e)}")
 
-def detalle_gastos_donaciones(filtered_gastos, filtered_donaciones):
-            # Preparar datos de gastos
-        gastos_mensuales = filtered_gastos.groupby(['año', 'mes']).agg(
-            total_gastos=('Monto', 'sum'),
-            num_registros=('Monto', 'count')
-        ).reset_index()
-
-        donaciones_mensuales = (
-            filtered_donaciones
-            .groupby(['año','mes'])['Monto']
-            .agg(total_donaciones='sum')
-            .reset_index()
-        )
-
-        gastos_mensuales['fecha'] = pd.to_datetime(gastos_mensuales['año'].astype(str) + '-' + 
-                                                gastos_mensuales['mes'].astype(str) + '-01')
-        gastos_mensuales = gastos_mensuales.sort_values('fecha')
-        gastos_mensuales['mes_año'] = gastos_mensuales['fecha'].dt.strftime('%b %Y')
+def detalle_gastos_donaciones(balance):
+    """
+    Arma la tabla de resumen mensual de gastos y donaciones.
+    
+    Args:
+        balance (pd.DataFrame): Balance mensual de los datos filtrados (utils.balance)
         
-        donaciones_mensuales['fecha'] = pd.to_datetime(
-            donaciones_mensuales['año'].astype(str)
-            + '-' + donaciones_mensuales['mes'].astype(str)
-            + '-01'
-        )
-        donaciones_mensuales = donaciones_mensuales.sort_values('fecha') 
-        donaciones_mensuales['mes_año'] = donaciones_mensuales['fecha'].dt.strftime('%b %Y')
- # 1) Prepara los dos DataFrames
-        g = gastos_mensuales[['mes_año','total_gastos']]
-        d = donaciones_mensuales[['mes_año','total_donaciones']]
-            # 1) Fusiona gastos y donaciones por mes_año (ya en formato string 'Feb 2025')
-        resumen = pd.merge(g, d, on='mes_año', how='outer').fillna(0)
-
-        # 2) Crea la columna de diferencia numérica
-        resumen['diferencia'] = resumen['total_donaciones'] - resumen['total_gastos']
-
-        # 3) Crea columna datetime para ordenar
-        resumen['periodo'] = pd.to_datetime(resumen['mes_año'], format='%b %Y')
-
-        # 4) Ordena cronológicamente
-        resumen = ( resumen.sort_values('periodo', ascending=False).reset_index(drop=True))
-        # 5) Renombra todas las columnas de una vez, incluyendo la diferencia
-        resumen = resumen.rename(columns={
-            'mes_año':            'Mes‑Año',
-            'total_gastos':       'Total Gastos ($)',
-            'total_donaciones':   'Total Donaciones ($)',
-            'diferencia':         'Diferencia ($)'
-        })
-
-        # 6) Selecciona el orden definitivo de columnas para mostrar
-        resumen = resumen[[
-            'Mes‑Año',
-            'Total Gastos ($)',
-            'Total Donaciones ($)',
-            'Diferencia ($)'
-        ]]
+    Returns:
+        pd.DataFrame: Resumen ordenado del mes más reciente al más antiguo
+    """
+    # Meses sin registros de un tipo cuentan como 0
+    resumen = pd.DataFrame({
+        'Mes‑Año': balance['etiqueta'].to_numpy(),
+        'Total Gastos ($)': a_pesos(balance['gastos']),
+        'Total Donaciones ($)': a_pesos(balance['donaciones']),
+        'Diferencia ($)': a_pesos(balance['donaciones'] - balance['gastos']),
+    })
+    # El índice es el periodo (aaaamm): ordenar por él es orden cronológico
+    return resumen.sort_index(ascending=False).reset_index(drop=True)
 
 # Otra solución: HTML puro con estilos inline
-def mostrar_tabla_html(df_gastos, df_donaciones):
+def mostrar_tabla_html(balance):
     """Solución con HTML puro para evitar problemas de color"""
-    # Agrupar y calcular como antes...
+    resumen = detalle_gastos_donaciones(balance)
     
     # Luego, en lugar de usar st.dataframe, creamos HTML directamente:
     html = """
@@ -1184,19 +1084,19 @@ def mostrar_tabla_html(df_gastos, df_donaciones):
     # Añadir cada fila con colores inline (esto garantiza que se vean)
     for _, row in resumen.iterrows():
         # Determinar color para diferencia
-        if row['diferencia'] > 0:
+        if row['Diferencia ($)'] > 0:
             dif_color = "#2ecc71"  # Verde
-        elif row['diferencia'] < 0:
+        elif row['Diferencia ($)'] < 0:
             dif_color = "#e74c3c"  # Rojo
         else:
             dif_color = "#000000"  # Negro
             
         html += f"""
         <tr style="border:1px solid #ddd;">
-            <td style="padding:8px; border:1px solid #ddd;">{row['mes_año']}</td>
-            <td style="padding:8px; border:1px solid #ddd;">${row['total_gastos']:,.0f}</td>
-            <td style="padding:8px; border:1px solid #ddd;">${row['total_donaciones']:,.0f}</td>
-            <td style="padding:8px; border:1px solid #ddd; color:{dif_color};">${row['diferencia']:,.0f}</td>
+            <td style="padding:8px; border:1px solid #ddd;">{row['Mes‑Año']}</td>
+            <td style="padding:8px; border:1px solid #ddd;">${row['Total Gastos ($)']:,.0f}</td>
+            <td style="padding:8px; border:1px solid #ddd;">${row['Total Donaciones ($)']:,.0f}</td>
+            <td style="padding:8px; border:1px solid #ddd; color:{dif_color};">${row['Diferencia ($)']:,.0f}</td>
         </tr>
         """
     
@@ -1207,13 +1107,14 @@ def mostrar_tabla_html(df_gastos, df_donaciones):
     
     st.markdown(html, unsafe_allow_html=True)
   
-def crear_grafico_actividad(df_mascotas, filtros):
+def crear_grafico_actividad(df_mascotas, filtros, clave=None):
     """
     Crea el gráfico de actividad (rescates y adopciones).
     
     Args:
         df_mascotas (pd.DataFrame): DataFrame de mascotas filtrado
         filtros (dict): Filtros aplicados
+        clave (tuple, opcional): Clave de la vista para el cache de figuras
     """
     try:
         if df_mascotas.empty:
@@ -1222,85 +1123,89 @@ def crear_grafico_actividad(df_mascotas, filtros):
             
         año_sel = filtros.get('año', "Todos")
         
-        if año_sel == "Todos":
-            # Mostrar agrupado por año
-            actividad_anual = df_mascotas.groupby('año').agg(
-                Rescates=('Nombre', 'count'),
-                Adopciones=('FechaAdopcion', lambda x: x.notna().sum())
-            ).reset_index()
+        def construir():
+            if año_sel == "Todos":
+                # Mostrar agrupado por año
+                actividad_anual = df_mascotas.groupby('año').agg(
+                    Rescates=('Nombre', 'count'),
+                    Adopciones=('FechaAdopcion', lambda x: x.notna().sum())
+                ).reset_index()
             
-            actividad_anual['Periodo'] = actividad_anual['año'].astype(str)
+                actividad_anual['Periodo'] = actividad_anual['año'].astype(str)
             
-            df_plot = pd.melt(
-                actividad_anual,
-                id_vars=['Periodo'],
-                value_vars=['Rescates', 'Adopciones'],
-                var_name='Tipo',
-                value_name='Cantidad'
-            )
+                df_plot = pd.melt(
+                    actividad_anual,
+                    id_vars=['Periodo'],
+                    value_vars=['Rescates', 'Adopciones'],
+                    var_name='Tipo',
+                    value_name='Cantidad'
+                )
             
-            # Ordenar por período
-            df_plot['Periodo'] = pd.to_datetime(df_plot['Periodo'], format='%Y').dt.year.astype(str)
-            df_plot = df_plot.sort_values('Periodo')
+                # Ordenar por período
+                df_plot = df_plot.sort_values('Periodo')
             
-        else:
-            # Mostrar agrupado por mes dentro del año seleccionado
-            actividad_mensual = df_mascotas.groupby('mes').agg(
-                Rescates=('Nombre', 'count'),
-                Adopciones=('FechaAdopcion', lambda x: x.notna().sum())
-            ).reset_index()
+            else:
+                # Mostrar agrupado por mes dentro del año seleccionado
+                actividad_mensual = df_mascotas.groupby('mes').agg(
+                    Rescates=('Nombre', 'count'),
+                    Adopciones=('FechaAdopcion', lambda x: x.notna().sum())
+                ).reset_index()
             
-            # Convertir número de mes a nombre (e.g. 1 → Ene)
-            actividad_mensual['Periodo'] = actividad_mensual['mes'].apply(
-                lambda m: pd.to_datetime(f'2023-{m}-01').strftime('%b')
-            )
+                # Convertir número de mes a nombre (e.g. 1 → Ene)
+                actividad_mensual['Periodo'] = nombre_mes(actividad_mensual['mes'], corto=True)
             
-            df_plot = pd.melt(
-                actividad_mensual,
-                id_vars=['Periodo', 'mes'],
-                value_vars=['Rescates', 'Adopciones'],
-                var_name='Tipo',
-                value_name='Cantidad'
-            )
+                df_plot = pd.melt(
+                    actividad_mensual,
+                    id_vars=['Periodo', 'mes'],
+                    value_vars=['Rescates', 'Adopciones'],
+                    var_name='Tipo',
+                    value_name='Cantidad'
+                )
             
-            # Ordenar por mes
-            meses_orden = {pd.to_datetime(f'2023-{i}-01').strftime('%b'): i for i in range(1, 13)}
-            df_plot['mes_num'] = df_plot['Periodo'].map(meses_orden)
-            df_plot = df_plot.sort_values('mes_num')
+                # Ordenar por mes
+                df_plot = df_plot.sort_values('mes', kind='stable')
             
-        # Crear gráfico de barras
-        fig = px.bar(
-            df_plot,
-            x='Periodo',
-            y='Cantidad',
-            color='Tipo',
-            barmode='group',
-            labels={'Periodo': 'Período', 'Cantidad': 'Cantidad', 'Tipo': ''},
-            color_discrete_map={'Rescates': COLORES['rescate'], 'Adopciones': COLORES['adopcion']}
-        )
-        
-        fig.update_layout(
-            margin=dict(l=10, r=10, t=10, b=0),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            xaxis=dict(tickangle=0),
-            paper_bgcolor=COLORES['fondo'],
-            plot_bgcolor=COLORES['fondo'],
-            yaxis=dict(gridcolor=COLORES['borde'])
-        )
+            # Crear gráfico de barras
+            fig = px.bar(
+                df_plot,
+                x='Periodo',
+                y='Cantidad',
+                color='Tipo',
+                barmode='group',
+                labels={'Periodo': 'Período', 'Cantidad': 'Cantidad', 'Tipo': ''},
+                color_discrete_map={'Rescates': COLORES['rescate'], 'Adopciones': COLORES['adopcion']}
+            )
         
+            fig.update_layout(
+                margin=dict(l=10, r=10, t=10, b=0),
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1
+                ),
+                xaxis=dict(tickangle=0),
+                paper_bgcolor=COLORES['fondo'],
+                plot_bgcolor=COLORES['fondo'],
+                yaxis=dict(gridcolor=COLORES['borde'])
+            )
+            
+            # Totales para el insight de tasa de adopción
+            totales = {
+                'rescates': int(df_plot.loc[df_plot['Tipo'] == 'Rescates', 'Cantidad'].sum()),
+                'adopciones': int(df_plot.loc[df_plot['Tipo'] == 'Adopciones', 'Cantidad'].sum()),
+            }
+            return fig, totales
+        
+        fig, totales = figura_en_cache('actividad', clave, construir)
         st.plotly_chart(fig, use_container_width=True)
         
         # Añadir insights sobre la actividad
         if año_sel != "Todos":
             # Calcular tasa de adopción (adopciones/rescates)
-            total_rescates = df_plot[df_plot['Tipo'] == 'Rescates']['Cantidad'].sum()
-            total_adopciones = df_plot[df_plot['Tipo'] == 'Adopciones']['Cantidad'].sum()
+            total_rescates = totales['rescates']
+            total_adopciones = totales['adopciones']
             
             if total_rescates > 0:
                 tasa_adopcion = (total_adopciones / total_rescates) * 100
@@ -1315,79 +1220,61 @@ def crear_grafico_actividad(df_mascotas, filtros):
     except Exception as e:
         st.error(f"Error al crear gráfico de actividad: {str(e)}")
 
-def crear_mapa_calor_adopcion(df_mascotas):
+def crear_mapa_calor_adopcion(df_mascotas, clave=None, tabla_colores=None):
     """
     Crea el mapa de calor de adopción por tipo y color de animal.
     
     Args:
         df_mascotas (pd.DataFrame): DataFrame de mascotas filtrado
+        clave (tuple, opcional): Clave de la vista para el cache de figuras
+        tabla_colores (pd.DataFrame, opcional): Composición de colores (obtener_tabla_colores)
     """
     try:
         # Filtrar sólo animales adoptados
-        adoption_data = df_mascotas[df_mascotas['FechaAdopcion'].notna()].copy()
+        adoptados = df_mascotas['FechaAdopcion'].notna()
         
-        if adoption_data.empty:
+        if not adoptados.any():
             st.warning("No hay datos de adopción disponibles para crear el mapa de calor.")
             return
             
-        # Calcular días hasta adopción
-        adoption_data['DiasHastaAdopcion'] = (adoption_data['FechaAdopcion'] - adoption_data['Fecha']).dt.days
-        
-        # Si existe ColorPelo como JSON, extraer color principal
-        if 'ColorPelo' in adoption_data.columns and adoption_data['ColorPelo'].dtype == object:
-            def extract_primary_color(color_json):
-                try:
-                    if pd.isna(color_json) or color_json == '':
-                        return 'No especificado'
-                    
-                    # Si es un JSON como string
-                    if isinstance(color_json, str) and ('[' in color_json or '{' in color_json):
-                        colors = json.loads(color_json.replace("'", "\""))
-                        if isinstance(colors, list) and len(colors) > 0:
-                            # Tomar el color con mayor porcentaje
-                            max_percentage = 0
-                            primary_color = ""
-                            for color_info in colors:
-                                if color_info.get("porcentaje", 0) > max_percentage:
-                                    max_percentage = color_info.get("porcentaje", 0)
-                                    primary_color = color_info.get("color", "")
-                            return primary_color
-                        return "No especificado"
-                    
-                    # Si es un string simple
-                    return color_json if isinstance(color_json, str) else "No especificado"
-                except (json.JSONDecodeError, AttributeError, TypeError):
-                    # Si no es un JSON válido, devolver el valor original o No especificado
-                    return color_json if isinstance(color_json, str) else "No especificado"
+        def construir():
+            adoption_data = df_mascotas[adoptados].copy()
             
-            adoption_data['ColorPrimario'] = adoption_data['ColorPelo'].apply(extract_primary_color)
-        elif 'ColorPrincipal' in adoption_data.columns:
-            adoption_data['ColorPrimario'] = adoption_data['ColorPrincipal']
-        else:
-            adoption_data['ColorPrimario'] = 'No especificado'
-        
-        # Crear pivot table para el mapa de calor
-        pivot = adoption_data.pivot_table(
-            values='DiasHastaAdopcion',
-            index='TipoAnimal',
-            columns='ColorPrimario',
-            aggfunc='mean'
-        )
-        
-        # Verificar conteo para cada combinación
-        counts_pivot = adoption_data.pivot_table(
-            values='DiasHastaAdopcion',
-            index='TipoAnimal',
-            columns='ColorPrimario',
-            aggfunc='count'
-        )
-        
-        # Aplicar máscara para celdas con menos de 2 animales (para evitar outliers)
-        mask = counts_pivot < 2
-        pivot = pivot.mask(mask)
-        
-        if not pivot.empty and pivot.notna().sum().sum() > 0:
-            # Crear y mostrar el heatmap
+            # Calcular días hasta adopción
+            adoption_data['DiasHastaAdopcion'] = (adoption_data['FechaAdopcion'] - adoption_data['Fecha']).dt.days
+            
+            # Color principal calculado al procesar los datos
+            if 'ColorPrincipal' in adoption_data.columns:
+                adoption_data['ColorPrimario'] = adoption_data['ColorPrincipal']
+            else:
+                adoption_data['ColorPrimario'] = 'No especificado'
+            
+            # Crear pivot table para el mapa de calor
+            pivot = adoption_data.pivot_table(
+                values='DiasHastaAdopcion',
+                index='TipoAnimal',
+                columns='ColorPrimario',
+                aggfunc='mean',
+                observed=True
+            )
+            
+            # Verificar conteo para cada combinación
+            counts_pivot = adoption_data.pivot_table(
+                values='DiasHastaAdopcion',
+                index='TipoAnimal',
+                columns='ColorPrimario',
+                aggfunc='count',
+                observed=True
+            )
+            
+            # Aplicar máscara para celdas con menos de 2 animales (para evitar outliers)
+            mask = counts_pivot < 2
+            pivot = pivot.mask(mask)
+            
+            if pivot.empty or pivot.notna().sum().sum() == 0:
+                return None, None
+            
+            # Crear el heatmap
             fig_heat = px.imshow(
                 pivot,
                 labels=dict(x="Color", y="Tipo", color="Días promedio"),
@@ -1420,98 +1307,106 @@ def crear_mapa_calor_adopcion(df_mascotas):
                 plot_bgcolor=COLORES['fondo']
             )
             
-            st.plotly_chart(fig_heat, use_container_width=True)
-            
             # Encontrar combinaciones más rápidas
+            insight = None
             min_days = pivot.min().min()
             if pd.notna(min_days):
                 # Encontrar combinación tipo-color con menor tiempo de adopción
                 min_idx = pivot.stack().idxmin()
                 if isinstance(min_idx, tuple) and len(min_idx) == 2:
-                    min_type, min_color = min_idx
-                    
-                    # Mostrar insight sobre combinación más rápida
-                    st.info(f"💡 La combinación que se adopta más rápido es: **{min_type}** con color **{min_color}** ({min_days:.0f} días)")
-                    
-                    # Mostrar las 3 combinaciones más rápidas
-                    tipo_color_datos = adoption_data.groupby(['TipoAnimal', 'ColorPrimario'])['DiasHastaAdopcion'].agg(['mean', 'count']).reset_index()
+                    # Las 3 combinaciones más rápidas (con al menos 2 animales)
+                    tipo_color_datos = adoption_data.groupby(['TipoAnimal', 'ColorPrimario'], observed=True)['DiasHastaAdopcion'].agg(['mean', 'count']).reset_index()
                     tipo_color_datos.columns = ['TipoAnimal', 'ColorPelo', 'DiasPromedio', 'Cantidad']
-                    
-                    # Filtrar para mostrar solo combinaciones con al menos 2 animales
                     tipo_color_datos = tipo_color_datos[tipo_color_datos['Cantidad'] >= 2].sort_values('DiasPromedio')
-                    
                     top_combinaciones = tipo_color_datos.nsmallest(3, 'DiasPromedio')
-                    if len(top_combinaciones) > 0:
-                        st.markdown("**Combinaciones más rápidas de adopción:**")
-                        for i, row in enumerate(top_combinaciones.itertuples(), 1):
-                            st.markdown(f"**{i}.** {row.TipoAnimal} de color **{row.ColorPelo}**: **{row.DiasPromedio:.0f} días** ({row.Cantidad} animales)")
-        else:
+                    insight = {
+                        'tipo': str(min_idx[0]),
+                        'color': str(min_idx[1]),
+                        'dias': float(min_days),
+                        'top': [(str(row.TipoAnimal), str(row.ColorPelo), float(row.DiasPromedio), int(row.Cantidad))
+                                for row in top_combinaciones.itertuples()],
+                    }
+            return fig_heat, insight
+        
+        fig_heat, insight = figura_en_cache('calor_adopcion', clave, construir)
+        if fig_heat is None:
             st.info("No hay suficientes datos para crear un mapa de calor significativo.")
+            return
+            
+        st.plotly_chart(fig_heat, use_container_width=True)
+        
+        if insight:
+            # Mostrar insight sobre combinación más rápida
+            st.info(f"💡 La combinación que se adopta más rápido es: **{insight['tipo']}** con color **{insight['color']}** ({insight['dias']:.0f} días)")
+            
+            # Mostrar las 3 combinaciones más rápidas
+            if len(insight['top']) > 0:
+                st.markdown("**Combinaciones más rápidas de adopción:**")
+                for i, (tipo, color, dias, cantidad) in enumerate(insight['top'], 1):
+                    st.markdown(f"**{i}.** {tipo} de color **{color}**: **{dias:.0f} días** ({cantidad} animales)")
+        
+        # Colores de todos los animales mostrados, contando cada color de pelo según su porcentaje
+        if tabla_colores is not None:
+            participacion = composicion(tabla_colores, df_mascotas.index).head(5)
+            if not participacion.empty:
+                detalle = ", ".join(f"**{color}** {pct:.0f}%" for color, pct in participacion.items())
+                st.markdown(f"**Colores de pelo de los animales mostrados:** {detalle}")
             
     except Exception as e:
         st.error(f"Error al crear mapa de calor de adopción: {str(e)}")
 
-def crear_mapa_rescates(df_mascotas):
+def crear_mapa_rescates(df_mascotas, clave=None):
     """
     Crea un mapa de los lugares de rescate.
     
     Args:
         df_mascotas (pd.DataFrame): DataFrame de mascotas filtrado
+        clave (tuple): Clave de cache de la vista (clave_vista), o None
     """
     try:
         if df_mascotas.empty or 'Latitud' not in df_mascotas.columns or 'Longitud' not in df_mascotas.columns:
             st.warning("No hay datos de ubicación disponibles para crear el mapa.")
             return
             
-        # Crear mapa base centrado en Buenos Aires
-        m = folium.Map(
-            location=[-34.6037, -58.3816],
-            zoom_start=11,
-            tiles='CartoDB positron'  # Estilo más limpio
-        )
-        
-        # Agrupar por ubicación para contar rescates
-        location_counts = df_mascotas.groupby(['Ubicacion', 'Latitud', 'Longitud']).size().reset_index(name='count')
-        
-        # Añadir marcadores con información
-        for idx, row in location_counts.iterrows():
-            # Calcular el tamaño del círculo según la cantidad (mínimo 5, máximo 15)
-            radius = min(15, max(5, row['count'] * 1.5))
+        def construir():
+            # Crear mapa base centrado en Buenos Aires
+            m = folium.Map(
+                location=[-34.6037, -58.3816],
+                zoom_start=11,
+                tiles='CartoDB positron'  # Estilo más limpio
+            )
             
-            # Definir el color según la cantidad (más intenso para mayor cantidad)
+            # Una sola capa GeoJSON con un punto por ubicación (cantidad en las propiedades)
+            puntos = coleccion_puntos(conteo_ubicaciones(df_mascotas))
             color = COLORES['rescate']
+            capa = folium.GeoJson(
+                puntos,
+                name="Rescates",
+                marker=folium.CircleMarker(fill=True, fill_opacity=0.7, weight=2),
+                # Tamaño del círculo según la cantidad de rescates
+                style_function=lambda feature: {
+                    'radius': feature['properties']['radio'],
+                    'color': color,
+                    'fillColor': color,
+                },
+                popup=folium.GeoJsonPopup(
+                    fields=['Ubicacion', 'count'],
+                    aliases=['Ubicación', 'Animales'],
+                ),
+                tooltip=folium.GeoJsonTooltip(fields=['Ubicacion'], labels=False),
+            )
+            # Agrupamiento de puntos cercanos para que el mapa siga liviano con muchas ubicaciones
+            capa.add_to(MarkerCluster(name="Rescates", options={'maxClusterRadius': 40}).add_to(m))
             
-            # Crear HTML personalizado para el popup
-            popup_html = f"""
-            <div style="font-family: Arial; width: 150px;">
-                <h4 style="margin: 5px 0; color: {COLORES['texto']};">{row['Ubicacion']}</h4>
-                <p style="margin: 3px 0;">Animales: <b>{row['count']}</b></p>
-            </div>
-            """
-            
-            # Crear el popup
-            popup = folium.Popup(popup_html, max_width=200)
+            # Añadir control de escala
+            MeasureControl(position='bottomleft', primary_length_unit='meters').add_to(m)
             
-            # Añadir marcador
-            folium.CircleMarker(
-                location=[row['Latitud'], row['Longitud']],
-                radius=radius,
-                popup=popup,
-                color=color,
-                fill=True,
-                fill_color=color,
-                fill_opacity=0.7,
-                weight=2
-            ).add_to(m)
-        
-        # Añadir control de escala
-        folium.plugins.MeasureControl(position='bottomleft', primary_length_unit='meters').add_to(m)
+            # Añadir mini mapa
+            MiniMap(toggle_display=True).add_to(m)
+            return m
         
-        # Añadir mini mapa
-        folium.plugins.MiniMap(toggle_display=True).add_to(m)
-        
-        # Mostrar el mapa
-        folium_static(m)
+        # Mostrar el mapa (HTML en cache por versión de datos y filtros)
+        html(mapa_en_cache('rescates', clave, construir), height=510, width=700)
         
         # Mostrar información adicional
         st.markdown(f"""
@@ -1525,40 +1420,99 @@ def crear_mapa_rescates(df_mascotas):
     except Exception as e:
         st.error(f"Error al crear mapa de rescates: {str(e)}")
 
-def crear_edad_tipo_adopcion(df_mascotas):
-    adoption_data = df_mascotas[df_mascotas['FechaAdopcion'].notna()].copy()
-    adoption_data['DiasHastaAdopcion'] = (adoption_data['FechaAdopcion'] - adoption_data['Fecha']).dt.days
+def crear_mapa_densidad(densidad, filtros, clave=None):
+    """
+    Crea un mapa de densidad de rescates con celdas hexagonales.
+    
+    Args:
+        densidad (DensidadRescates): Conteos precalculados por celda y periodo
+        filtros (dict): Filtros aplicados (año y mes)
+        clave (tuple): Clave de cache de la vista (clave_vista), o None
+    """
+    try:
+        celdas = densidad.celdas(filtros.get('año', "Todos"), filtros.get('mes', "Todos"))
+        if celdas.empty:
+            st.warning("No hay datos de ubicación disponibles para crear el mapa.")
+            return
+        
+        def construir():
+            m = folium.Map(
+                location=[-34.6037, -58.3816],
+                zoom_start=11,
+                tiles='CartoDB positron'
+            )
+            # Una sola capa de polígonos, coloreados según la cantidad de rescates
+            folium.GeoJson(
+                densidad.coleccion(celdas),
+                name="Densidad de rescates",
+                style_function=lambda feature: {
+                    'fillColor': feature['properties']['color'],
+                    'color': COLORES['rescate'],
+                    'weight': 1,
+                    'fillOpacity': 0.6,
+                },
+                tooltip=folium.GeoJsonTooltip(fields=['count'], aliases=['Animales']),
+            ).add_to(m)
+            MeasureControl(position='bottomleft', primary_length_unit='meters').add_to(m)
+            return m
+        
+        html(mapa_en_cache('densidad', clave, construir), height=510, width=700)
+        
+        st.markdown(f"""
+        <div class="insight-card">
+            <h4>Zonas con más rescates</h4>
+            <p>Cada hexágono agrupa los rescates de su zona: {int(celdas['count'].sum())} animales en {len(celdas)} zonas.
+            Los colores más intensos indican mayor cantidad de rescates.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    except Exception as e:
+        st.error(f"Error al crear mapa de densidad: {str(e)}")
 
-    if not adoption_data.empty:
-        # Crear tabla pivote para el heatmap
-        pivot_tipo_edad = adoption_data.pivot_table(
-            values='DiasHastaAdopcion',
-            index='TipoAnimal',      # Eje Y: Tipo de Animal
-            columns='Edad',          # Eje X: Edad
-            aggfunc='mean'           # Valor: Días promedio
-        ).fillna(0)                  # Rellenar valores ausentes con 0
+def crear_edad_tipo_adopcion(df_mascotas, clave=None):
+    adoptados = df_mascotas['FechaAdopcion'].notna()
 
-        # Crear y mostrar el heatmap
-        fig_heatmap = px.imshow(
-            pivot_tipo_edad,
-            title='Días hasta adopción',
-            labels=dict(x="Edad", y="Tipo", color="Días promedio"),
-            color_continuous_scale='YlOrRd_r',  # Escala invertida: amarillo (rápido) a rojo (lento)
-            aspect="auto",
-            text_auto='.0f'  # Mostrar valores sin decimales para mejor visualización
-        )
-        fig_heatmap.update_layout(height=350, margin=dict(l=10, r=10, t=50, b=10))
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+    if adoptados.any():
+        def construir():
+            adoption_data = df_mascotas[adoptados].copy()
+            adoption_data['DiasHastaAdopcion'] = (adoption_data['FechaAdopcion'] - adoption_data['Fecha']).dt.days
+
+            # Crear tabla pivote para el heatmap
+            pivot_tipo_edad = adoption_data.pivot_table(
+                values='DiasHastaAdopcion',
+                index='TipoAnimal',      # Eje Y: Tipo de Animal
+                columns='Edad',          # Eje X: Edad
+                aggfunc='mean',          # Valor: Días promedio
+                observed=True            # Solo tipos presentes (TipoAnimal es categórica)
+            ).fillna(0)                  # Rellenar valores ausentes con 0
 
-        # Identificar las combinaciones más rápidas
-        if pivot_tipo_edad.size > 0:  # Verificar que el pivot no esté vacío
-            min_idx = pivot_tipo_edad.values.argmin()
-            min_tipo = pivot_tipo_edad.index[min_idx // len(pivot_tipo_edad.columns)]
-            min_edad = pivot_tipo_edad.columns[min_idx % len(pivot_tipo_edad.columns)]
-            min_dias = pivot_tipo_edad.values.min()
+            # Crear el heatmap
+            fig_heatmap = px.imshow(
+                pivot_tipo_edad,
+                title='Días hasta adopción',
+                labels=dict(x="Edad", y="Tipo", color="Días promedio"),
+                color_continuous_scale='YlOrRd_r',  # Escala invertida: amarillo (rápido) a rojo (lento)
+                aspect="auto",
+                text_auto='.0f'  # Mostrar valores sin decimales para mejor visualización
+            )
+            fig_heatmap.update_layout(height=350, margin=dict(l=10, r=10, t=50, b=10))
+
+            # Identificar las combinaciones más rápidas
+            insight = None
+            if pivot_tipo_edad.size > 0:  # Verificar que el pivot no esté vacío
+                min_idx = pivot_tipo_edad.values.argmin()
+                insight = {
+                    'tipo': str(pivot_tipo_edad.index[min_idx // len(pivot_tipo_edad.columns)]),
+                    'edad': str(pivot_tipo_edad.columns[min_idx % len(pivot_tipo_edad.columns)]),
+                    'dias': float(pivot_tipo_edad.values.min()),
+                }
+            return fig_heatmap, insight
+
+        fig_heatmap, insight = figura_en_cache('edad_tipo_adopcion', clave, construir)
+        st.plotly_chart(fig_heatmap, use_container_width=True)
 
-            if min_dias > 0:  # Solo mostrar si hay datos válidos
-                st.info(f"💡 Más rápido: **{min_tipo}** de edad **{min_edad}** ({min_dias:.0f} días)")
+        if insight and insight['dias'] > 0:  # Solo mostrar si hay datos válidos
+            st.info(f"💡 Más rápido: **{insight['tipo']}** de edad **{insight['edad']}** ({insight['dias']:.0f} días)")
     else:
         st.info("No hay datos de adopción disponibles")
 
@@ -1566,6 +1520,138 @@ def crear_edad_tipo_adopcion(df_mascotas):
 # FUNCIÓN PRINCIPAL DEL DASHBOARD
 # ------------------------------------
 
+@st.fragment
+def mostrar_lluvia_animales():
+    """
+    Checkbox y animación de lluvia de animales. Es un fragmento: activarla
+    o desactivarla solo re-ejecuta esta función.
+    """
+    # Checkbox para activar la lluvia de animales
+    lluvia_animales = st.checkbox(
+        "🌧️ Lluvia de animales felices",
+        value=False,
+        key="rain_animals",
+        help="Activa una animación de lluvia de emojis de animales"
+    )
+    
+    if lluvia_animales:
+        # Inyecta el HTML+JS dentro de un iframe
+        html(
+            """
+            <style>
+              .falling-animal {
+                position: fixed;
+                top: -40px;
+                font-size: 2rem;
+                pointer-events: none;
+                user-select: none;
+                animation: fall linear infinite;
+              }
+              @keyframes fall {
+                to { transform: translateY(110vh) rotate(360deg); }
+              }
+            </style>
+            <script>
+              const chars = ["🐶","🐱","😺","🐕","🐈","🐾","🏠","💖"];
+              function dropChar() {
+                const c = chars[Math.floor(Math.random() * chars.length)];
+                const el = document.createElement("div");
+                el.textContent = c;
+                el.className = "falling-animal";
+                el.style.left = (Math.random()*100) + "vw";
+                const dur = 3 + Math.random()*4;
+                el.style.animationDuration = dur + "s";
+                el.style.animationDelay = Math.random()*1 + "s";
+                document.body.appendChild(el);
+                setTimeout(() => el.remove(), (dur+1)*1000);
+              }
+              // iniciar la lluvia
+              const rainInterval = setInterval(dropChar, 200);
+            </script>
+            """,
+            height=50
+        )
+
+def seccion_graficos(vistas, filtros, clave):
+    """
+    Gráficos principales: distribución, gastos/donaciones y actividad.
+    
+    Args:
+        vistas (dict): Vistas filtradas (obtener_vistas_filtradas)
+        filtros (dict): Filtros aplicados
+        clave (tuple): Clave de las figuras de esta vista
+    """
+    filtered_mascotas = vistas['mascotas']
+    col1, col2, col3 = st.columns([2.5, 3.75, 3.75])
+    
+    with col1:
+        st.markdown('<div class="content-card">', unsafe_allow_html=True)
+        st.subheader("Distribución por Tipo de Animal")
+        crear_grafico_distribucion_tipo(filtered_mascotas, clave)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown('<div class="content-card">', unsafe_allow_html=True)
+        st.subheader("Gastos y Donaciones")
+        crear_grafico_gastos_donaciones(vistas['balance'], clave)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown('<div class="content-card">', unsafe_allow_html=True)
+        st.subheader("Actividad")
+        crear_grafico_actividad(filtered_mascotas, filtros, clave)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+def seccion_adopcion(filtered_mascotas, df_mascotas, clave, version, tabla_colores=None):
+    """
+    Mapas de calor de tiempo de adopción.
+    
+    Args:
+        filtered_mascotas (pd.DataFrame): Mascotas filtradas
+        df_mascotas (pd.DataFrame): Todas las mascotas
+        clave (tuple): Clave de las figuras de esta vista
+        version (str): Versión de los datos
+        tabla_colores (pd.DataFrame): Composición de colores de pelo de todas las mascotas
+    """
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.header("Tiempo de adopcion por Tipo y Color")
+        crear_mapa_calor_adopcion(filtered_mascotas, clave, tabla_colores)
+        st.markdown('</div>', unsafe_allow_html=True)
+    with col2:
+        st.header("Tiempo de adopcion por Tipo y Edad")
+        # Usa todos los datos: la figura solo depende de la versión
+        crear_edad_tipo_adopcion(df_mascotas, clave_vista(version, {}))
+        st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def seccion_mapa(filtered_mascotas, densidad, filtros, clave):
+    """
+    Mapa de rescates, por ubicación o por densidad. Cambiar el modo solo
+    re-ejecuta esta sección.
+    
+    Args:
+        filtered_mascotas (pd.DataFrame): Mascotas filtradas
+        densidad (DensidadRescates): Conteos por celda y periodo
+        filtros (dict): Filtros aplicados
+        clave (tuple): Clave de cache de esta vista
+    """
+    st.markdown('<div class="content-card">', unsafe_allow_html=True)
+    st.header("🗺️ Mapa de Rescates")
+    modo = st.radio(
+        "Vista del mapa",
+        ["Ubicaciones", "Densidad"],
+        horizontal=True,
+        key="modo_mapa",
+        label_visibility="collapsed"
+    )
+    if modo == "Densidad":
+        crear_mapa_densidad(densidad, filtros, clave)
+    else:
+        crear_mapa_rescates(filtered_mascotas, clave)
+    st.markdown('</div>', unsafe_allow_html=True)
+
 def main():
     """
     Función principal que ejecuta el dashboard.
@@ -1581,10 +1667,20 @@ def main():
         st.markdown('<hr style="margin: 15px 0 15px 0; border-color: #ddd;">', unsafe_allow_html=True)
         st.header("📅 Período de tiempo")
         
-        # Cargar datos iniciales para establecer opciones de filtros
-        df_mascotas_init = cargar_datos("Datos")
-        df_mascotas_init = procesar_datos_mascotas(df_mascotas_init)
-        df_gastos_init = cargar_datos("Gastos")
+        # Conjunto de datos compartido (se refresca en segundo plano)
+        datos = obtener_datos()
+        hojas = datos.hojas
+
+        # Datos de mascotas procesados (solo se recalculan si cambia la hoja)
+        try:
+            df_mascotas_init = obtener_mascotas_procesadas(hojas["Datos"], datos.versiones["Datos"])
+        except Exception as e:
+            # El error no queda en cache: el próximo rerun vuelve a intentarlo.
+            # Se corta acá para no guardar en los demás caches vistas de datos vacíos.
+            st.error(f"Error al procesar datos de mascotas: {str(e)}")
+            st.stop()
+        # Composición de colores de pelo (una fila por color), junto con ColorPrincipal
+        tabla_colores = obtener_tabla_colores(df_mascotas_init, datos.versiones["Datos"])
       
         
         # Sección 1: Filtros principales (año y mes)
@@ -1606,7 +1702,7 @@ def main():
             )
             
             # Selector de mes (secundario, dependiente del año)
-            meses = ["Todos"] + [f"{i} - {calendar.month_name[i]}" for i in range(1, 13)]
+            meses = opciones_meses()
             mes_sel = st.selectbox(
                 "Mes",
                 meses,
@@ -1680,51 +1776,8 @@ def main():
         
         #st.markdown('<hr style="margin: 15px 0 15px 0; border-color: #ddd;">', unsafe_allow_html=True)
         
-        # Checkbox para activar la lluvia de animales
-        lluvia_animales = st.checkbox(
-            "🌧️ Lluvia de animales felices",
-            value=False,
-            key="rain_animals",
-            help="Activa una animación de lluvia de emojis de animales"
-        )
-        
-        if lluvia_animales:
-            # Inyecta el HTML+JS dentro de un iframe
-            html(
-                """
-                <style>
-                  .falling-animal {
-                    position: fixed;
-                    top: -40px;
-                    font-size: 2rem;
-                    pointer-events: none;
-                    user-select: none;
-                    animation: fall linear infinite;
-                  }
-                  @keyframes fall {
-                    to { transform: translateY(110vh) rotate(360deg); }
-                  }
-                </style>
-                <script>
-                  const chars = ["🐶","🐱","😺","🐕","🐈","🐾","🏠","💖"];
-                  function dropChar() {
-                    const c = chars[Math.floor(Math.random() * chars.length)];
-                    const el = document.createElement("div");
-                    el.textContent = c;
-                    el.className = "falling-animal";
-                    el.style.left = (Math.random()*100) + "vw";
-                    const dur = 3 + Math.random()*4;
-                    el.style.animationDuration = dur + "s";
-                    el.style.animationDelay = Math.random()*1 + "s";
-                    document.body.appendChild(el);
-                    setTimeout(() => el.remove(), (dur+1)*1000);
-                  }
-                  // iniciar la lluvia
-                  const rainInterval = setInterval(dropChar, 200);
-                </script>
-                """,
-                height=50
-            )
+        # Lluvia de animales (se re-ejecuta sola, sin recalcular el resto)
+        mostrar_lluvia_animales()
     
     # ---- PREPARAR DATOS FILTRADOS ----
     
@@ -1738,25 +1791,17 @@ def main():
         #,'mascota': mascota_sel,  # No convertir a None
         #'tipo_gasto': tipo_sel  # No convertir a None
     }
-    # Cargar y procesar datos completos
-    df_mascotas = cargar_datos("Datos")
-    df_gastos = cargar_datos("Gastos") 
-    df_donaciones = cargar_datos("Transaccion donaciones")
-    
-    # Procesar los datos
-    df_mascotas = procesar_datos_mascotas(df_mascotas)
+    # Datos completos (ya cargados y procesados junto con los filtros)
+    df_mascotas = df_mascotas_init
  
-    # Filtrar los datos según los filtros seleccionados
-    filtered_mascotas = filtrar_datos(df_mascotas, filtros)
-    filtered_gastos = filtrar_datos(df_gastos, filtros)
-    filtered_donaciones = filtrar_datos(df_donaciones, filtros)
+    # Filtrar los datos según los filtros seleccionados (en cache por selección)
+    vistas = obtener_vistas_filtradas(datos, df_mascotas, filtros)
+    filtered_mascotas = vistas['mascotas']
+    # Clave de las figuras de esta vista (datos + filtros)
+    clave = clave_vista(datos.version, filtros)
   
-    # Guardar en session_state para compartir entre páginas
-    st.session_state.df_gastos = df_gastos
-    st.session_state.df_donaciones = df_donaciones
-    st.session_state.df_mascotas = df_mascotas
-    st.session_state.filtered_df = filtered_gastos
-    st.session_state.filtered_don = filtered_donaciones
+    # Las páginas leen los mismos datos de obtener_datos(); en session_state
+    # solo quedan los filtros (claves de los widgets año_sel y mes_sel)
     
     # ---- CONTENIDO PRINCIPAL ----
     #mostrar_filtros_activos(filtros)
@@ -1764,49 +1809,20 @@ def main():
     # Contenedor único para métricas y mensajes de insights
     with st.container():
         # Sección 1: Métricas principales
-        crear_seccion_metricas(filtered_mascotas, filtered_gastos, filtered_donaciones, df_mascotas , df_gastos , df_donaciones ,filtros)    
+        crear_seccion_metricas(vistas['comparacion'])
+    # Cada sección recibe sus datos; la del mapa es un fragmento y se
+    # re-ejecuta sola cuando cambia su selector de modo
     # Sección 2: Gráficos principales (distribución, gastos/donaciones, y actividad)
-    col1, col2, col3 = st.columns([2.5, 3.75, 3.75])
-    
-    with col1:
-        st.markdown('<div class="content-card">', unsafe_allow_html=True)
-        st.subheader("Distribución por Tipo de Animal")
-        crear_grafico_distribucion_tipo(filtered_mascotas)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown('<div class="content-card">', unsafe_allow_html=True)
-        st.subheader("Gastos y Donaciones")
-        crear_grafico_gastos_donaciones(filtered_gastos, filtered_donaciones)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="content-card">', unsafe_allow_html=True)
-        st.subheader("Actividad")
-        crear_grafico_actividad(filtered_mascotas, filtros)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Sección 3: Mapa de calor de adopción
-        st.header("Tiempo de adopcion por Tipo y Color")
-        crear_mapa_calor_adopcion(filtered_mascotas)
-        st.markdown('</div>', unsafe_allow_html=True)
-    with col2:
-        st.header("Tiempo de adopcion por Tipo y Edad")
-        crear_edad_tipo_adopcion(df_mascotas)
-        st.markdown('</div>', unsafe_allow_html=True)
+    seccion_graficos(vistas, filtros, clave)
         
+    # Sección 3: Mapa de calor de adopción
+    seccion_adopcion(filtered_mascotas, df_mascotas, clave, datos.version, tabla_colores)
         
     # Sección 4: Mapa de rescates
-    st.markdown('<div class="content-card">', unsafe_allow_html=True)
-    st.header("🗺️ Mapa de Rescates")
-    crear_mapa_rescates(filtered_mascotas)
-    st.markdown('</div>', unsafe_allow_html=True)
+    seccion_mapa(filtered_mascotas, obtener_densidad_rescates(df_mascotas, datos.version), filtros, clave)
 
     #st.subheader("Resumen de Gastos y Donaciones")
-    detalle_gastos_donaciones(filtered_gastos, filtered_donaciones)
+    detalle_gastos_donaciones(vistas['balance'])
 
     
     # Footer con información y créditos
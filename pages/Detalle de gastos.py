@@ -3,20 +3,16 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-import calendar
-import locale
 import numpy as np
 import plotly.express as px
 import streamlit as st
-from utils.data_loader import cargar_datos
-# Configurar la localización para mostrar los meses en español
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_TIME, 'Spanish_Spain.1252')
-    except:
-        pass  # Si no se puede configurar la localización, usaremos la predeterminada
+from utils.refresco import obtener_datos
+from utils.esquema import a_pesos
+from utils.figuras import clave_vista, figura_en_cache
+from utils.pivotes import pivote_top
+from utils.grilla import mostrar_grilla
+from utils.periodos import MESES_CORTOS, nombre_mes, opciones_meses
+from utils.calendario import DIAS_SEMANA, etiquetas_mes, gasto_diario, matriz_año, matriz_mes
 
  
  # Estilizar la aplicación
@@ -68,10 +64,11 @@ st.markdown("""
 # Crear tu título personalizado donde desees
 st.markdown('<div class="custom-title">Gastos</div>', unsafe_allow_html=True)
  
-df_gastos = st.session_state.df_gastos
+# Datos compartidos por todas las sesiones (solo lectura); de la sesión solo se toman los filtros
+datos = obtener_datos()
+df_gastos = datos.hojas["Gastos"]
 año_sel = st.session_state.get("año_sel", "Todos")
 mes_sel = st.session_state.get("mes_sel", "Todos")
-df_gastos["MES_AÑO"] = df_gastos["Fecha"].dt.strftime("%b %Y")
  
 # Filtros laterales
 with st.sidebar:
@@ -105,7 +102,7 @@ with st.sidebar:
     
 
         # 3) Mes
-        meses = ["Todos"] + [f"{i} - {calendar.month_name[i]}" for i in range(1,13)]
+        meses = opciones_meses()
         default_mes_index = meses.index(mes_sel) if mes_sel in meses else 0
         mes_sel = st.selectbox(
             "Filtrar por mes",
@@ -131,7 +128,8 @@ with st.sidebar:
         tipo_sel    = st.selectbox("Filtrar por Tipo de Gasto", tipo_gastos, key="tipo_sel")
         
 # Aplicar filtros desde cero
-filtered_df = df_gastos.copy()
+# (sin copiar: cada filtro devuelve un DataFrame nuevo y el compartido no se modifica)
+filtered_df = df_gastos
 
 # Fecha
 filtered_df = filtered_df[
@@ -157,253 +155,286 @@ if mascota_sel != "Todas":
 if tipo_sel != "Todos":
     filtered_df = filtered_df[filtered_df['TIPO DE GASTO'] == tipo_sel]
 
-st.session_state.filtered_df = filtered_df
+# Montos en pesos para mostrar (en los datos cargados están en centavos)
+filtered_df = filtered_df.assign(Monto=a_pesos(filtered_df['Monto']))
+
+# Clave de cache de las figuras: versión de los datos + filtros de esta página
+filtros_pagina = {
+    "pagina": "gastos",
+    "fecha_inicio": start_date,
+    "fecha_fin": end_date,
+    "año": año_sel,
+    "mes": mes_sel,
+    "mascota": mascota_sel,
+    "tipo": tipo_sel,
+}
+version_datos = datos.version
+clave = clave_vista(version_datos, filtros_pagina) if version_datos else None
+
 # Columnas para los siguientes gráficos
 col1, col2 = st.columns(2)
 
 with col1:
     # Gráfico de gastos por Mascota (Top 10)
-    gastos_Mascota = filtered_df.groupby('MASCOTA').agg(
-        total_gastos=('Monto', 'sum'),
-        num_registros=('Monto', 'count')
-    ).reset_index().sort_values('total_gastos', ascending=False).head(10)
-    gastos_Mascota = gastos_Mascota.rename(columns={'MASCOTA': 'Mascota'})
-    fig_Mascotas = px.bar(
-        gastos_Mascota,
-        x='Mascota',
-        y='total_gastos',
-        color='total_gastos',
-        labels={'total_gastos': 'Gasto Total ($)', 'Mascota': 'MASCOTA'},
-        title='Top 10 Mascotas con Mayor Gasto',
-        template='plotly_white',
-        color_continuous_scale=px.colors.sequential.Blues
-    )
-    
-    fig_Mascotas.update_layout(coloraxis_showscale=False)
+    def construir_mascotas():
+        gastos_Mascota = filtered_df.groupby('MASCOTA', observed=True).agg(
+            total_gastos=('Monto', 'sum'),
+            num_registros=('Monto', 'count')
+        ).reset_index().sort_values('total_gastos', ascending=False).head(10)
+        gastos_Mascota = gastos_Mascota.rename(columns={'MASCOTA': 'Mascota'})
+        fig = px.bar(
+            gastos_Mascota,
+            x='Mascota',
+            y='total_gastos',
+            color='total_gastos',
+            labels={'total_gastos': 'Gasto Total ($)', 'Mascota': 'MASCOTA'},
+            title='Top 10 Mascotas con Mayor Gasto',
+            template='plotly_white',
+            color_continuous_scale=px.colors.sequential.Blues
+        )
+
+        fig.update_layout(coloraxis_showscale=False)
+        return fig, None
+
+    fig_Mascotas, _ = figura_en_cache('gastos_mascotas', clave, construir_mascotas)
     st.plotly_chart(fig_Mascotas, use_container_width=True)
 
 with col2:
     # Gráfico de distribución de gastos por tipo
-    gastos_tipo = filtered_df.groupby('TIPO DE GASTO').agg(
-        total_gastos=('Monto', 'sum')
-    ).reset_index().sort_values('total_gastos', ascending=False)
-    gastos_tipo = gastos_tipo.rename(columns={"TIPO DE GASTO": "Tipo de Gasto"})
-    fig_tipos = px.pie(
-        gastos_tipo,
-        values='total_gastos',
-        names='Tipo de Gasto',
-        title='Distribución de Gastos por Tipo',
-        template='plotly_white',
-        hole=0.4,
-        color_discrete_sequence=px.colors.sequential.Blues_r
-    )
-    
-    fig_tipos.update_traces(textposition='inside', textinfo='percent+label')
+    def construir_tipos():
+        gastos_tipo = filtered_df.groupby('TIPO DE GASTO', observed=True).agg(
+            total_gastos=('Monto', 'sum')
+        ).reset_index().sort_values('total_gastos', ascending=False)
+        gastos_tipo = gastos_tipo.rename(columns={"TIPO DE GASTO": "Tipo de Gasto"})
+        fig = px.pie(
+            gastos_tipo,
+            values='total_gastos',
+            names='Tipo de Gasto',
+            title='Distribución de Gastos por Tipo',
+            template='plotly_white',
+            hole=0.4,
+            color_discrete_sequence=px.colors.sequential.Blues_r
+        )
+
+        fig.update_traces(textposition='inside', textinfo='percent+label')
+        return fig, None
+
+    fig_tipos, _ = figura_en_cache('gastos_tipos', clave, construir_tipos)
     st.plotly_chart(fig_tipos, use_container_width=True)
 
 # Gastos por Proveedor
 st.header("🏥 Análisis por Proveedor")
 
-gastos_Proveedor = filtered_df.groupby('PROVEEDOR').agg(
-    total_gastos=('Monto', 'sum'),
-    num_registros=('Monto', 'count'),
-    promedio=('Monto', 'mean')
-).reset_index().rename(columns={'PROVEEDOR': 'Proveedor'}).sort_values('total_gastos', ascending=False)
+def top_proveedores():
+    return filtered_df.groupby('PROVEEDOR', observed=True).agg(
+        total_gastos=('Monto', 'sum'),
+        num_registros=('Monto', 'count'),
+        promedio=('Monto', 'mean')
+    ).reset_index().rename(columns={'PROVEEDOR': 'Proveedor'}).sort_values('total_gastos', ascending=False).head(10)
 
 col1, col2 = st.columns(2)
 
 with col1:
     # Top Proveedores por gasto total
-    fig_Proveedores = px.bar(
-        gastos_Proveedor.head(10),
-        x='Proveedor',
-        y='total_gastos',
-        color='total_gastos',
-        labels={'total_gastos': 'Gasto Total ($)', 'Proveedor': 'Proveedor'},
-        title='Top 10 Proveedores',
-        template='plotly_white',
-        color_continuous_scale=px.colors.sequential.Greens
-    )
-    
-    fig_Proveedores.update_layout(coloraxis_showscale=False)
+    def construir_proveedores():
+        fig = px.bar(
+            top_proveedores(),
+            x='Proveedor',
+            y='total_gastos',
+            color='total_gastos',
+            labels={'total_gastos': 'Gasto Total ($)', 'Proveedor': 'Proveedor'},
+            title='Top 10 Proveedores',
+            template='plotly_white',
+            color_continuous_scale=px.colors.sequential.Greens
+        )
+
+        fig.update_layout(coloraxis_showscale=False)
+        return fig, None
+
+    fig_Proveedores, _ = figura_en_cache('gastos_proveedores', clave, construir_proveedores)
     st.plotly_chart(fig_Proveedores, use_container_width=True)
 
 with col2:
     # Burbujas de Proveedores (tamaño = cantidad de visitas, color = gasto promedio)
-    fig_bubble = px.scatter(
-        gastos_Proveedor.head(10),
-        x='num_registros',
-        y='total_gastos',
-        size='promedio',
-        color='promedio',
-        hover_name='Proveedor',
-        labels={
-            'num_registros': 'Cantidad de Visitas',
-            'total_gastos': 'Gasto Total ($)',
-            'promedio': 'Gasto Promedio ($)'
-        },
-        title='Relación entre Visitas y Gastos por Proveedor',
-        template='plotly_white',
-        color_continuous_scale=px.colors.sequential.Greens
-    )
-    
+    def construir_burbujas():
+        fig = px.scatter(
+            top_proveedores(),
+            x='num_registros',
+            y='total_gastos',
+            size='promedio',
+            color='promedio',
+            hover_name='Proveedor',
+            labels={
+                'num_registros': 'Cantidad de Visitas',
+                'total_gastos': 'Gasto Total ($)',
+                'promedio': 'Gasto Promedio ($)'
+            },
+            title='Relación entre Visitas y Gastos por Proveedor',
+            template='plotly_white',
+            color_continuous_scale=px.colors.sequential.Greens
+        )
+        return fig, None
+
+    fig_bubble, _ = figura_en_cache('gastos_proveedores_burbujas', clave, construir_burbujas)
     st.plotly_chart(fig_bubble, use_container_width=True)
 
 
 # Calendario de gastos
 st.header("📅 Calendario de Gastos")
 
-# Seleccionar año y mes para el calendario
-col1, col2 = st.columns(2)
+@st.fragment
+def seccion_calendario(filtered_df, filtros_pagina, version_datos):
+    """Calendario de gastos; cambiar el año o mes del calendario solo re-ejecuta esta sección."""
+    vista = st.radio("Vista del calendario", ["Mes", "Año completo"], horizontal=True, key="vista_calendario")
 
-with col1:
-    año_calendario = st.selectbox(
-        "Año",
-        sorted(filtered_df['año'].unique()),
-        index=0
-    )
+    # Seleccionar año y mes para el calendario
+    col1, col2 = st.columns(2)
 
-with col2:
-    mes_calendario = st.selectbox(
-        "Mes",
-        [f"{i} - {calendar.month_name[i]}" for i in sorted(filtered_df[filtered_df['año'] == año_calendario]['mes'].unique())],
-        index=0
-    )
-
-mes_num_calendario = int(mes_calendario.split(" - ")[0])
-
-# Filtrar datos para el calendario
-df_calendario = filtered_df[(filtered_df['año'] == año_calendario) & (filtered_df['mes'] == mes_num_calendario)]
-
-# Obtener días del mes seleccionado
-año_mes = f"{año_calendario}-{mes_num_calendario:02d}"
-dias_mes = pd.date_range(
-    start=f"{año_mes}-01",
-    end=pd.Timestamp(f"{año_mes}-01") + pd.offsets.MonthEnd(),
-    freq='D'
-)
-
-# Crear DataFrame de todos los días
-dias_mes_df = pd.DataFrame({'fecha': dias_mes})
-dias_mes_df['dia'] = dias_mes_df['fecha'].dt.day
-
-# Añadir día a los registros filtrados
-df_calendario["dia"] = df_calendario["Fecha"].dt.day
-
-# Agrupar gastos por día
-gastos_diarios = (
-    df_calendario
-      .groupby('dia')
-      .agg(total_gastos=('Monto','sum'), num_registros=('Monto','count'))
-      .reset_index()
-)
-
-# Unir con todos los días del mes
-calendario_completo = dias_mes_df.merge(
-    gastos_diarios, on='dia', how='left'
-)
-calendario_completo['total_gastos'].fillna(0, inplace=True)
-calendario_completo['num_registros'].fillna(0, inplace=True)
-
-# Construir la matriz del calendario
-dia_semana_inicio = dias_mes[0].weekday()  # 0 = Lunes
-total_dias = len(dias_mes)
-semanas_necesarias = (dia_semana_inicio + total_dias + 6) // 7
-
-matriz_calendario = np.zeros((semanas_necesarias, 7), dtype=int)
-matriz_valores   = np.zeros((semanas_necesarias, 7))
-
-for i, dia in enumerate(range(1, total_dias + 1)):
-    fila    = (dia_semana_inicio + i) // 7
-    columna = (dia_semana_inicio + i) % 7
-    matriz_calendario[fila, columna] = dia
-    
-    gasto = calendario_completo.loc[
-        calendario_completo['dia']==dia, 'total_gastos'
-    ].values
-    if gasto.size:
-        matriz_valores[fila, columna] = gasto[0]
-
-# Dibujar heatmap tipo calendario
-dias_semana = ['Lun','Mar','Mié','Jue','Vie','Sáb','Dom']
-fig_calendario = go.Figure(
-    data=go.Heatmap(
-        z=matriz_valores,
-        text=[
-            [
-                f"{int(matriz_calendario[i,j])}<br>${matriz_valores[i,j]:,.0f}"
-                if matriz_calendario[i,j]!=0 else ""
-                for j in range(7)
-            ] for i in range(semanas_necesarias)
-        ],
-        x=dias_semana,
-        y=[f"Semana {i+1}" for i in range(semanas_necesarias)],
-        hoverongaps=False,
-        colorscale='Blues',
-        showscale=False,
-        texttemplate="%{text}",
-        textfont={"size":12}
-    )
-)
-
-fig_calendario.update_layout(
-    title=f"Calendario de Gastos - {calendar.month_name[mes_num_calendario]} {año_calendario}",
-    height=400,
-    template='plotly_white'
-)
-
-st.plotly_chart(fig_calendario, use_container_width=True)
+    with col1:
+        año_calendario = st.selectbox(
+            "Año",
+            sorted(filtered_df['año'].unique()),
+            index=0
+        )
+
+    if vista == "Mes":
+        with col2:
+            mes_calendario = st.selectbox(
+                "Mes",
+                [f"{i} - {nombre_mes(i)}" for i in sorted(filtered_df[filtered_df['año'] == año_calendario]['mes'].unique())],
+                index=0
+            )
+        mes_num_calendario = int(mes_calendario.split(" - ")[0])
+    else:
+        mes_num_calendario = None
+
+    def construir_calendario():
+        # Gasto de cada día del año: ambas vistas salen de este arreglo
+        diario = gasto_diario(filtered_df, año_calendario)
+
+        if mes_num_calendario is None:
+            fechas, valores, semanas_mes = matriz_año(diario, año_calendario)
+            fig = go.Figure(
+                data=go.Heatmap(
+                    z=valores,
+                    customdata=fechas,
+                    x=np.arange(valores.shape[1]),
+                    y=DIAS_SEMANA,
+                    hoverongaps=False,
+                    hovertemplate="%{customdata}<br>$%{z:,.0f}<extra></extra>",
+                    colorscale='Blues',
+                    showscale=False,
+                    xgap=2,
+                    ygap=2
+                )
+            )
+            fig.update_layout(
+                title=f"Calendario de Gastos - {año_calendario}",
+                height=300,
+                template='plotly_white',
+                xaxis=dict(
+                    tickvals=semanas_mes,
+                    ticktext=list(MESES_CORTOS),
+                    showgrid=False
+                ),
+                yaxis=dict(autorange='reversed', showgrid=False)
+            )
+            return fig, None
+
+        # Día y gasto de cada celda del mes (filas = semanas, columnas = Lun..Dom)
+        matriz_calendario, matriz_valores = matriz_mes(diario, año_calendario, mes_num_calendario)
+        semanas_necesarias = matriz_calendario.shape[0]
+
+        # Dibujar heatmap tipo calendario
+        fig = go.Figure(
+            data=go.Heatmap(
+                z=matriz_valores,
+                text=etiquetas_mes(matriz_calendario, matriz_valores),
+                x=DIAS_SEMANA,
+                y=[f"Semana {i+1}" for i in range(semanas_necesarias)],
+                hoverongaps=False,
+                colorscale='Blues',
+                showscale=False,
+                texttemplate="%{text}",
+                textfont={"size":12}
+            )
+        )
+
+        fig.update_layout(
+            title=f"Calendario de Gastos - {nombre_mes(mes_num_calendario)} {año_calendario}",
+            height=400,
+            template='plotly_white'
+        )
+        return fig, None
+
+    # El calendario depende además del año y mes elegidos arriba
+    clave_calendario = clave_vista(version_datos, {**filtros_pagina, "cal_año": año_calendario, "cal_mes": mes_num_calendario}) if version_datos else None
+    fig_calendario, _ = figura_en_cache('gastos_calendario', clave_calendario, construir_calendario)
+    st.plotly_chart(fig_calendario, use_container_width=True)
+
+seccion_calendario(filtered_df, filtros_pagina, version_datos)
 
 # Mapa de calor de Mascotas vs Tipo de Gasto
 st.header("🔍 Análisis Detallado")
  
-# 1) Pivot y reset_index para pasar Mascota a columna
-pivot_Mascota_tipo = pd.pivot_table(
-    filtered_df, 
-    values='Monto',
-    index='MASCOTA',
-    columns='TIPO DE GASTO',
-    aggfunc='sum',
-    fill_value=0
-).rename_axis(columns='Tipo de Gasto') \
- .reset_index() \
- .rename(columns={'MASCOTA': 'Mascota'})
-
-# 2) Top 10 mascotas
-top_Mascotas = (
-    filtered_df
-      .groupby('MASCOTA')['Monto']
-      .sum()
-      .nlargest(10)
-      .index
-)
-
-# 3) Filtrar usando isin en la columna Mascota
-pivot_filtrado = pivot_Mascota_tipo[
-    pivot_Mascota_tipo['Mascota'].isin(top_Mascotas)
-]
+# Categorías por las que se puede armar el top (columnas = Tipo de Gasto)
+CATEGORIAS_TOP = {
+    'MASCOTA': 'Mascota',
+    'PROVEEDOR': 'Proveedor',
+    'RESPONSABLE': 'Responsable',
+    'MEDIO DE PAGO': 'Medio de Pago',
+}
+
+@st.fragment
+def seccion_detalle(filtered_df, filtros_pagina, version_datos):
+    """Mapa de calor top N x Tipo de Gasto; cambiar la categoría o N solo re-ejecuta esta sección."""
+    col1, col2 = st.columns(2)
+    with col1:
+        categoria = st.selectbox(
+            "Top por",
+            [c for c in CATEGORIAS_TOP if c in filtered_df.columns],
+            format_func=CATEGORIAS_TOP.get,
+            key="top_categoria"
+        )
+    with col2:
+        top_n = st.slider("Cantidad", min_value=5, max_value=50, value=10, step=5, key="top_n")
+    etiqueta = CATEGORIAS_TOP[categoria]
+
+    def construir_heatmap():
+        # Solo las N categorías con mayor gasto se cruzan contra el tipo de gasto
+        pivot_top = pivote_top(filtered_df, categoria, 'TIPO DE GASTO', 'Monto', top_n)
+        pivot_top = pivot_top.rename_axis(index=etiqueta, columns='Tipo de Gasto')
+
+        fig = px.imshow(
+            pivot_top,
+            labels=dict(x="Tipo de Gasto", y=etiqueta, color="Monto ($)"),
+            title=f"Distribución de Gastos por {etiqueta} y Categoría (Top {top_n})",
+            color_continuous_scale='Blues',
+            aspect="auto",
+            text_auto='.0f'
+        )
+        return fig, None
+
+    clave_detalle = clave_vista(version_datos, {**filtros_pagina, "top_categoria": categoria, "top_n": top_n}) if version_datos else None
+    fig_heatmap, _ = figura_en_cache('gastos_top_tipo', clave_detalle, construir_heatmap)
+    st.plotly_chart(fig_heatmap, use_container_width=True)
 
-# 4) Graficar
-fig_heatmap = px.imshow(
-    pivot_filtrado.set_index('Mascota'),  # px.imshow quiere índice
-    labels=dict(x="Tipo de Gasto", y="Mascota", color="Monto ($)"),
-    title="Distribución de Gastos por Mascota y Categoría",
-    color_continuous_scale='Blues',
-    aspect="auto",
-    text_auto='.0f'
-)
-st.plotly_chart(fig_heatmap, use_container_width=True)
+seccion_detalle(filtered_df, filtros_pagina, version_datos)
 
 
 # Tabla de datos detallados
 st.header("📋 Registros Detallados")
 
 # Mostrar datos filtrados
-if st.checkbox("Mostrar tabla de datos detallados"):
-    print("gastos",filtered_df)
-    st.dataframe(
-        filtered_df.sort_values('Fecha', ascending=False)[
-            ['Fecha', 'MASCOTA', 'TIPO DE GASTO', 'PROVEEDOR', 'DETALLE', 'Monto', 'RESPONSABLE']
-        ].reset_index(drop=True),
-        height=400
-    )
\ No newline at end of file
+@st.fragment
+def tabla_detalle(filtered_df):
+    """Tabla de registros; mostrarla u ocultarla solo re-ejecuta esta sección."""
+    if st.checkbox("Mostrar tabla de datos detallados"):
+        # Solo la página visible se envía al navegador
+        mostrar_grilla(
+            filtered_df,
+            ['Fecha', 'MASCOTA', 'TIPO DE GASTO', 'PROVEEDOR', 'DETALLE', 'Monto', 'RESPONSABLE'],
+            key="grilla_gastos"
+        )
+
+tabla_detalle(filtered_df)
\ No newline at end of file
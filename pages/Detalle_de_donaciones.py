@@ -1,22 +1,16 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-import calendar
-import locale
 import numpy as np 
 import plotly.express as px
 import streamlit as st
+from utils.esquema import a_pesos
+from utils.refresco import obtener_datos
+from utils.figuras import clave_vista, figura_en_cache
+from utils.grilla import mostrar_grilla
+from utils.periodos import nombre_mes, opciones_meses
 
-# Configurar la localización para mostrar los meses en español
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_TIME, 'Spanish_Spain.1252')
-    except:
-        pass  # Si no se puede configurar la localización, usaremos la predeterminada
 
  
  # Estilizar la aplicación
@@ -68,11 +62,11 @@ st.markdown("""
 
 st.markdown('<div class="custom-title">Donaciones</div>', unsafe_allow_html=True)
  
-df_donaciones = st.session_state.df_donaciones
-filtered_don = st.session_state.filtered_don
+# Datos compartidos por todas las sesiones (solo lectura); de la sesión solo se toman los filtros
+datos = obtener_datos()
+df_donaciones = datos.hojas["Transaccion donaciones"]
 año_sel = st.session_state.get("año_sel", "Todos")
 mes_sel = st.session_state.get("mes_sel", "Todos")
-df_donaciones["MES_AÑO"] = df_donaciones["Fecha"].dt.strftime("%b %Y")
 # Filtros laterales
 with st.sidebar:
         st.header("Filtros")
@@ -105,7 +99,7 @@ with st.sidebar:
     
 
         # 3) Mes
-        meses = ["Todos"] + [f"{i} - {calendar.month_name[i]}" for i in range(1,13)]
+        meses = opciones_meses()
         default_mes_index = meses.index(mes_sel) if mes_sel in meses else 0
         mes_sel = st.selectbox(
             "Filtrar por mes",
@@ -126,7 +120,8 @@ with st.sidebar:
             medio_sel = "Todos"
 
 # AQUÍ ES DONDE APLICAMOS LOS FILTROS
-filtered_don = df_donaciones.copy()
+# (sin copiar: cada filtro devuelve un DataFrame nuevo y el compartido no se modifica)
+filtered_don = df_donaciones
 
 # Filtro de rango de fechas
 if start_date and end_date:
@@ -146,6 +141,21 @@ if mes_sel != "Todos":
 if medio_sel != "Todos" and 'MEDIO DE PAGO' in df_donaciones.columns:
     filtered_don = filtered_don[filtered_don['MEDIO DE PAGO'] == medio_sel]
 
+# Montos en pesos para mostrar (en los datos cargados están en centavos)
+filtered_don = filtered_don.assign(Monto=a_pesos(filtered_don['Monto']))
+
+# Clave de cache de las figuras: versión de los datos + filtros de esta página
+version_datos = datos.version
+clave = clave_vista(version_datos, {
+    "pagina": "donaciones",
+    "fecha_inicio": start_date,
+    "fecha_fin": end_date,
+    "año": año_sel,
+    "mes": mes_sel,
+    "medio": medio_sel,
+}) if version_datos else None
+# Las tendencias usan todas las donaciones: solo dependen de la versión
+clave_tendencias = clave_vista(version_datos, {"pagina": "donaciones"}) if version_datos else None
 
 # AHORA USAMOS FILTERED_DON PARA LAS MÉTRICAS
 if not filtered_don.empty:
@@ -197,77 +207,82 @@ else:
 col1, col2  = st.columns(2)
     
 with col1:
-    # Crea columna con nombre de mes y día para agrupaciones
-    filtered_don["NOMBRE_MES"] = filtered_don["Fecha"].dt.month_name(locale="es_ES")
-    filtered_don["día"] = filtered_don["Fecha"].dt.day
+    def construir_periodos():
+        # Crea columna de día para agrupaciones
+        df_periodos = filtered_don.assign(día=filtered_don["Fecha"].dt.day)
+
+        # Decide nivel de agregación según tus filtros
+        if año_sel == "Todos":
+            df_plot = (
+                df_periodos
+                .groupby("año")["Monto"]
+                .sum()
+                .reset_index()
+                .rename(columns={"año": "Periodo", "Monto": "Total Donaciones"})
+            )
+            # Convertir a string para categoría y ordenar
+            df_plot["Periodo"] = df_plot["Periodo"].astype(str)
+            custom_order = sorted(df_plot["Periodo"].unique(), reverse=True)
+            x = "Periodo"
+            title_txt = "Donaciones por Año"
+
+        elif mes_sel == "Todos":
+            # Agregar por mes del año seleccionado
+            df_plot = (
+                df_periodos
+                .groupby("mes")["Monto"]
+                .sum()
+                .reset_index()
+                .sort_values("mes")
+                .rename(columns={"Monto": "Total Donaciones"})
+            )
+            # Nombre del mes desde la tabla fija (sin depender del locale)
+            df_plot["Periodo"] = nombre_mes(df_plot["mes"])
+            x = "Periodo"
+            title_txt = f"Donaciones por Mes — {año_sel}"
+            custom_order = df_plot["Periodo"].tolist()  # Meses en orden de calendario
 
-    # Decide nivel de agregación según tus filtros
-    if año_sel == "Todos":
-        df_plot = (
-            filtered_don
-            .groupby("año")["Monto"]
-            .sum()
-            .reset_index()
-            .rename(columns={"año": "Periodo", "Monto": "Total Donaciones"})
-        )
-        # Convertir a string para categoría y ordenar
-        df_plot["Periodo"] = df_plot["Periodo"].astype(str)
-        custom_order = sorted(df_plot["Periodo"].unique(), reverse=True)
-        category_orders = {"Periodo": custom_order}
-        x = "Periodo"
-        title_txt = "Donaciones por Año"
-
-    elif mes_sel == "Todos":
-        # Agregar por mes del año seleccionado
-        df_plot = (
-            filtered_don
-            .groupby(["mes", "NOMBRE_MES"])["Monto"]
-            .sum()
-            .reset_index()
-            .sort_values("mes")
-            .rename(columns={"NOMBRE_MES": "Periodo", "Monto": "Total Donaciones"})
+        else:
+            mes_num = int(mes_sel.split(" - ")[0])
+            # Agregar por día del mes seleccionado
+            df_plot = (
+                df_periodos
+                .groupby("día")["Monto"]
+                .sum()
+                .reset_index()
+                .rename(columns={"día": "Periodo", "Monto": "Total Donaciones"})
+            )
+            x = "Periodo"
+            title_txt = f"Donaciones Diarias — {nombre_mes(mes_num)} {año_sel}"
+            custom_order = None  # No hay ordenamiento personalizado en este caso
+
+        category_orders = {"Periodo": custom_order} if custom_order else None
+
+        # Gráfico único de barras
+        fig = px.bar(
+            df_plot,
+            x=x,
+            y="Total Donaciones",
+            title=title_txt,
+            labels={"Total Donaciones": "Donaciones ($)", x: ""},
+            color="Total Donaciones",
+            color_continuous_scale="Viridis",
+            # Aplicar ordenamiento personalizado si existe
+            category_orders=category_orders
         )
-        x = "Periodo"
-        title_txt = f"Donaciones por Mes — {año_sel}"
-        custom_order = None  # No hay ordenamiento personalizado en este caso
 
-    else:
-        mes_num = int(mes_sel.split(" - ")[0])
-        # Agregar por día del mes seleccionado
-        df_plot = (
-            filtered_don
-            .groupby("día")["Monto"]
-            .sum()
-            .reset_index()
-            .rename(columns={"día": "Periodo", "Monto": "Total Donaciones"})
+        # Actualizar ejes y diseño
+        if custom_order:
+            fig.update_xaxes(categoryorder='array', categoryarray=custom_order)
+
+        fig.update_layout(
+            xaxis_tickangle=-45,
+            coloraxis_showscale=False,
+            template="plotly_white"
         )
-        x = "Periodo"
-        title_txt = f"Donaciones Diarias — {calendar.month_name[mes_num]} {año_sel}"
-        custom_order = None  # No hay ordenamiento personalizado en este caso
-
-    # Gráfico único de barras
-    fig = px.bar(
-        df_plot,
-        x=x,
-        y="Total Donaciones",
-        title=title_txt,
-        labels={"Total Donaciones": "Donaciones ($)", x: ""},
-        color="Total Donaciones",
-        color_continuous_scale="Viridis",
-        # Aplicar ordenamiento personalizado si existe
-        **({"category_orders": {"Periodo": custom_order}} if custom_order else {})
-    )
-
-    # Actualizar ejes y diseño
-    if custom_order:
-        fig.update_xaxes(categoryorder='array', categoryarray=custom_order)
-    
-    fig.update_layout(
-        xaxis_tickangle=-45,
-        coloraxis_showscale=False,
-        template="plotly_white"
-    )
+        return fig, None
 
+    fig, _ = figura_en_cache('donaciones_periodos', clave, construir_periodos)
     st.plotly_chart(fig, use_container_width=True)
 
     
@@ -291,19 +306,23 @@ with col2:
         top_donantes = df_donantes.head(10)
 
         # 2) Gráfico de barras
-        fig_donantes = px.bar(
-            top_donantes,
-            x='DONANTE',
-            y='total_donado',
-            title='🏆Top 10 Donantes',
-            labels={
-                'DONANTE': 'Donante',
-                'total_donado': 'Monto Total Donado'
-            },
-            color='total_donado',
-            color_continuous_scale='Viridis'
-        )
-        fig_donantes.update_layout(coloraxis_showscale=False, template='plotly_white')
+        def construir_donantes():
+            fig = px.bar(
+                top_donantes,
+                x='DONANTE',
+                y='total_donado',
+                title='🏆Top 10 Donantes',
+                labels={
+                    'DONANTE': 'Donante',
+                    'total_donado': 'Monto Total Donado'
+                },
+                color='total_donado',
+                color_continuous_scale='Viridis'
+            )
+            fig.update_layout(coloraxis_showscale=False, template='plotly_white')
+            return fig, None
+
+        fig_donantes, _ = figura_en_cache('donaciones_top_donantes', clave, construir_donantes)
         st.plotly_chart(fig_donantes, use_container_width=True)
 
     else:
@@ -335,57 +354,89 @@ st.info(
 st.header("Tendencias y Patrones")
         
 # Verificar si hay datos para el análisis de tendencias
-if 'MES_AÑO' in df_donaciones.columns and 'Monto' in df_donaciones.columns:
+if 'periodo_etiqueta' in df_donaciones.columns and 'Monto' in df_donaciones.columns:
     # Tendencia temporal de donaciones
-    df_tendencia = df_donaciones.groupby('MES_AÑO')['Monto'].sum().reset_index()
-    df_tendencia['MES_AÑO'] = pd.to_datetime(df_tendencia['MES_AÑO'])
-    df_tendencia = df_tendencia.sort_values('MES_AÑO')
-    
-    # Gráfico de línea para tendencia temporal
-    fig_tendencia = px.line(
-        df_tendencia,
-        x='MES_AÑO',
-        y='Monto',
-        title='Tendencia de Donaciones a lo Largo del Tiempo',
-        labels={'Monto': 'Monto Total', 'MES_AÑO': 'Fecha'},
-        markers=True
-    )
+    def construir_tendencia():
+        # Totales por periodo (aaaamm, en orden cronológico) con su etiqueta "Ene 2024"
+        df_tendencia = (
+            df_donaciones.groupby(['periodo', 'periodo_etiqueta'], observed=True)['Monto']
+            .sum()
+            .reset_index()
+        )
+        df_tendencia['Monto'] = a_pesos(df_tendencia['Monto'])
+
+        # Gráfico de línea para tendencia temporal
+        fig = px.line(
+            df_tendencia,
+            x='periodo_etiqueta',
+            y='Monto',
+            title='Tendencia de Donaciones a lo Largo del Tiempo',
+            labels={'Monto': 'Monto Total', 'periodo_etiqueta': 'Fecha'},
+            markers=True
+        )
+        return fig, None
+
+    fig_tendencia, _ = figura_en_cache('donaciones_tendencia', clave_tendencias, construir_tendencia)
     st.plotly_chart(fig_tendencia, use_container_width=True)
     
     # Análisis por medio de pago si está disponible
     if 'MEDIO DE PAGO' in df_donaciones.columns:
         st.subheader("Distribución por Medio de Pago")
-        df_medio_pago = df_donaciones.groupby('MEDIO DE PAGO')['Monto'].sum().reset_index()
-        df_medio_pago = df_medio_pago.sort_values('Monto', ascending=False)
-        
-        # Gráfico de pastel para medios de pago
-        fig_medio_pago = px.pie(
-            df_medio_pago,
-            values='Monto',
-            names='MEDIO DE PAGO',
-            title='Distribución de Donaciones por Medio de Pago'
-        )
+        def construir_medio_pago():
+            df_medio_pago = df_donaciones.groupby('MEDIO DE PAGO', observed=True)['Monto'].sum().reset_index()
+            df_medio_pago['Monto'] = a_pesos(df_medio_pago['Monto'])
+            df_medio_pago = df_medio_pago.sort_values('Monto', ascending=False)
+
+            # Gráfico de pastel para medios de pago
+            fig = px.pie(
+                df_medio_pago,
+                values='Monto',
+                names='MEDIO DE PAGO',
+                title='Distribución de Donaciones por Medio de Pago'
+            )
+            return fig, None
+
+        fig_medio_pago, _ = figura_en_cache('donaciones_medio_pago', clave_tendencias, construir_medio_pago)
         st.plotly_chart(fig_medio_pago, use_container_width=True)
     
     # Análisis por tipo de identificación si está disponible
     if 'TIPO DE IDENTIFICACIÓN DEL DONANTE' in df_donaciones.columns:
         st.subheader("Distribución por Tipo de Identificación")
-        df_tipo_id = df_donaciones.groupby('TIPO DE IDENTIFICACIÓN DEL DONANTE')['Monto'].sum().reset_index()
-        df_tipo_id = df_tipo_id.sort_values('Monto', ascending=False)
-        
-        # Gráfico de pastel para tipos de identificación
-        fig_tipo_id = px.pie(
-            df_tipo_id,
-            values='Monto',
-            names='TIPO DE IDENTIFICACIÓN DEL DONANTE',
-            title='Distribución de Donaciones por Tipo de Identificación'
-        )
+        def construir_tipo_id():
+            df_tipo_id = df_donaciones.groupby('TIPO DE IDENTIFICACIÓN DEL DONANTE', observed=True)['Monto'].sum().reset_index()
+            df_tipo_id['Monto'] = a_pesos(df_tipo_id['Monto'])
+            df_tipo_id = df_tipo_id.sort_values('Monto', ascending=False)
+
+            # Gráfico de pastel para tipos de identificación
+            fig = px.pie(
+                df_tipo_id,
+                values='Monto',
+                names='TIPO DE IDENTIFICACIÓN DEL DONANTE',
+                title='Distribución de Donaciones por Tipo de Identificación'
+            )
+            return fig, None
+
+        fig_tipo_id, _ = figura_en_cache('donaciones_tipo_id', clave_tendencias, construir_tipo_id)
         st.plotly_chart(fig_tipo_id, use_container_width=True)
 else:
     st.warning("No hay datos suficientes para análisis de tendencias.")
 
 
- 
+# Tabla de datos detallados
+st.header("📋 Registros Detallados")
+
+@st.fragment
+def tabla_detalle(filtered_don):
+    """Tabla de registros; mostrarla u ocultarla solo re-ejecuta esta sección."""
+    if st.checkbox("Mostrar tabla de donaciones detalladas"):
+        # Solo la página visible se envía al navegador
+        mostrar_grilla(
+            filtered_don,
+            ['Fecha', 'DONANTE', 'Monto', 'MEDIO DE PAGO', 'TIPO DE IDENTIFICACIÓN DEL DONANTE'],
+            key="grilla_donaciones"
+        )
+
+tabla_detalle(filtered_don)
 
 # Información al pie
 st.sidebar.markdown("---")
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from utils.agregados import CuboMetricas
+from utils.comparacion import comparar, variacion, ventana_desde_filtros
+
+
+def _registros(desde, hasta, monto=None):
+    fechas = pd.date_range(desde, hasta, freq="D")
+    df = pd.DataFrame({"Fecha": fechas})
+    if monto is not None:
+        df["Monto"] = np.full(len(fechas), monto, dtype=np.int64)
+    return df
+
+
+def _cubo():
+    # Cada hoja empieza en un día distinto, como en los datos reales
+    mascotas = _registros("2023-06-01", "2024-12-31")
+    mascotas["EstadoActual"] = np.where(np.arange(len(mascotas)) % 3 == 0, "Adoptado", "En tránsito")
+    gastos = _registros("2023-01-10", "2024-12-31", monto=1500)
+    donaciones = _registros("2023-02-01", "2024-12-31", monto=2000)
+    return CuboMetricas.construir(mascotas, gastos, donaciones)
+
+
+def test_todos_sin_variacion():
+    cubo = _cubo()
+    comparacion = comparar(cubo, ventana_desde_filtros({"año": "Todos", "mes": "Todos"}, cubo))
+
+    assert comparacion["anterior"] is None
+    assert "año_anterior" not in comparacion
+    assert not any(nombre.startswith("ultimos_") for nombre in comparacion)
+    for medida in ("rescates", "adopciones", "gastos_monto", "donaciones_monto"):
+        assert variacion(comparacion["actual"][medida], None) == (None, None)
+
+
+def test_base_incompleta_por_medida():
+    cubo = _cubo()
+    comparacion = comparar(cubo, ventana_desde_filtros({"año": 2023, "mes": "6 - Junio"}, cubo))
+
+    # Mayo de 2023: hay gastos y donaciones completos, pero todavía no hay mascotas
+    anterior = comparacion["anterior"]
+    assert anterior["rescates"] is None
+    assert anterior["adopciones"] is None
+    assert anterior["gastos_monto"] == 31 * 1500
+    assert anterior["donaciones_monto"] == 31 * 2000
+    assert comparacion["año_anterior"] is None
+
+
+def test_base_completa():
+    cubo = _cubo()
+    comparacion = comparar(cubo, ventana_desde_filtros({"año": 2024, "mes": "3 - Marzo"}, cubo))
+
+    assert comparacion["anterior"]["rescates"] == 29
+    assert comparacion["año_anterior"]["rescates"] is None
+    assert comparacion["año_anterior"]["gastos_monto"] == 31 * 1500
+    assert comparacion["ultimos_3"]["gastos_cantidad"] == (31 + 31 + 29) / 3
@@ -0,0 +1,132 @@
+# En utils/agregados.py
+"""
+Cubo de agregados para las métricas principales del dashboard.
+
+Se arma una vez por versión de los datos: una fila por día con actividad y
+una columna por medida (rescates, adopciones, cantidad y monto de gastos y de
+donaciones, montos en centavos). Con las sumas acumuladas de cada medida,
+el total de cualquier rango de días (un mes, un año, un rango de fechas) es
+una resta entre dos posiciones halladas por búsqueda binaria. Las ventanas y
+comparaciones entre períodos se arman en utils/comparacion.py.
+"""
+import numpy as np
+import pandas as pd
+
+MEDIDAS = (
+    "rescates",
+    "adopciones",
+    "gastos_cantidad",
+    "gastos_monto",
+    "donaciones_cantidad",
+    "donaciones_monto",
+)
+
+# Medida de conteo de la hoja de cada medida: su primer día con registros es
+# el inicio de la historia de la medida
+CONTEO_DE_MEDIDA = {
+    "rescates": "rescates",
+    "adopciones": "rescates",
+    "gastos_cantidad": "gastos_cantidad",
+    "gastos_monto": "gastos_cantidad",
+    "donaciones_cantidad": "donaciones_cantidad",
+    "donaciones_monto": "donaciones_cantidad",
+}
+
+
+def _dias(df: pd.DataFrame) -> np.ndarray:
+    """Días (datetime64[D]) de la columna Fecha, vacío si no existe."""
+    if df.empty or "Fecha" not in df.columns:
+        return np.array([], dtype="datetime64[D]")
+    return df["Fecha"].to_numpy().astype("datetime64[D]")
+
+
+class CuboMetricas:
+    """
+    Totales diarios de las medidas del dashboard con sumas acumuladas.
+
+    Args:
+        dias (np.ndarray): Días con actividad, ordenados y sin repetir (datetime64[D])
+        valores (dict): Medida -> np.ndarray int64 alineado con dias
+    """
+
+    def __init__(self, dias: np.ndarray, valores: dict):
+        self.dias = dias
+        self.valores = valores
+        # Primer día con registros de cada medida (NaT si su hoja está vacía)
+        self.primeros_dias = {}
+        for medida in MEDIDAS:
+            con_registros = np.flatnonzero(valores[CONTEO_DE_MEDIDA[medida]])
+            self.primeros_dias[medida] = (
+                dias[con_registros[0]] if len(con_registros) else np.datetime64("NaT", "D")
+            )
+        # Acumulados con una fila inicial en cero: suma de [i, j) = acumulado[j] - acumulado[i]
+        matriz = np.column_stack([valores[medida] for medida in MEDIDAS]).reshape(len(dias), len(MEDIDAS))
+        self._acumulados = np.vstack([
+            np.zeros((1, len(MEDIDAS)), dtype=np.int64),
+            np.cumsum(matriz, axis=0, dtype=np.int64),
+        ])
+
+    @classmethod
+    def construir(cls, df_mascotas: pd.DataFrame, df_gastos: pd.DataFrame,
+                  df_donaciones: pd.DataFrame) -> "CuboMetricas":
+        """
+        Arma el cubo a partir de los DataFrames completos.
+
+        Args:
+            df_mascotas (pd.DataFrame): Mascotas procesadas (Fecha, EstadoActual)
+            df_gastos (pd.DataFrame): Hoja Gastos (Fecha, Monto en centavos)
+            df_donaciones (pd.DataFrame): Hoja Transaccion donaciones (Fecha, Monto en centavos)
+
+        Returns:
+            CuboMetricas: Cubo listo para consultar
+        """
+        dias_mascotas = _dias(df_mascotas)
+        dias_gastos = _dias(df_gastos)
+        dias_donaciones = _dias(df_donaciones)
+        dias, inverso = np.unique(
+            np.concatenate([dias_mascotas, dias_gastos, dias_donaciones]), return_inverse=True
+        )
+        # Posición en el cubo de cada fila de cada DataFrame
+        cortes = np.cumsum([len(dias_mascotas), len(dias_gastos)])
+        pos_mascotas, pos_gastos, pos_donaciones = np.split(inverso, cortes)
+
+        def acumular(posiciones, pesos=None):
+            total = np.zeros(len(dias), dtype=np.int64)
+            np.add.at(total, posiciones, 1 if pesos is None else pesos)
+            return total
+
+        adoptados = np.zeros(len(pos_mascotas), dtype=bool)
+        if "EstadoActual" in df_mascotas.columns and len(pos_mascotas):
+            adoptados = (df_mascotas["EstadoActual"] == "Adoptado").to_numpy(dtype=bool)
+
+        def montos(df):
+            if "Monto" not in df.columns or df.empty:
+                return np.zeros(0, dtype=np.int64)
+            return df["Monto"].to_numpy(dtype=np.int64)
+
+        valores = {
+            "rescates": acumular(pos_mascotas),
+            "adopciones": acumular(pos_mascotas[adoptados]),
+            "gastos_cantidad": acumular(pos_gastos),
+            "gastos_monto": acumular(pos_gastos, montos(df_gastos)),
+            "donaciones_cantidad": acumular(pos_donaciones),
+            "donaciones_monto": acumular(pos_donaciones, montos(df_donaciones)),
+        }
+        return cls(dias, valores)
+
+    def totales_rangos(self, inicios, fines) -> np.ndarray:
+        """
+        Totales de muchos rangos de días en una sola operación.
+
+        Args:
+            inicios (array-like): Primer día de cada rango (datetime64)
+            fines (array-like): Día siguiente al último de cada rango (datetime64)
+
+        Returns:
+            np.ndarray: Matriz (rangos x MEDIDAS) de totales int64
+        """
+        inicios = np.asarray(inicios, dtype="datetime64[D]")
+        fines = np.asarray(fines, dtype="datetime64[D]")
+        pos_inicio = np.searchsorted(self.dias, inicios, side="left")
+        pos_fin = np.searchsorted(self.dias, fines, side="left")
+        return self._acumulados[pos_fin] - self._acumulados[pos_inicio]
@@ -0,0 +1,237 @@
+# En utils/backends.py
+"""
+Orígenes de datos para las hojas del dashboard.
+
+Todos los backends reciben rangos en notación A1 (como el values-batchGet de
+Google Sheets) y devuelven, para cada rango, la lista de filas con los valores
+formateados como texto.
+
+- ``gspread``: la planilla real (KEY_SHEET + credenciales de servicio).
+- ``local``: archivos CSV/XLSX con el mismo formato que las hojas "Datos",
+  "Gastos" y "Transaccion donaciones", con latencia artificial opcional.
+  Sirve para correr y medir todo el pipeline sin credenciales::
+
+      SHEETS_BACKEND=local SHEETS_LOCAL_DIR=datos_locales SHEETS_LATENCIA_MS=300 \
+          streamlit run Dashboard@101_rescataditos.py
+"""
+import csv
+import datetime
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from openpyxl import load_workbook
+import streamlit as st
+
+# Configuración por variables de entorno
+SHEETS_BACKEND = os.getenv("SHEETS_BACKEND", "gspread")
+SHEETS_LOCAL_DIR = os.getenv("SHEETS_LOCAL_DIR", "datos_locales")
+SHEETS_LATENCIA_MS = float(os.getenv("SHEETS_LATENCIA_MS", "0"))
+
+_PATRON_RANGO = re.compile(r"^'(?P<hoja>(?:[^']|'')+)'(?:!(?P<rango>.+))?$")
+_PATRON_FILAS = re.compile(r"^(?P<desde>\d+):(?P<hasta>\d+)$")
+_PATRON_CELDAS = re.compile(r"^(?P<col_desde>[A-Z]+)(?P<desde>\d+):(?P<col_hasta>[A-Z]+)(?P<hasta>\d*)$")
+
+
+class BackendHojas(ABC):
+    """
+    Interfaz común de los orígenes de datos.
+    """
+
+    @abstractmethod
+    def leer_rangos(self, rangos: list) -> list:
+        """
+        Lee varios rangos en una sola operación.
+
+        Args:
+            rangos (list): Rangos A1, por ejemplo "'Gastos'" o "'Gastos'!A10:K"
+
+        Returns:
+            list: Para cada rango, su lista de filas (listas de str)
+        """
+
+
+class BackendGspread(BackendHojas):
+    """
+    Lee la planilla de Google Sheets configurada en KEY_SHEET.
+    """
+
+    def __init__(self):
+        # Importaciones locales: el backend local no necesita estas dependencias
+        import gspread
+        from dotenv import load_dotenv
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        scopes = [
+            "https://spreadsheets.google.com/feeds",
+            "https://www.googleapis.com/auth/drive",
+        ]
+        # Detectar si se está ejecutando local o en la nube
+        running_local = os.path.exists(".env")
+
+        if running_local:
+            load_dotenv()
+            creds = ServiceAccountCredentials.from_json_keyfile_name("credenciales.json", scopes=scopes)
+        else:
+            json_creds = json.loads(os.getenv("GSHEET_CREDENTIALS"))
+            creds = ServiceAccountCredentials.from_json_keyfile_dict(json_creds, scopes=scopes)
+
+        gs_client = gspread.authorize(creds)
+
+        spreadsheet_key = os.getenv("KEY_SHEET")
+        self._spreadsheet = gs_client.open_by_key(spreadsheet_key)
+
+    def leer_rangos(self, rangos: list) -> list:
+        respuesta = self._spreadsheet.values_batch_get(rangos)
+        return [value_range.get("values", []) for value_range in respuesta.get("valueRanges", [])]
+
+
+def _indice_columna(letras: str) -> int:
+    """Convierte letras de columna A1 en índice base 0 ("A" -> 0, "AA" -> 26)."""
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + (ord(letra) - ord("A") + 1)
+    return indice - 1
+
+
+def letra_columna(indice: int) -> str:
+    """Convierte un índice de columna base 0 en letras A1 (0 -> "A", 26 -> "AA")."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(ord("A") + resto) + letras
+    return letras
+
+
+def _texto_celda(celda) -> str:
+    """
+    Texto de una celda de XLSX como lo muestra la planilla.
+
+    Las fechas salen "dd/mm/aaaa hh:mm:ss" si el formato de la celda incluye
+    la hora y "dd/mm/aaaa" si no; los números enteros, sin decimales.
+    """
+    valor = celda.value
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime.datetime):
+        con_hora = "h" in (celda.number_format or "").lower()
+        return valor.strftime("%d/%m/%Y %H:%M:%S" if con_hora else "%d/%m/%Y")
+    if isinstance(valor, datetime.date):
+        return valor.strftime("%d/%m/%Y")
+    if isinstance(valor, bool):
+        return "TRUE" if valor else "FALSE"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _recortar_vacias(filas: list) -> list:
+    """Quita celdas y filas vacías al final, igual que la API de Sheets."""
+    recortadas = []
+    for fila in filas:
+        fila = list(fila)
+        while fila and fila[-1] == "":
+            fila.pop()
+        recortadas.append(fila)
+    while recortadas and not recortadas[-1]:
+        recortadas.pop()
+    return recortadas
+
+
+class BackendLocal(BackendHojas):
+    """
+    Lee hojas desde archivos "<nombre de hoja>.csv" o ".xlsx" en un directorio.
+
+    Los valores se leen como texto, con el mismo formato que muestra la
+    planilla (por ejemplo, fechas "dd/mm/aaaa hh:mm:ss"). En los CSV el texto
+    se toma tal cual; en los XLSX se lee la primera hoja y las fechas se
+    formatean según el formato de cada celda (ver _texto_celda).
+
+    Args:
+        directorio (str): Carpeta con un archivo por hoja
+        latencia_ms (float): Demora simulada por cada lectura (ida y vuelta)
+    """
+
+    def __init__(self, directorio=SHEETS_LOCAL_DIR, latencia_ms=SHEETS_LATENCIA_MS):
+        self.directorio = directorio
+        self.latencia_ms = latencia_ms
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _ruta_hoja(self, hoja: str) -> str:
+        for extension in (".csv", ".xlsx"):
+            ruta = os.path.join(self.directorio, f"{hoja}{extension}")
+            if os.path.exists(ruta):
+                return ruta
+        raise FileNotFoundError(f"No hay archivo para la hoja '{hoja}' en {self.directorio}")
+
+    def _leer_hoja(self, hoja: str) -> list:
+        """Filas completas de una hoja, releyendo el archivo solo si cambió."""
+        ruta = self._ruta_hoja(hoja)
+        modificado = os.path.getmtime(ruta)
+        with self._lock:
+            en_cache = self._cache.get(ruta)
+            if en_cache and en_cache[0] == modificado:
+                return en_cache[1]
+
+        if ruta.endswith(".csv"):
+            with open(ruta, newline="", encoding="utf-8") as archivo:
+                filas = [fila for fila in csv.reader(archivo)]
+        else:
+            libro = load_workbook(ruta, read_only=True, data_only=True)
+            try:
+                filas = [[_texto_celda(celda) for celda in fila] for fila in libro.worksheets[0].iter_rows()]
+            finally:
+                libro.close()
+        filas = _recortar_vacias(filas)
+
+        with self._lock:
+            self._cache[ruta] = (modificado, filas)
+        return filas
+
+    def _leer_rango(self, rango: str) -> list:
+        coincidencia = _PATRON_RANGO.match(rango)
+        if not coincidencia:
+            raise ValueError(f"Rango no soportado: {rango}")
+        filas = self._leer_hoja(coincidencia.group("hoja").replace("''", "'"))
+        celdas = coincidencia.group("rango")
+        if celdas is None:
+            return filas
+
+        solo_filas = _PATRON_FILAS.match(celdas)
+        if solo_filas:
+            return filas[int(solo_filas.group("desde")) - 1:int(solo_filas.group("hasta"))]
+
+        por_celdas = _PATRON_CELDAS.match(celdas)
+        if not por_celdas:
+            raise ValueError(f"Rango no soportado: {rango}")
+        hasta = int(por_celdas.group("hasta")) if por_celdas.group("hasta") else None
+        col_desde = _indice_columna(por_celdas.group("col_desde"))
+        col_hasta = _indice_columna(por_celdas.group("col_hasta")) + 1
+        seleccion = filas[int(por_celdas.group("desde")) - 1:hasta]
+        return _recortar_vacias([fila[col_desde:col_hasta] for fila in seleccion])
+
+    def leer_rangos(self, rangos: list) -> list:
+        # Una sola demora por llamada, como un batchGet real
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+        return [self._leer_rango(rango) for rango in rangos]
+
+
+@st.cache_resource
+def obtener_backend() -> BackendHojas:
+    """
+    Crea el backend configurado en SHEETS_BACKEND una vez por proceso.
+
+    Returns:
+        BackendHojas: Backend "gspread" (por defecto) o "local"
+    """
+    if SHEETS_BACKEND == "local":
+        return BackendLocal()
+    if SHEETS_BACKEND == "gspread":
+        return BackendGspread()
+    raise ValueError(f"SHEETS_BACKEND desconocido: {SHEETS_BACKEND}")
@@ -0,0 +1,58 @@
+# En utils/balance.py
+"""
+Balance mensual de gastos y donaciones.
+
+Una sola agregación por periodo (aaaamm entero) que comparten el gráfico de
+gastos vs. donaciones y la tabla de resumen.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _por_periodo(df: pd.DataFrame) -> pd.DataFrame:
+    """Suma (centavos), cantidad de Monto y etiqueta por periodo."""
+    if df.empty or not {"Monto", "periodo", "periodo_etiqueta"} <= set(df.columns):
+        return pd.DataFrame({
+            "periodo_etiqueta": pd.Series(dtype=object),
+            "sum": pd.Series(dtype="int64"),
+            "count": pd.Series(dtype="int64"),
+        })
+    # La etiqueta depende solo del periodo: agruparla no agrega grupos
+    return (
+        df.groupby(["periodo", "periodo_etiqueta"], sort=True, observed=True)["Monto"]
+        .agg(["sum", "count"])
+        .reset_index("periodo_etiqueta")
+    )
+
+
+def balance_mensual(df_gastos: pd.DataFrame, df_donaciones: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totales mensuales de gastos y donaciones.
+
+    Args:
+        df_gastos (pd.DataFrame): Gastos (filtrados o completos)
+        df_donaciones (pd.DataFrame): Donaciones (filtradas o completas)
+
+    Returns:
+        pd.DataFrame: Índice periodo (aaaamm, ascendente) y columnas fecha
+            (primer día del mes), etiqueta ("Ene 2024", de periodo_etiqueta),
+            gastos, num_gastos, donaciones y num_donaciones. Montos en centavos; un mes sin registros de un
+            lado tiene monto y cantidad 0 de ese lado.
+    """
+    gastos = _por_periodo(df_gastos)
+    donaciones = _por_periodo(df_donaciones)
+    periodos = np.union1d(gastos.index.to_numpy(), donaciones.index.to_numpy()).astype(np.int32)
+
+    indice = pd.Index(periodos, name="periodo")
+    etiquetas = pd.concat([gastos["periodo_etiqueta"], donaciones["periodo_etiqueta"]]).astype(object)
+    etiquetas = etiquetas[~etiquetas.index.duplicated()].reindex(indice)
+    gastos = gastos[["sum", "count"]].reindex(indice, fill_value=0)
+    donaciones = donaciones[["sum", "count"]].reindex(indice, fill_value=0)
+    return pd.DataFrame({
+        "fecha": pd.to_datetime({"year": periodos // 100, "month": periodos % 100, "day": 1}).to_numpy(),
+        "etiqueta": etiquetas.to_numpy(),
+        "gastos": gastos["sum"].to_numpy(dtype=np.int64),
+        "num_gastos": gastos["count"].to_numpy(dtype=np.int64),
+        "donaciones": donaciones["sum"].to_numpy(dtype=np.int64),
+        "num_donaciones": donaciones["count"].to_numpy(dtype=np.int64),
+    }, index=indice)
@@ -0,0 +1,113 @@
+# En utils/calendario.py
+"""
+Matrices para los calendarios de gastos.
+
+El gasto de un año se resume en un arreglo diario (un valor por día del
+año, armado con np.bincount). Los calendarios se arman ubicando cada día en
+su celda con aritmética de posiciones y un reshape: la vista mensual es una
+matriz semanas x 7 y la vista anual una matriz 7 x semanas, ambas sacadas
+del mismo arreglo sin recorrer días ni meses en Python.
+"""
+import numpy as np
+import pandas as pd
+
+DIAS_SEMANA = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
+
+
+def gasto_diario(df: pd.DataFrame, año: int) -> np.ndarray:
+    """
+    Gasto total de cada día de un año.
+
+    Args:
+        df (pd.DataFrame): Gastos con Fecha y Monto
+        año (int): Año a resumir
+
+    Returns:
+        np.ndarray: Arreglo float de largo 365/366; posición 0 = 1 de enero
+    """
+    inicio = np.datetime64(f"{int(año)}-01-01", "D")
+    dias_año = (np.datetime64(f"{int(año) + 1}-01-01", "D") - inicio).astype(int)
+    fechas = df['Fecha'].to_numpy().astype("datetime64[D]")
+    posiciones = (fechas - inicio).astype(np.int64)
+    en_año = (posiciones >= 0) & (posiciones < dias_año)
+    return np.bincount(
+        posiciones[en_año],
+        weights=df['Monto'].to_numpy(dtype=float)[en_año],
+        minlength=dias_año,
+    )
+
+
+def matriz_mes(diario: np.ndarray, año: int, mes: int) -> tuple:
+    """
+    Calendario de un mes (filas = semanas, columnas = Lun..Dom).
+
+    Args:
+        diario (np.ndarray): Salida de gasto_diario para el año
+        año (int): Año
+        mes (int): Mes (1-12)
+
+    Returns:
+        tuple: (días, valores) como matrices semanas x 7; las celdas fuera
+            del mes tienen día 0 y valor 0
+    """
+    primero = pd.Timestamp(int(año), int(mes), 1)
+    desde = primero.dayofyear - 1
+    dias_mes = primero.days_in_month
+    desfase = primero.weekday()  # 0 = Lunes
+    semanas = (desfase + dias_mes + 6) // 7
+
+    dias = np.zeros(semanas * 7, dtype=int)
+    valores = np.zeros(semanas * 7)
+    celdas = desfase + np.arange(dias_mes)
+    dias[celdas] = np.arange(1, dias_mes + 1)
+    valores[celdas] = diario[desde:desde + dias_mes]
+    return dias.reshape(semanas, 7), valores.reshape(semanas, 7)
+
+
+def matriz_año(diario: np.ndarray, año: int) -> tuple:
+    """
+    Calendario de un año completo (filas = Lun..Dom, columnas = semanas).
+
+    Args:
+        diario (np.ndarray): Salida de gasto_diario para el año
+        año (int): Año
+
+    Returns:
+        tuple: (fechas, valores, semanas_mes) donde fechas es una matriz 7 x
+            semanas de textos dd/mm ("" fuera del año), valores la matriz de
+            gasto (NaN fuera del año) y semanas_mes la columna donde empieza
+            cada mes
+    """
+    inicio = pd.Timestamp(int(año), 1, 1)
+    desfase = inicio.weekday()
+    celdas = desfase + np.arange(len(diario))
+    semanas = (desfase + len(diario) + 6) // 7
+
+    valores = np.full(semanas * 7, np.nan)
+    fechas = np.full(semanas * 7, "", dtype=object)
+    dias = pd.date_range(inicio, periods=len(diario), freq='D')
+    # Celda en orden semana-mayor y traspuesta: filas = día de la semana
+    valores[celdas] = diario
+    fechas[celdas] = dias.strftime('%d/%m').to_numpy()
+    primeros = dias.is_month_start
+    return (
+        fechas.reshape(semanas, 7).T,
+        valores.reshape(semanas, 7).T,
+        celdas[primeros] // 7,
+    )
+
+
+def etiquetas_mes(dias: np.ndarray, valores: np.ndarray) -> np.ndarray:
+    """
+    Texto de cada celda del calendario mensual: día y gasto.
+
+    Args:
+        dias (np.ndarray): Matriz de días (0 = celda vacía)
+        valores (np.ndarray): Matriz de gastos
+
+    Returns:
+        np.ndarray: Matriz de textos del mismo tamaño
+    """
+    montos = np.vectorize('{:,.0f}'.format, otypes=[object])(valores)
+    textos = dias.astype(str).astype(object) + "<br>$" + montos
+    return np.where(dias != 0, textos, "")
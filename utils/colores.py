@@ -0,0 +1,131 @@
+# En utils/colores.py
+"""
+Interpretación de la columna "Color de pelo".
+
+Los valores llegan como texto simple ("negro") o como JSON con porcentajes
+('[{"color": "negro", "porcentaje": 70}, ...]'). Cada texto distinto se
+interpreta una sola vez: las filas se agrupan con pd.factorize y el resultado
+de cada valor único queda memorizado entre cargas.
+"""
+import json
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+SIN_COLOR = "No especificado"
+
+
+@lru_cache(maxsize=4096)
+def _parsear_color(texto: str) -> tuple:
+    """
+    Interpreta un valor de color de pelo.
+
+    Args:
+        texto (str): Valor crudo de la celda
+
+    Returns:
+        tuple: (color principal, ((color, porcentaje), ...))
+    """
+    if texto == "":
+        return SIN_COLOR, ()
+
+    # Si es un string simple
+    if "[" not in texto and "{" not in texto:
+        return texto, ((texto, 100.0),)
+
+    # Si es un JSON como string
+    try:
+        colores = json.loads(texto.replace("'", "\""))
+    except (json.JSONDecodeError, TypeError):
+        return SIN_COLOR, ()
+    if not isinstance(colores, list) or not colores:
+        return texto, ()
+
+    try:
+        pares = tuple(
+            (str(c.get("color", SIN_COLOR)), float(c.get("porcentaje", 0) or 0))
+            for c in colores
+        )
+    except (AttributeError, TypeError, ValueError):
+        return SIN_COLOR, ()
+    # Tomar el color con mayor porcentaje
+    principal = max(pares, key=lambda par: par[1])[0]
+    return principal, pares
+
+
+def color_principal(serie: pd.Series) -> pd.Series:
+    """
+    Color principal de cada fila.
+
+    Args:
+        serie (pd.Series): Columna ColorPelo
+
+    Returns:
+        pd.Series: Color principal (categórica), con el mismo índice
+    """
+    codigos, unicos = pd.factorize(serie)
+    principales = [_parsear_color(str(valor))[0] for valor in unicos] + [SIN_COLOR]
+    # Los nulos quedan con código -1, que apunta al SIN_COLOR agregado al final
+    categorias, codigos_color = np.unique(np.array(principales, dtype=object), return_inverse=True)
+    return pd.Series(
+        pd.Categorical.from_codes(codigos_color[codigos], categories=categorias),
+        index=serie.index,
+        name="ColorPrincipal",
+    )
+
+
+def tabla_porcentajes(serie: pd.Series) -> pd.DataFrame:
+    """
+    Tabla larga con todos los colores de cada fila y su porcentaje.
+
+    Args:
+        serie (pd.Series): Columna ColorPelo
+
+    Returns:
+        pd.DataFrame: Columnas fila (índice de la serie), color y porcentaje
+    """
+    codigos, unicos = pd.factorize(serie)
+    pares = [_parsear_color(str(valor))[1] for valor in unicos] + [()]
+
+    # Pares de todos los valores únicos aplanados, con el rango de cada uno
+    cantidades = np.array([len(p) for p in pares], dtype=np.int64)
+    inicios = np.concatenate(([0], np.cumsum(cantidades)[:-1]))
+    colores = np.array([c for p in pares for c, _ in p], dtype=object)
+    porcentajes = np.array([pct for p in pares for _, pct in p], dtype=float)
+
+    # Expandir a nivel fila sin bucles: cada fila repite los pares de su valor
+    por_fila = cantidades[codigos]
+    total = int(por_fila.sum())
+    filas = np.repeat(np.arange(len(serie)), por_fila)
+    desplazamiento = np.arange(total) - np.repeat(np.cumsum(por_fila) - por_fila, por_fila)
+    posiciones = np.repeat(inicios[codigos], por_fila) + desplazamiento
+
+    return pd.DataFrame({
+        "fila": serie.index.to_numpy()[filas],
+        "color": colores[posiciones] if total else np.array([], dtype=object),
+        "porcentaje": porcentajes[posiciones] if total else np.array([], dtype=float),
+    })
+
+
+def composicion(tabla: pd.DataFrame, filas) -> pd.Series:
+    """
+    Participación de cada color en un subconjunto de filas, ponderada por
+    los porcentajes de cada animal (un animal 70% negro y 30% blanco suma
+    0,7 a negro y 0,3 a blanco).
+
+    Args:
+        tabla (pd.DataFrame): Salida de tabla_porcentajes
+        filas (pd.Index): Índices de las filas a considerar
+
+    Returns:
+        pd.Series: Color -> porcentaje del total (0-100), de mayor a menor
+    """
+    seleccion = tabla[tabla["fila"].isin(filas)]
+    if seleccion.empty:
+        return pd.Series(dtype=float, name="porcentaje")
+    # Cada animal pesa 1 aunque sus porcentajes no sumen exactamente 100
+    totales_fila = seleccion.groupby("fila")["porcentaje"].transform("sum")
+    pesos = seleccion["porcentaje"] / totales_fila.where(totales_fila > 0)
+    por_color = pesos.groupby(seleccion["color"].to_numpy()).sum()
+    return (por_color / por_color.sum() * 100).sort_values(ascending=False).rename("porcentaje")
@@ -0,0 +1,194 @@
+# En utils/comparacion.py
+"""
+Comparaciones de un período contra sus líneas de base.
+
+Una ventana de tiempo (la del filtro actual) se compara contra:
+
+- ``anterior``: la ventana inmediatamente anterior del mismo largo
+  (mes anterior, año anterior o rango de días anterior).
+- ``año_anterior``: la misma ventana un año antes.
+- ``ultimos_n``: el promedio de los N meses previos, escalado al largo de
+  la ventana.
+
+Una línea de base solo se compara si está completa: para cada medida, si
+empieza antes del primer día con registros de esa medida su total queda en
+None (no hay historia suficiente), y una ventana que abarca toda la historia
+no tiene año anterior ni promedio móvil.
+
+Todas las ventanas se expresan como rangos de días y se resuelven juntas con
+una sola consulta al cubo de agregados (CuboMetricas.totales_rangos).
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.agregados import MEDIDAS
+
+# Meses del promedio móvil usado como línea de base
+MESES_TENDENCIA = 3
+
+
+@dataclass(frozen=True)
+class Ventana:
+    """
+    Conjunto de rangos de días [inicio, fin) que forman un período.
+
+    Args:
+        rangos (tuple): ((inicio, fin), ...) como pd.Timestamp, fin exclusivo
+        meses (int): Largo en meses de cada rango si está alineado a meses, o None
+    """
+    rangos: tuple
+    meses: int = None
+
+    @property
+    def dias(self) -> int:
+        return sum((fin - inicio).days for inicio, fin in self.rangos)
+
+    def desplazar(self, meses: int = 0, dias: int = 0) -> "Ventana":
+        """Devuelve la ventana movida la cantidad de meses o días indicada."""
+        desplazamiento = pd.DateOffset(months=meses) if meses else pd.Timedelta(days=dias)
+        return Ventana(
+            tuple((inicio + desplazamiento, fin + desplazamiento) for inicio, fin in self.rangos),
+            self.meses,
+        )
+
+
+def ventana_desde_filtros(filtros: dict, cubo) -> Ventana:
+    """
+    Traduce los filtros de período del dashboard a una ventana, con las
+    mismas reglas que filtrar_datos.
+
+    Args:
+        filtros (dict): Filtros con año, mes, fecha_inicio y fecha_fin
+        cubo (CuboMetricas): Cubo de agregados (para acotar "Todos")
+
+    Returns:
+        Ventana: Ventana del filtro
+    """
+    año = filtros.get("año", "Todos")
+    mes = filtros.get("mes", "Todos")
+    mes_num = int(mes.split(" - ")[0]) if mes != "Todos" else None
+
+    if año != "Todos" and mes_num is not None:
+        inicio = pd.Timestamp(int(año), mes_num, 1)
+        return Ventana(((inicio, inicio + pd.DateOffset(months=1)),), meses=1)
+    if año != "Todos":
+        inicio = pd.Timestamp(int(año), 1, 1)
+        return Ventana(((inicio, inicio + pd.DateOffset(years=1)),), meses=12)
+
+    if len(cubo.dias):
+        primero, ultimo = pd.Timestamp(cubo.dias[0]), pd.Timestamp(cubo.dias[-1])
+    else:
+        primero = ultimo = pd.Timestamp.now().normalize()
+    if mes_num is not None:
+        # Un rango por cada año con datos
+        rangos = tuple(
+            (pd.Timestamp(a, mes_num, 1), pd.Timestamp(a, mes_num, 1) + pd.DateOffset(months=1))
+            for a in range(primero.year, ultimo.year + 1)
+        )
+        return Ventana(rangos, meses=1)
+    if "fecha_inicio" in filtros and "fecha_fin" in filtros:
+        return Ventana(((pd.Timestamp(filtros["fecha_inicio"]),
+                         pd.Timestamp(filtros["fecha_fin"]) + pd.Timedelta(days=1)),))
+    return Ventana(((primero, ultimo + pd.Timedelta(days=1)),))
+
+
+def lineas_de_base(ventana: Ventana, meses_tendencia: int = MESES_TENDENCIA, dias=None) -> dict:
+    """
+    Ventanas de comparación de una ventana.
+
+    Args:
+        ventana (Ventana): Ventana actual
+        meses_tendencia (int): Meses del promedio móvil
+        dias (np.ndarray): Días con datos, ordenados (CuboMetricas.dias); si
+            la ventana los abarca a todos solo se arma "anterior"
+
+    Returns:
+        dict: Nombre -> (Ventana, factor de escala)
+    """
+    bases = {}
+    if ventana.meses:
+        bases["anterior"] = (ventana.desplazar(meses=-ventana.meses), 1.0)
+    else:
+        bases["anterior"] = (ventana.desplazar(dias=-ventana.dias), 1.0)
+
+    # Año anterior y promedio móvil solo tienen sentido para ventanas contiguas
+    # que no cubren toda la historia (si no, se superponen con la actual)
+    inicio, fin = ventana.rangos[0][0], ventana.rangos[-1][1]
+    toda_la_historia = (
+        dias is not None and len(dias) > 0
+        and inicio.to_datetime64() <= dias[0] and fin.to_datetime64() > dias[-1]
+    )
+    if len(ventana.rangos) == 1 and not toda_la_historia:
+        bases["año_anterior"] = (ventana.desplazar(meses=-12), 1.0)
+        previa = Ventana(((inicio - pd.DateOffset(months=meses_tendencia), inicio),), meses=meses_tendencia)
+        escala = ventana.meses / meses_tendencia if ventana.meses else ventana.dias / max(previa.dias, 1)
+        bases[f"ultimos_{meses_tendencia}"] = (previa, escala)
+    return bases
+
+
+def comparar(cubo, ventana: Ventana, meses_tendencia: int = MESES_TENDENCIA) -> dict:
+    """
+    Totales de la ventana y de todas sus líneas de base en una sola pasada.
+
+    Para cada medida, el total de una línea de base queda en None si la
+    línea empieza antes del primer día con registros de esa medida (la
+    comparación sería contra un período incompleto); si no queda ninguna
+    medida, la línea de base entera es None.
+
+    Args:
+        cubo (CuboMetricas): Cubo de agregados
+        ventana (Ventana): Ventana actual
+        meses_tendencia (int): Meses del promedio móvil
+
+    Returns:
+        dict: "actual" y cada línea de base -> dict medida -> total (o None),
+            o None si la línea de base no tiene ninguna medida completa
+    """
+    ventanas = {"actual": (ventana, 1.0), **lineas_de_base(ventana, meses_tendencia, cubo.dias)}
+
+    # Todos los rangos juntos, con el índice de la ventana a la que pertenecen
+    grupos, inicios, fines = [], [], []
+    for indice, (v, _) in enumerate(ventanas.values()):
+        for inicio, fin in v.rangos:
+            grupos.append(indice)
+            inicios.append(inicio.to_datetime64())
+            fines.append(fin.to_datetime64())
+    totales_rangos = cubo.totales_rangos(inicios, fines)
+    totales = np.zeros((len(ventanas), len(MEDIDAS)), dtype=np.int64)
+    np.add.at(totales, np.array(grupos), totales_rangos)
+
+    resultado = {}
+    for indice, (nombre, (v, escala)) in enumerate(ventanas.items()):
+        inicio = min(i for i, _ in v.rangos).to_datetime64().astype("datetime64[D]")
+        valores = {}
+        for medida, total in zip(MEDIDAS, totales[indice]):
+            primero = cubo.primeros_dias[medida]
+            # NaT: la medida no tiene registros (comparaciones con NaT dan False)
+            if nombre != "actual" and not inicio >= primero:
+                valores[medida] = None
+            else:
+                valores[medida] = int(total) if escala == 1.0 else float(total) * escala
+        completa = nombre == "actual" or any(valor is not None for valor in valores.values())
+        resultado[nombre] = valores if completa else None
+    return resultado
+
+
+def variacion(actual, base) -> tuple:
+    """
+    Dirección y porcentaje de cambio de un valor contra su línea de base.
+
+    Args:
+        actual (float): Valor del período actual
+        base (float): Valor de la línea de base, o None si no hay
+
+    Returns:
+        tuple: (tendencia "up"/"down"/"neutral", texto del porcentaje), o (None, None)
+    """
+    if base is None:
+        return None, None
+    tendencia = "up" if actual > base else "down" if actual < base else "neutral"
+    if base == 0:
+        return tendencia, "0.0%" if actual == 0 else "nuevo"
+    return tendencia, f"{abs((actual - base) / base * 100):.1f}%"
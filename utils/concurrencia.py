@@ -0,0 +1,71 @@
+# En utils/concurrencia.py
+"""
+Herramientas de concurrencia compartidas por la carga de datos.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Hilos para el trabajo por hoja (lectura de snapshots, limpieza, escritura)
+CARGA_HILOS = int(os.getenv("CARGA_HILOS", "3"))
+
+_pool = ThreadPoolExecutor(max_workers=CARGA_HILOS, thread_name_prefix="carga-hojas")
+
+
+def mapear_en_paralelo(funcion, *iterables) -> list:
+    """
+    Aplica una función a cada elemento usando el pool acotado.
+
+    No debe llamarse desde una tarea que ya corre en el pool.
+
+    Args:
+        funcion (callable): Función a aplicar
+        *iterables: Argumentos, como en map()
+
+    Returns:
+        list: Resultados en el mismo orden que la entrada
+    """
+    return list(_pool.map(funcion, *iterables))
+
+
+class SingleFlight:
+    """
+    Evita trabajos duplicados: mientras una llamada con cierta clave está en
+    curso, las demás con la misma clave esperan y reciben el mismo resultado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_curso = {}
+
+    def ejecutar(self, clave, funcion, *args, **kwargs):
+        """
+        Ejecuta funcion(*args, **kwargs) o espera la ejecución en curso.
+
+        Args:
+            clave (hashable): Identificador del trabajo
+            funcion (callable): Trabajo a ejecutar
+
+        Returns:
+            El resultado de la ejecución (propia o compartida)
+        """
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_curso[clave] = futuro
+
+        if not lider:
+            return futuro.result()
+
+        try:
+            resultado = funcion(*args, **kwargs)
+            futuro.set_result(resultado)
+            return resultado
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
@@ -1,43 +1,43 @@
 # En utils/data_loader.py
 import pandas as pd
-import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import os
 import json
-from dotenv import load_dotenv
-
-@st.cache_data
-def cargar_datos(sheet_name: str) -> pd.DataFrame:
-    # Detectar si se está ejecutando local o en la nube
-    running_local = os.path.exists(".env")
-
-    if running_local:
-        load_dotenv()
-        creds = ServiceAccountCredentials.from_json_keyfile_name(
-            "credenciales.json",
-            scopes=[
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive",
-            ],
-        )
-    else:
-        json_creds = json.loads(os.getenv("GSHEET_CREDENTIALS"))
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(
-            json_creds,
-            scopes=[
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive",
-            ],
-        )
+import time
+import hashlib
+from utils.backends import letra_columna, obtener_backend
+from utils.concurrencia import SingleFlight, mapear_en_paralelo
+from utils.esquema import ESQUEMA_VERSION, a_centavos, agregar_columnas_periodo, aplicar_esquema, concatenar
+from utils.indice_temporal import ordenar_por_fecha
+from utils.snapshot import guardar_snapshot, leer_snapshot, snapshot_vigente
+
+# Hojas que necesita el dashboard; se descargan juntas en una sola llamada
+HOJAS_DASHBOARD = ("Datos", "Gastos", "Transaccion donaciones")
+
+# Hojas que solo crecen hacia abajo y admiten sincronización incremental
+HOJAS_INCREMENTALES = ("Gastos", "Transaccion donaciones")
+# Filas finales que se vuelven a leer para detectar cambios en lo ya guardado
+FILAS_COLA = int(os.getenv("SYNC_FILAS_COLA", "20"))
+# Segundos tras los cuales se fuerza una recarga completa de todos modos
+SYNC_COMPLETO_CADA = int(os.getenv("SYNC_COMPLETO_CADA", str(6 * 3600)))
 
-    gs_client = gspread.authorize(creds)
+# Descargas en curso, compartidas entre sesiones que piden las mismas hojas
+_en_vuelo = SingleFlight()
 
-    spreadsheet_key = os.getenv("KEY_SHEET")
-    spreadsheet = gs_client.open_by_key(spreadsheet_key)
 
-    sheet = spreadsheet.worksheet(sheet_name)
-    data = sheet.get_all_values()
+def limpiar_hoja(sheet_name: str, data: list) -> pd.DataFrame:
+    """
+    Convierte los valores crudos de una hoja en un DataFrame tipado.
+
+    Args:
+        sheet_name (str): Nombre de la hoja de origen
+        data (list): Filas de la hoja, la primera con los encabezados
+
+    Returns:
+        pd.DataFrame: DataFrame limpio, ordenado por Fecha
+    """
+    if not data:
+        return pd.DataFrame()
+
     headers, rows = data[0], data[1:]
     df = pd.DataFrame(rows, columns=headers)
     df.columns = df.columns.str.strip().str.upper()
@@ -52,17 +52,294 @@ def cargar_datos(sheet_name: str) -> pd.DataFrame:
     if not sheet_name.lower().startswith("datos"):
         df["Monto"] = pd.to_numeric(df["Monto"], errors="coerce")
         df = df.dropna(subset="Monto")
+        df["Monto"] = a_centavos(df["Monto"])
     df["Fecha"] = pd.to_datetime(df["Fecha"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
     df = df.dropna(subset="Fecha")
 
-    # Columna para agrupar
-    df["MesAño"] = df["Fecha"].dt.to_period("M").astype(str)
-    df["año"] = df["Fecha"].dt.year
-    df["mes"] = df["Fecha"].dt.month
+    # Columnas para agrupar (año, mes y periodo aaaamm enteros)
+    df = agregar_columnas_periodo(df)
 
     # Limpiar Mascota y Proveedor si existen
     for col in ("MASCOTA", "PROVEEDOR"):
         if col in df.columns:
             df[col] = df[col].str.upper().str.strip()
 
-    return df
+    return ordenar_por_fecha(aplicar_esquema(df, sheet_name))
+
+
+def _normalizar_filas(filas, n_columnas):
+    """Recorta o completa cada fila a n_columnas celdas."""
+    return [(list(fila) + [""] * n_columnas)[:n_columnas] for fila in filas]
+
+
+def _version(metadatos: dict) -> str:
+    """Versión de los datos de un snapshot (cambia solo si cambian los datos)."""
+    return metadatos.get("version") or str(metadatos.get("timestamp", ""))
+
+
+def _leer_snapshot(sheet_name: str):
+    """Lee un snapshot, descartándolo si fue escrito con otro esquema de tipos."""
+    snapshot = leer_snapshot(sheet_name)
+    if snapshot is None or snapshot[1].get("esquema") != ESQUEMA_VERSION:
+        return None
+    df, metadatos = snapshot
+    return ordenar_por_fecha(df), metadatos
+
+
+def _completar_filas(data: list) -> list:
+    """Completa las filas con "" hasta el ancho de la más larga (la API omite las celdas vacías finales)."""
+    if not data:
+        return []
+    return _normalizar_filas(data, max(len(fila) for fila in data))
+
+
+def _checksum(filas) -> str:
+    """Hash estable de una lista de filas crudas."""
+    return hashlib.sha1(json.dumps(filas, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _metadatos_sync(data: list, ultima_carga_completa: float) -> dict:
+    """
+    Estado necesario para la próxima sincronización incremental.
+
+    Args:
+        data (list): Filas crudas de la hoja, incluyendo los encabezados
+        ultima_carga_completa (float): Momento de la última descarga completa
+
+    Returns:
+        dict: Encabezados, cantidad de filas, checksum de la cola y versión
+    """
+    if not data:
+        return {}
+    encabezados = list(data[0])
+    filas = data[1:]
+    return {
+        "encabezados": encabezados,
+        "filas": len(filas),
+        "checksum_cola": _checksum(_normalizar_filas(filas[-FILAS_COLA:], len(encabezados))),
+        "ultima_carga_completa": ultima_carga_completa,
+        "version": _checksum(data),
+        "esquema": ESQUEMA_VERSION,
+    }
+
+
+def _limpiar_y_guardar(sheet_name: str, data: list, ahora: float):
+    """
+    Limpia una hoja descargada completa y guarda su snapshot.
+
+    Args:
+        sheet_name (str): Nombre de la hoja
+        data (list): Filas crudas devueltas por el backend
+        ahora (float): Momento de la descarga
+
+    Returns:
+        tuple: (DataFrame limpio, versión)
+    """
+    data = _completar_filas(data)
+    metadatos = _metadatos_sync(data, ahora)
+    df = limpiar_hoja(sheet_name, data)
+    guardar_snapshot(sheet_name, df, metadatos)
+    return df, metadatos.get("version", "")
+
+
+def _descargar_hojas(sheet_names: tuple):
+    # Un rango con solo el nombre de la hoja devuelve toda la hoja
+    rangos = [f"'{nombre}'" for nombre in sheet_names]
+    valores = obtener_backend().leer_rangos(rangos)
+
+    ahora = time.time()
+    resultados = mapear_en_paralelo(lambda nombre, data: _limpiar_y_guardar(nombre, data, ahora), sheet_names, valores)
+    hojas = {nombre: df for nombre, (df, _) in zip(sheet_names, resultados)}
+    versiones = {nombre: version for nombre, (_, version) in zip(sheet_names, resultados)}
+    return hojas, versiones
+
+
+def descargar_hojas(sheet_names) -> tuple:
+    """
+    Descarga varias hojas completas en un único values-batchGet, las limpia
+    en paralelo y actualiza sus snapshots en disco.
+
+    Llamadas simultáneas para las mismas hojas comparten una sola descarga.
+
+    Args:
+        sheet_names (iterable): Nombres de las hojas a descargar
+
+    Returns:
+        tuple: (dict nombre -> DataFrame limpio, dict nombre -> versión)
+    """
+    sheet_names = tuple(sheet_names)
+    return _en_vuelo.ejecutar(("descargar", sheet_names), _descargar_hojas, sheet_names)
+
+
+def _admite_incremental(sheet_name: str, metadatos: dict) -> bool:
+    """Indica si una hoja puede actualizarse solo con sus filas nuevas."""
+    return (
+        sheet_name in HOJAS_INCREMENTALES
+        and bool(metadatos.get("encabezados"))
+        and "checksum_cola" in metadatos
+        and time.time() - metadatos.get("ultima_carga_completa", 0) < SYNC_COMPLETO_CADA
+    )
+
+
+def _aplicar_incremento(sheet_name: str, df_previo: pd.DataFrame, metadatos: dict,
+                        fila_encabezado: list, filas_cola: list):
+    """
+    Agrega al DataFrame guardado las filas nuevas de una hoja.
+
+    Args:
+        sheet_name (str): Nombre de la hoja
+        df_previo (pd.DataFrame): DataFrame del snapshot
+        metadatos (dict): Metadatos del snapshot
+        fila_encabezado (list): Respuesta del rango de encabezados
+        filas_cola (list): Respuesta del rango cola conocida + filas nuevas
+
+    Returns:
+        tuple: (DataFrame, versión), o None si hace falta una recarga completa
+    """
+    encabezados = metadatos["encabezados"]
+    n_columnas = len(encabezados)
+    cola = min(FILAS_COLA, metadatos["filas"])
+    filas = _normalizar_filas(filas_cola, n_columnas)
+
+    # Si cambiaron los encabezados o alguna fila ya guardada, recarga completa
+    if (
+        _normalizar_filas(fila_encabezado[:1], n_columnas) != [encabezados]
+        or len(filas) < cola
+        or _checksum(filas[:cola]) != metadatos["checksum_cola"]
+    ):
+        return None
+
+    nuevas = filas[cola:]
+    df = df_previo
+    version = _version(metadatos)
+    if nuevas:
+        # Las filas nuevas suelen ser las más recientes: solo se reordena si hace falta
+        df = ordenar_por_fecha(concatenar(df_previo, limpiar_hoja(sheet_name, [encabezados] + nuevas)))
+        version = _checksum([version] + nuevas)
+    guardar_snapshot(sheet_name, df, {
+        "encabezados": encabezados,
+        "filas": metadatos["filas"] + len(nuevas),
+        "checksum_cola": _checksum(filas[-FILAS_COLA:]),
+        "ultima_carga_completa": metadatos["ultima_carga_completa"],
+        "version": version,
+        "esquema": ESQUEMA_VERSION,
+    })
+    return df, version
+
+
+def _sincronizar_hojas(sheet_names: tuple):
+    snapshots = dict(zip(sheet_names, mapear_en_paralelo(_leer_snapshot, sheet_names)))
+    previos, completas = {}, []
+    for nombre in sheet_names:
+        snapshot = snapshots[nombre]
+        if snapshot is not None and _admite_incremental(nombre, snapshot[1]):
+            previos[nombre] = snapshot
+        else:
+            completas.append(nombre)
+
+    # Todas las lecturas (completas e incrementales) van en el mismo batchGet
+    rangos = [f"'{nombre}'" for nombre in completas]
+    for nombre, (_, metadatos) in previos.items():
+        n_columnas = len(metadatos["encabezados"])
+        cola = min(FILAS_COLA, metadatos["filas"])
+        # Fila 1 = encabezados; las filas de datos empiezan en la 2
+        inicio = metadatos["filas"] - cola + 2
+        ultima_columna = letra_columna(n_columnas - 1)
+        rangos.append(f"'{nombre}'!1:1")
+        rangos.append(f"'{nombre}'!A{inicio}:{ultima_columna}")
+
+    hojas, versiones = {}, {}
+    if not rangos:
+        return hojas, versiones
+    valores = obtener_backend().leer_rangos(rangos)
+
+    # Cada hoja se procesa en paralelo: completas e incrementales juntas
+    ahora = time.time()
+    offset = len(completas)
+
+    def _procesar(indice):
+        if indice < offset:
+            return _limpiar_y_guardar(completas[indice], valores[indice], ahora)
+        i = indice - offset
+        nombre = list(previos)[i]
+        df_previo, metadatos = previos[nombre]
+        return _aplicar_incremento(
+            nombre, df_previo, metadatos, valores[offset + 2 * i], valores[offset + 2 * i + 1]
+        )
+
+    orden = completas + list(previos)
+    recargar = []
+    for nombre, resultado in zip(orden, mapear_en_paralelo(_procesar, range(len(orden)))):
+        if resultado is None:
+            recargar.append(nombre)
+        else:
+            hojas[nombre], versiones[nombre] = resultado
+
+    if recargar:
+        hojas_recargadas, versiones_recargadas = descargar_hojas(recargar)
+        hojas.update(hojas_recargadas)
+        versiones.update(versiones_recargadas)
+
+    return (
+        {nombre: hojas[nombre] for nombre in sheet_names},
+        {nombre: versiones[nombre] for nombre in sheet_names},
+    )
+
+
+def sincronizar_hojas(sheet_names) -> tuple:
+    """
+    Actualiza las hojas descargando solo lo necesario.
+
+    Para las hojas que solo crecen hacia abajo se vuelve a leer la cola ya
+    conocida más las filas nuevas. Si la cola coincide con el checksum
+    guardado, solo se limpian y agregan las filas nuevas; si no, la hoja
+    se recarga completa. Llamadas simultáneas para las mismas hojas
+    comparten una sola sincronización.
+
+    Args:
+        sheet_names (iterable): Nombres de las hojas
+
+    Returns:
+        tuple: (dict nombre -> DataFrame limpio, dict nombre -> versión)
+    """
+    sheet_names = tuple(sheet_names)
+    return _en_vuelo.ejecutar(("sincronizar", sheet_names), _sincronizar_hojas, sheet_names)
+
+
+def cargar_hojas(sheet_names: tuple = HOJAS_DASHBOARD):
+    """
+    Devuelve las hojas limpias priorizando los snapshots en disco.
+
+    Los snapshots se leen en paralelo y se sirven aunque estén vencidos;
+    quien llama decide si revalidarlos (ver utils.refresco). Solo las hojas
+    sin snapshot se descargan en el momento.
+
+    Args:
+        sheet_names (tuple): Nombres de las hojas
+
+    Returns:
+        tuple: (dict nombre -> DataFrame, dict nombre -> versión,
+                lista de hojas con snapshot vencido)
+    """
+    hojas, versiones = {}, {}
+    faltantes, vencidas = [], []
+    for nombre, snapshot in zip(sheet_names, mapear_en_paralelo(_leer_snapshot, sheet_names)):
+        if snapshot is None:
+            faltantes.append(nombre)
+            continue
+        hojas[nombre], metadatos = snapshot
+        versiones[nombre] = _version(metadatos)
+        if not snapshot_vigente(metadatos):
+            vencidas.append(nombre)
+
+    if faltantes:
+        hojas_descargadas, versiones_descargadas = descargar_hojas(faltantes)
+        hojas.update(hojas_descargadas)
+        versiones.update(versiones_descargadas)
+
+    return (
+        {nombre: hojas[nombre] for nombre in sheet_names},
+        {nombre: versiones[nombre] for nombre in sheet_names},
+        vencidas,
+    )
+
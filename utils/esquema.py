@@ -0,0 +1,123 @@
+# En utils/esquema.py
+"""
+Esquema de tipos de los DataFrames cargados.
+
+- Columnas de baja cardinalidad como ``category``.
+- ``Monto`` como entero en centavos (int64); se convierte a pesos recién al
+  mostrar, con a_pesos().
+- ``año`` (int16), ``mes`` (int8) y ``periodo`` (int32, aaaamm) para agrupar
+  y filtrar sin strings.
+- ``periodo_etiqueta`` (category, "Ene 2024") para mostrar el período sin
+  formatear fechas (ver utils/periodos.py).
+"""
+import pandas as pd
+
+from utils.periodos import etiquetas_periodo
+
+# Cambiarla invalida los snapshots guardados con un esquema anterior
+ESQUEMA_VERSION = 3
+
+# Columnas categóricas por hoja (nombres tal como quedan tras limpiar_hoja)
+ESQUEMAS = {
+    "Datos": {
+        "categorias": ["TIPO ANIMAL", "ESTADO ACTUAL"],
+    },
+    "Gastos": {
+        "categorias": ["MASCOTA", "PROVEEDOR", "TIPO DE GASTO", "MEDIO DE PAGO", "RESPONSABLE"],
+    },
+    "Transaccion donaciones": {
+        "categorias": ["MEDIO DE PAGO", "TIPO DE IDENTIFICACIÓN DEL DONANTE"],
+    },
+}
+
+
+def a_centavos(montos: pd.Series) -> pd.Series:
+    """
+    Convierte montos en pesos (float) a centavos enteros.
+
+    Args:
+        montos (pd.Series): Montos en pesos, sin nulos
+
+    Returns:
+        pd.Series: Montos en centavos (int64)
+    """
+    return (montos * 100).round().astype("int64")
+
+
+def a_pesos(centavos):
+    """
+    Convierte centavos enteros a pesos para mostrar.
+
+    Args:
+        centavos (pd.Series, np.ndarray o número): Montos en centavos
+
+    Returns:
+        Mismo tipo que la entrada, en pesos (float)
+    """
+    return centavos / 100
+
+
+# Columnas que agrega agregar_columnas_periodo
+COLUMNAS_PERIODO = ("año", "mes", "periodo", "periodo_etiqueta")
+
+
+def agregar_columnas_periodo(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega año, mes, periodo (aaaamm) y su etiqueta a partir de la columna Fecha.
+
+    Args:
+        df (pd.DataFrame): DataFrame con Fecha datetime
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas agregadas
+    """
+    df["año"] = df["Fecha"].dt.year.astype("int16")
+    df["mes"] = df["Fecha"].dt.month.astype("int8")
+    df["periodo"] = (df["año"].astype("int32") * 100 + df["mes"]).astype("int32")
+    df["periodo_etiqueta"] = etiquetas_periodo(df["periodo"])
+    return df
+
+
+def aplicar_esquema(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
+    """
+    Convierte las columnas declaradas de una hoja a sus tipos compactos.
+
+    Args:
+        df (pd.DataFrame): DataFrame limpio
+        sheet_name (str): Nombre de la hoja
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame con los tipos aplicados
+    """
+    for col in ESQUEMAS.get(sheet_name, {}).get("categorias", []):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def concatenar(df_previo: pd.DataFrame, df_nuevas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Concatena filas nuevas conservando las columnas categóricas.
+
+    Las categorías nuevas se agregan al final y en orden de aparición, así
+    los códigos ya existentes no se recalculan y las etiquetas de período
+    siguen en orden cronológico.
+
+    Args:
+        df_previo (pd.DataFrame): DataFrame existente
+        df_nuevas (pd.DataFrame): Filas nuevas con el mismo esquema
+
+    Returns:
+        pd.DataFrame: DataFrame concatenado
+    """
+    df_previo = df_previo.copy(deep=False)
+    df_nuevas = df_nuevas.copy(deep=False)
+    for col in df_previo.columns:
+        if isinstance(df_previo[col].dtype, pd.CategoricalDtype) and col in df_nuevas.columns:
+            # Index.difference ordenaría alfabéticamente ("Abr 2025" antes que "Mar 2025")
+            nuevas = pd.Index(df_nuevas[col].dropna().astype(object).unique())
+            extras = nuevas[~nuevas.isin(df_previo[col].cat.categories)]
+            if len(extras):
+                df_previo[col] = df_previo[col].cat.add_categories(extras)
+            df_nuevas[col] = pd.Categorical(df_nuevas[col], categories=df_previo[col].cat.categories)
+    return pd.concat([df_previo, df_nuevas], ignore_index=True)
@@ -0,0 +1,72 @@
+# En utils/figuras.py
+"""
+Cache de figuras Plotly compartido entre reruns y sesiones.
+
+Cada figura se guarda serializada (JSON) junto con los datos pequeños que
+acompañan al gráfico (insights), con clave id del gráfico + hash de filtros
+y atada a la versión de los datos. Al leerla se reconstruye una figura nueva
+sin volver a validarla (el JSON salió de una figura ya validada), así cada
+sesión recibe su propia copia.
+"""
+import json
+import os
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.memo import CacheLRU, clave_filtros
+
+# Figuras recordadas (todas las combinaciones de gráfico y filtros)
+FIGURAS_CACHE_MAX = int(os.getenv("FIGURAS_CACHE_MAX", "64"))
+
+
+@st.cache_resource
+def obtener_cache_figuras() -> CacheLRU:
+    """
+    Devuelve el cache de figuras del proceso.
+
+    Returns:
+        CacheLRU: Cache compartido por todas las sesiones
+    """
+    return CacheLRU(FIGURAS_CACHE_MAX)
+
+
+def clave_vista(version: str, filtros: dict) -> tuple:
+    """
+    Clave de una vista del dashboard para figura_en_cache.
+
+    Args:
+        version (str): Versión de los datos
+        filtros (dict): Filtros aplicados
+
+    Returns:
+        tuple: (version, hash de filtros)
+    """
+    return version, clave_filtros(filtros)
+
+
+def figura_en_cache(id_grafico: str, clave, construir) -> tuple:
+    """
+    Devuelve la figura de un gráfico, construyéndola solo si no está en cache.
+
+    Args:
+        id_grafico (str): Identificador del gráfico
+        clave (tuple): clave_vista(...) de los datos mostrados, o None para no usar cache
+        construir (callable): Función sin argumentos que devuelve (figura o None, extra)
+
+    Returns:
+        tuple: (go.Figure o None, extra)
+    """
+    if clave is None:
+        return construir()
+
+    version, filtros_hash = clave
+
+    def serializar():
+        figura, extra = construir()
+        return (figura.to_json() if figura is not None else None), extra
+
+    figura_json, extra = obtener_cache_figuras().obtener(version, f"{id_grafico}:{filtros_hash}", serializar)
+    if figura_json is None:
+        return None, extra
+    return go.Figure(json.loads(figura_json), _validate=False), extra
@@ -0,0 +1,112 @@
+# En utils/grilla.py
+"""
+Explorador paginado de registros.
+
+El orden y el recorte se hacen en el servidor: se calcula el orden sobre la
+columna elegida (sin reordenar el DataFrame entero; por Fecha, en datos ya
+ordenados, ni siquiera hace falta ordenar) y solo las filas y columnas de la
+página visible se envían al navegador.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.indice_temporal import esta_ordenado
+
+TAMAÑOS_PAGINA = (25, 50, 100, 250)
+
+
+def posiciones_ordenadas(df: pd.DataFrame, columna: str, ascendente: bool) -> np.ndarray:
+    """
+    Posiciones de las filas de df en el orden pedido (faltantes al final).
+
+    Args:
+        df (pd.DataFrame): Registros
+        columna (str): Columna de orden
+        ascendente (bool): Sentido del orden
+
+    Returns:
+        np.ndarray: Posiciones para df.iloc
+    """
+    if columna == "Fecha" and esta_ordenado(df):
+        # Ya está ordenado por Fecha: el orden es el de las filas (o el inverso)
+        posiciones = np.arange(len(df))
+        return posiciones if ascendente else posiciones[::-1]
+
+    valores = df[columna]
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        # Se ordenan las categorías (pocas) y cada fila toma el rango de la suya
+        rangos = np.argsort(np.argsort(valores.cat.categories.astype(str), kind="stable"), kind="stable")
+        codigos = valores.cat.codes.to_numpy()
+        claves = np.where(codigos >= 0, rangos[np.maximum(codigos, 0)], len(rangos))
+        claves = claves if ascendente else np.where(codigos >= 0, -claves, 1)
+        return np.argsort(claves, kind="stable")
+
+    return (
+        valores.reset_index(drop=True)
+        .sort_values(ascending=ascendente, kind="stable", na_position="last")
+        .index.to_numpy()
+    )
+
+
+def pagina(df: pd.DataFrame, columnas: list, orden: str, ascendente: bool,
+           numero: int, tamaño: int) -> pd.DataFrame:
+    """
+    Una página de registros ordenados, con solo las columnas pedidas.
+
+    Args:
+        df (pd.DataFrame): Registros
+        columnas (list): Columnas a mostrar
+        orden (str): Columna de orden
+        ascendente (bool): Sentido del orden
+        numero (int): Número de página (desde 1)
+        tamaño (int): Filas por página
+
+    Returns:
+        pd.DataFrame: Filas de la página con índice 0..k-1
+    """
+    inicio = (numero - 1) * tamaño
+    filas = posiciones_ordenadas(df, orden, ascendente)[inicio:inicio + tamaño]
+    return df.iloc[filas][columnas].reset_index(drop=True)
+
+
+def mostrar_grilla(df: pd.DataFrame, columnas: list, key: str, orden: str = "Fecha"):
+    """
+    Muestra los registros en páginas, con orden y tamaño de página elegibles.
+
+    Args:
+        df (pd.DataFrame): Registros filtrados
+        columnas (list): Columnas a mostrar (las que no existan se omiten)
+        key (str): Prefijo de las claves de los controles
+        orden (str): Columna de orden por defecto (descendente)
+    """
+    columnas = [c for c in columnas if c in df.columns]
+    if df.empty or not columnas:
+        st.info("No hay registros para los filtros seleccionados.")
+        return
+
+    col1, col2, col3, col4 = st.columns([2, 1.2, 1, 1])
+    with col1:
+        orden = st.selectbox(
+            "Ordenar por", columnas,
+            index=columnas.index(orden) if orden in columnas else 0,
+            key=f"{key}_orden"
+        )
+    with col2:
+        sentido = st.selectbox("Sentido", ["Descendente", "Ascendente"], key=f"{key}_sentido")
+    with col3:
+        tamaño = st.selectbox("Filas", TAMAÑOS_PAGINA, key=f"{key}_tamaño")
+    paginas = max(1, math.ceil(len(df) / tamaño))
+    with col4:
+        numero = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key=f"{key}_pagina")
+    numero = min(int(numero), paginas)
+
+    st.dataframe(
+        pagina(df, columnas, orden, sentido == "Ascendente", numero, tamaño),
+        use_container_width=True,
+        hide_index=True
+    )
+    desde = (numero - 1) * tamaño + 1
+    st.caption(f"Registros {desde:,}–{min(numero * tamaño, len(df)):,} de {len(df):,} · página {numero} de {paginas}")
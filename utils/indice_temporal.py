@@ -0,0 +1,114 @@
+# En utils/indice_temporal.py
+"""
+Índice temporal de los DataFrames cargados.
+
+Las hojas se guardan ordenadas por Fecha (y por lo tanto por periodo aaaamm).
+Con ese orden, los filtros de año, mes y rango de fechas se resuelven con
+búsqueda binaria (np.searchsorted) y devuelven cortes posicionales, sin
+recorrer ni copiar todo el histórico.
+
+El orden se marca en ``df.attrs``. pandas copia ``attrs`` también a los
+resultados de sort_values por otras columnas, así que la marca sola no
+alcanza: antes de usar la búsqueda binaria se comprueba además que Fecha
+esté realmente en orden creciente (una pasada O(n) sin copias, mucho más
+barata que filtrar con máscaras).
+"""
+import numpy as np
+import pandas as pd
+
+ORDEN_FECHA = "ordenado_por_fecha"
+
+
+def ordenar_por_fecha(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ordena un DataFrame por Fecha (orden estable) y lo marca como ordenado.
+
+    Args:
+        df (pd.DataFrame): DataFrame con columna Fecha datetime
+
+    Returns:
+        pd.DataFrame: El mismo DataFrame si ya estaba ordenado, o uno nuevo con índice 0..n-1
+    """
+    if "Fecha" not in df.columns:
+        return df
+    if not df["Fecha"].is_monotonic_increasing:
+        df = df.sort_values("Fecha", kind="stable", ignore_index=True)
+    df.attrs[ORDEN_FECHA] = True
+    return df
+
+
+def esta_ordenado(df: pd.DataFrame) -> bool:
+    """Indica si el DataFrame admite cortes por búsqueda binaria (ordenado por Fecha)."""
+    return (
+        bool(df.attrs.get(ORDEN_FECHA))
+        and "Fecha" in df.columns
+        and "periodo" in df.columns
+        and df["Fecha"].is_monotonic_increasing
+    )
+
+
+def filas_periodos(df: pd.DataFrame, desde: int, hasta: int) -> slice:
+    """
+    Posiciones de las filas con desde <= periodo <= hasta.
+
+    Args:
+        df (pd.DataFrame): DataFrame ordenado
+        desde (int): Periodo inicial (aaaamm)
+        hasta (int): Periodo final (aaaamm), inclusive
+
+    Returns:
+        slice: Corte para df.iloc
+    """
+    periodos = df["periodo"].to_numpy()
+    inicio, fin = np.searchsorted(periodos, [desde, hasta + 1], side="left")
+    return slice(int(inicio), int(fin))
+
+
+def filas_año(df: pd.DataFrame, año: int) -> slice:
+    """Posiciones de las filas de un año (corte para df.iloc)."""
+    return filas_periodos(df, año * 100 + 1, año * 100 + 12)
+
+
+def filas_mes(df: pd.DataFrame, mes: int) -> np.ndarray:
+    """
+    Posiciones de las filas de un mes en todos los años.
+
+    Se arma con un corte por año presente, así el costo depende de las
+    filas seleccionadas y de la cantidad de años, no del total de filas.
+
+    Args:
+        df (pd.DataFrame): DataFrame ordenado
+        mes (int): Número de mes (1-12)
+
+    Returns:
+        np.ndarray: Posiciones para df.iloc, en orden
+    """
+    periodos = df["periodo"].to_numpy()
+    if len(periodos) == 0:
+        return np.array([], dtype=np.intp)
+    años = np.arange(int(periodos[0]) // 100, int(periodos[-1]) // 100 + 1)
+    objetivos = años * 100 + mes
+    inicios = np.searchsorted(periodos, objetivos, side="left")
+    fines = np.searchsorted(periodos, objetivos + 1, side="left")
+    return np.concatenate([np.arange(i, f, dtype=np.intp) for i, f in zip(inicios, fines)])
+
+
+def filas_fechas(df: pd.DataFrame, fecha_inicio, fecha_fin) -> slice:
+    """
+    Posiciones de las filas con fecha entre fecha_inicio y fecha_fin (días completos).
+
+    Args:
+        df (pd.DataFrame): DataFrame ordenado
+        fecha_inicio (date): Primer día, inclusive
+        fecha_fin (date): Último día, inclusive
+
+    Returns:
+        slice: Corte para df.iloc
+    """
+    fechas = df["Fecha"].to_numpy()
+    limites = np.array(
+        [pd.Timestamp(fecha_inicio), pd.Timestamp(fecha_fin) + pd.Timedelta(days=1)],
+        dtype=fechas.dtype,
+    )
+    inicio, fin = np.searchsorted(fechas, limites, side="left")
+    return slice(int(inicio), int(fin))
@@ -0,0 +1,275 @@
+# En utils/mapas.py
+"""
+Mapa de rescates como una sola capa GeoJSON y cache de su HTML.
+
+Las ubicaciones se agrupan y se convierten en una FeatureCollection (un
+punto por ubicación con la cantidad de rescates en sus propiedades); folium
+la dibuja como una única capa con estilo según los datos, en lugar de un
+marcador por fila. El HTML del mapa ya renderizado se guarda por versión de
+los datos y filtros, así un rerun con la misma selección no vuelve a
+serializar el mapa.
+
+Para el modo densidad, los rescates se agrupan en una rejilla hexagonal
+calculada con NumPy una vez por versión de los datos, con la cantidad por
+celda y por periodo (aaaamm); mostrar un año o un mes es sumar las filas de
+esos periodos, y el mapa dibuja una sola capa de polígonos cuyo tamaño no
+depende de la cantidad de registros.
+"""
+import os
+
+import folium
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.memo import CacheLRU
+
+# Mapas renderizados recordados (combinaciones de filtros)
+MAPAS_CACHE_MAX = int(os.getenv("MAPAS_CACHE_MAX", "16"))
+
+# Radio de los círculos en píxeles según la cantidad de rescates
+RADIO_MIN = 5
+RADIO_MAX = 15
+RADIO_POR_RESCATE = 1.5
+
+# Lado de cada hexágono de la rejilla de densidad, en kilómetros
+HEX_TAMAÑO_KM = float(os.getenv("HEX_TAMAÑO_KM", "1.0"))
+KM_POR_GRADO = 111.32
+
+# Colores de las celdas de densidad, de menos a más rescates
+ESCALA_DENSIDAD = ("#fdd49e", "#fdbb84", "#fc8d59", "#e34a33", "#b30000")
+
+
+@st.cache_resource
+def obtener_cache_mapas() -> CacheLRU:
+    """
+    Devuelve el cache de mapas renderizados del proceso.
+
+    Returns:
+        CacheLRU: Cache compartido por todas las sesiones
+    """
+    return CacheLRU(MAPAS_CACHE_MAX)
+
+
+def conteo_ubicaciones(df_mascotas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cantidad de rescates por ubicación.
+
+    Args:
+        df_mascotas (pd.DataFrame): Mascotas con Ubicacion, Latitud y Longitud
+
+    Returns:
+        pd.DataFrame: Columnas Ubicacion, Latitud, Longitud y count
+    """
+    conteos = (
+        df_mascotas
+        .groupby(['Ubicacion', 'Latitud', 'Longitud'], observed=True, sort=False)
+        .size()
+        .reset_index(name='count')
+    )
+    return conteos[conteos['count'] > 0].reset_index(drop=True)
+
+
+def coleccion_puntos(conteos: pd.DataFrame) -> dict:
+    """
+    FeatureCollection GeoJSON con un punto por ubicación.
+
+    Args:
+        conteos (pd.DataFrame): Salida de conteo_ubicaciones
+
+    Returns:
+        dict: FeatureCollection; cada punto lleva Ubicacion, count y radio
+    """
+    radios = np.clip(conteos['count'].to_numpy() * RADIO_POR_RESCATE, RADIO_MIN, RADIO_MAX)
+    features = [
+        {
+            "type": "Feature",
+            "id": str(i),
+            "geometry": {"type": "Point", "coordinates": [float(lon), float(lat)]},
+            "properties": {"Ubicacion": str(ubicacion), "count": int(cantidad), "radio": float(radio)},
+        }
+        for i, (ubicacion, lat, lon, cantidad, radio) in enumerate(zip(
+            conteos['Ubicacion'], conteos['Latitud'].to_numpy(), conteos['Longitud'].to_numpy(),
+            conteos['count'].to_numpy(), radios,
+        ))
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def renderizar(mapa: folium.Map) -> str:
+    """
+    HTML completo de un mapa (lo mismo que muestra folium_static).
+
+    Args:
+        mapa (folium.Map): Mapa armado
+
+    Returns:
+        str: Documento HTML del mapa
+    """
+    return folium.Figure().add_child(mapa).render()
+
+
+def mapa_en_cache(id_mapa: str, clave, construir) -> str:
+    """
+    Devuelve el HTML de un mapa, armándolo y renderizándolo solo si no está
+    en cache.
+
+    Args:
+        id_mapa (str): Identificador del mapa
+        clave (tuple): clave_vista(...) de los datos mostrados, o None para no usar cache
+        construir (callable): Función sin argumentos que devuelve un folium.Map
+
+    Returns:
+        str: HTML del mapa
+    """
+    if clave is None:
+        return renderizar(construir())
+
+    version, filtros_hash = clave
+    return obtener_cache_mapas().obtener(
+        version, f"{id_mapa}:{filtros_hash}", lambda: renderizar(construir())
+    )
+
+
+class DensidadRescates:
+    """
+    Rescates por celda hexagonal y por periodo.
+
+    Las coordenadas se proyectan de forma equirectangular (longitud escalada
+    por el coseno de la latitud de referencia) para que los hexágonos sean
+    regulares en la zona del mapa.
+
+    Args:
+        periodos (np.ndarray): Periodo (aaaamm) de cada fila
+        q (np.ndarray): Coordenada axial q de la celda de cada fila
+        r (np.ndarray): Coordenada axial r de la celda de cada fila
+        cantidades (np.ndarray): Rescates de cada (periodo, celda)
+        tamaño (float): Lado del hexágono en grados de latitud
+        lat0 (float): Latitud de referencia de la proyección
+    """
+
+    def __init__(self, periodos, q, r, cantidades, tamaño: float, lat0: float):
+        self.periodos = periodos
+        self.q = q
+        self.r = r
+        self.cantidades = cantidades
+        self.tamaño = tamaño
+        self.lat0 = lat0
+
+    @classmethod
+    def construir(cls, df_mascotas: pd.DataFrame, tamaño_km: float = HEX_TAMAÑO_KM) -> "DensidadRescates":
+        """
+        Agrupa todas las mascotas en la rejilla.
+
+        Args:
+            df_mascotas (pd.DataFrame): Mascotas con Latitud, Longitud y periodo
+            tamaño_km (float): Lado del hexágono en kilómetros
+
+        Returns:
+            DensidadRescates: Conteos listos para consultar
+        """
+        tamaño = tamaño_km / KM_POR_GRADO
+        vacio = np.zeros(0, dtype=np.int64)
+        if df_mascotas.empty or not {'Latitud', 'Longitud', 'periodo'} <= set(df_mascotas.columns):
+            return cls(vacio, vacio, vacio, vacio, tamaño, 0.0)
+
+        lat = df_mascotas['Latitud'].to_numpy(dtype=float)
+        lon = df_mascotas['Longitud'].to_numpy(dtype=float)
+        validos = ~(np.isnan(lat) | np.isnan(lon))
+        lat, lon = lat[validos], lon[validos]
+        periodos = df_mascotas['periodo'].to_numpy(dtype=np.int64)[validos]
+        if not len(lat):
+            return cls(vacio, vacio, vacio, vacio, tamaño, 0.0)
+
+        lat0 = float(np.mean(lat))
+        q, r = _hexagono(lon * np.cos(np.radians(lat0)), lat, tamaño)
+
+        # Conteo por (periodo, q, r) en una sola pasada
+        claves, cantidades = np.unique(np.column_stack([periodos, q, r]), axis=0, return_counts=True)
+        return cls(claves[:, 0], claves[:, 1], claves[:, 2], cantidades, tamaño, lat0)
+
+    def celdas(self, año="Todos", mes="Todos") -> pd.DataFrame:
+        """
+        Rescates por celda en los periodos del filtro.
+
+        Args:
+            año: Año seleccionado o "Todos"
+            mes (str): Mes seleccionado ("3 - Marzo") o "Todos"
+
+        Returns:
+            pd.DataFrame: Columnas q, r y count
+        """
+        mascara = np.ones(len(self.periodos), dtype=bool)
+        if año != "Todos":
+            mascara &= self.periodos // 100 == int(año)
+        if mes != "Todos":
+            mascara &= self.periodos % 100 == int(mes.split(" - ")[0])
+        return (
+            pd.DataFrame({'q': self.q[mascara], 'r': self.r[mascara], 'count': self.cantidades[mascara]})
+            .groupby(['q', 'r'], sort=False, as_index=False)['count']
+            .sum()
+        )
+
+    def coleccion(self, celdas: pd.DataFrame) -> dict:
+        """
+        FeatureCollection GeoJSON con un hexágono por celda.
+
+        Args:
+            celdas (pd.DataFrame): Salida de celdas()
+
+        Returns:
+            dict: FeatureCollection; cada polígono lleva count y color
+        """
+        if celdas.empty:
+            return {"type": "FeatureCollection", "features": []}
+
+        q = celdas['q'].to_numpy(dtype=float)
+        r = celdas['r'].to_numpy(dtype=float)
+        cantidades = celdas['count'].to_numpy()
+        escala_lon = np.cos(np.radians(self.lat0))
+
+        # Centros y los seis vértices de todos los hexágonos a la vez (hexágonos con punta arriba)
+        cx = self.tamaño * np.sqrt(3) * (q + r / 2)
+        cy = self.tamaño * 1.5 * r
+        angulos = np.radians(30 + 60 * np.arange(7))
+        vertices_lon = (cx[:, None] + self.tamaño * np.cos(angulos)) / escala_lon
+        vertices_lat = cy[:, None] + self.tamaño * np.sin(angulos)
+
+        # Color por tramo relativo al máximo
+        tramos = np.ceil(cantidades / cantidades.max() * len(ESCALA_DENSIDAD)).astype(int) - 1
+        features = [
+            {
+                "type": "Feature",
+                "id": str(i),
+                "geometry": {"type": "Polygon", "coordinates": [np.column_stack([lons, lats]).round(6).tolist()]},
+                "properties": {"count": int(cantidad), "color": ESCALA_DENSIDAD[tramo]},
+            }
+            for i, (lons, lats, cantidad, tramo) in enumerate(zip(vertices_lon, vertices_lat, cantidades, tramos))
+        ]
+        return {"type": "FeatureCollection", "features": features}
+
+
+def _hexagono(x: np.ndarray, y: np.ndarray, tamaño: float) -> tuple:
+    """
+    Celda hexagonal (coordenadas axiales q, r) de cada punto proyectado.
+
+    Args:
+        x (np.ndarray): Coordenada horizontal proyectada
+        y (np.ndarray): Coordenada vertical
+        tamaño (float): Lado del hexágono en las mismas unidades
+
+    Returns:
+        tuple: (q, r) como np.ndarray int64
+    """
+    q = (np.sqrt(3) / 3 * x - y / 3) / tamaño
+    r = (2 / 3 * y) / tamaño
+    s = -q - r
+
+    # Redondeo cúbico: se corrige la coordenada con mayor error de redondeo
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    corregir_q = (dq > dr) & (dq > ds)
+    corregir_r = ~corregir_q & (dr > ds)
+    rq = np.where(corregir_q, -rr - rs, rq)
+    rr = np.where(corregir_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
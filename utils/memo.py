@@ -0,0 +1,99 @@
+# En utils/memo.py
+"""
+Cache LRU acotado y compartido entre sesiones para resultados derivados de
+los datos (vistas filtradas y sus agregados).
+
+Cada entrada se guarda junto a la versión de los datos con la que se
+calculó; cuando el refresco publica una versión nueva, las entradas viejas
+se descartan en el siguiente acceso.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from utils.concurrencia import SingleFlight
+
+# Combinaciones de filtros recordadas
+VISTAS_CACHE_MAX = int(os.getenv("VISTAS_CACHE_MAX", "16"))
+
+
+def clave_filtros(filtros: dict) -> str:
+    """
+    Hash canónico de un diccionario de filtros (independiente del orden de
+    las claves y del tipo exacto de los valores, p. ej. int vs np.int16).
+
+    Args:
+        filtros (dict): Filtros aplicados
+
+    Returns:
+        str: Hash hexadecimal
+    """
+    texto = json.dumps(
+        {str(clave): str(valor) for clave, valor in filtros.items()},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+class CacheLRU:
+    """
+    Cache LRU con límite de entradas, seguro entre hilos.
+
+    Args:
+        max_entradas (int): Entradas máximas antes de descartar la menos usada
+    """
+
+    def __init__(self, max_entradas: int = VISTAS_CACHE_MAX):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._en_vuelo = SingleFlight()
+
+    def obtener(self, version: str, clave: str, calcular):
+        """
+        Devuelve el valor en cache para (version, clave) o lo calcula.
+
+        Args:
+            version (str): Versión de los datos
+            clave (str): Clave del resultado (p. ej. clave_filtros(filtros))
+            calcular (callable): Función sin argumentos que produce el valor
+
+        Returns:
+            El valor guardado o recién calculado (solo lectura)
+        """
+        with self._lock:
+            if version != self._version:
+                # Datos nuevos: lo calculado con la versión anterior ya no sirve
+                self._entradas.clear()
+                self._version = version
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                return self._entradas[clave]
+
+        # Se calcula fuera del lock; sesiones con la misma selección comparten el cálculo
+        valor = self._en_vuelo.ejecutar((version, clave), calcular)
+
+        with self._lock:
+            if version == self._version:
+                self._entradas[clave] = valor
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+        return valor
+
+
+@st.cache_resource
+def obtener_cache_vistas() -> CacheLRU:
+    """
+    Devuelve el cache de vistas filtradas del proceso.
+
+    Returns:
+        CacheLRU: Cache compartido por todas las sesiones
+    """
+    return CacheLRU()
@@ -0,0 +1,86 @@
+# En utils/periodos.py
+"""
+Dimensión de períodos (meses) con etiquetas en español.
+
+Los nombres de los meses salen de una tabla fija, sin depender del locale
+del servidor, y las etiquetas "Ene 2024" se arman una vez por periodo
+distinto (aaaamm), no una vez por fila: la columna ``periodo_etiqueta`` que
+se agrega al cargar los datos es categórica, y las tablas y gráficos
+agrupan por ella junto con periodo en lugar de formatear fechas al mostrar.
+"""
+import numpy as np
+import pandas as pd
+
+MESES = (
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+)
+MESES_CORTOS = tuple(mes[:3] for mes in MESES)
+
+
+def nombre_mes(mes, corto: bool = False):
+    """
+    Nombre en español de uno o varios meses.
+
+    Args:
+        mes (int, pd.Series o np.ndarray): Número de mes (1-12)
+        corto (bool): Abreviatura de tres letras en vez del nombre completo
+
+    Returns:
+        str, o pd.Series/np.ndarray de textos del mismo largo
+    """
+    nombres = np.array(MESES_CORTOS if corto else MESES, dtype=object)
+    if isinstance(mes, pd.Series):
+        return pd.Series(nombres[mes.to_numpy(dtype=int) - 1], index=mes.index, name=mes.name)
+    if np.ndim(mes):
+        return nombres[np.asarray(mes, dtype=int) - 1]
+    return nombres[int(mes) - 1]
+
+
+def opciones_meses() -> list:
+    """Opciones del selector de mes: "Todos" y "1 - Enero" ... "12 - Diciembre"."""
+    return ["Todos"] + [f"{i} - {MESES[i - 1]}" for i in range(1, 13)]
+
+
+def tabla_periodos(periodos) -> pd.DataFrame:
+    """
+    Tabla de la dimensión período para los periodos dados.
+
+    Args:
+        periodos (array-like): Periodos aaaamm (pueden repetirse)
+
+    Returns:
+        pd.DataFrame: Índice periodo (ascendente, sin repetir) y columnas
+            año, mes, fecha (primer día del mes), nombre_mes,
+            etiqueta_corta ("Ene 2024") y etiqueta ("Enero 2024")
+    """
+    unicos = np.unique(np.asarray(periodos, dtype=np.int32))
+    años, meses = unicos // 100, unicos % 100
+    años_texto = años.astype(str).astype(object)
+    return pd.DataFrame({
+        "año": años.astype("int16"),
+        "mes": meses.astype("int8"),
+        "fecha": pd.to_datetime({"year": años, "month": meses, "day": 1}).to_numpy(),
+        "nombre_mes": nombre_mes(meses),
+        "etiqueta_corta": nombre_mes(meses, corto=True) + " " + años_texto,
+        "etiqueta": nombre_mes(meses) + " " + años_texto,
+    }, index=pd.Index(unicos, name="periodo"))
+
+
+def etiquetas_periodo(periodos: pd.Series) -> pd.Series:
+    """
+    Columna categórica con la etiqueta corta de cada periodo.
+
+    Args:
+        periodos (pd.Series): Columna periodo (aaaamm)
+
+    Returns:
+        pd.Series: Categórica "Ene 2024", categorías en orden cronológico
+    """
+    unicos, codigos = np.unique(periodos.to_numpy(dtype=np.int32), return_inverse=True)
+    etiquetas = tabla_periodos(unicos)["etiqueta_corta"]
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=pd.Index(etiquetas.to_numpy())),
+        index=periodos.index,
+        name="periodo_etiqueta",
+    )
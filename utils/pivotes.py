@@ -0,0 +1,68 @@
+# En utils/pivotes.py
+"""
+Tablas cruzadas de los N valores principales de una categoría.
+
+En lugar de cruzar todas las filas contra todas las columnas y después
+quedarse con las N primeras, primero se eligen las N categorías con mayor
+total (con np.bincount sobre los códigos enteros de la columna) y solo esas
+filas se acumulan en una matriz N x columnas. El costo queda dominado por
+una pasada sobre los registros, sin índices de texto intermedios.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _codigos(serie: pd.Series) -> tuple:
+    """Códigos enteros y etiquetas de una columna (categórica o no)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    codigos, etiquetas = pd.factorize(serie, sort=True)
+    return codigos, etiquetas
+
+
+def pivote_top(df: pd.DataFrame, filas: str, columnas: str, valores: str = "Monto",
+               n: int = 10) -> pd.DataFrame:
+    """
+    Suma de valores por filas x columnas, solo para las N filas con mayor total.
+
+    Args:
+        df (pd.DataFrame): Registros a cruzar
+        filas (str): Columna cuyas N categorías principales forman las filas
+        columnas (str): Columna que forma las columnas
+        valores (str): Columna numérica a sumar
+        n (int): Cantidad de filas a conservar
+
+    Returns:
+        pd.DataFrame: Matriz con índice = top N de filas (de mayor a menor
+            total) y columnas = categorías de columnas presentes en df
+    """
+    codigos_fila, etiquetas_fila = _codigos(df[filas])
+    codigos_col, etiquetas_col = _codigos(df[columnas])
+    montos = df[valores].to_numpy(dtype=float)
+
+    # Registros con ambas categorías (código -1 = faltante)
+    validos = (codigos_fila >= 0) & (codigos_col >= 0)
+    codigos_fila, codigos_col, montos = codigos_fila[validos], codigos_col[validos], montos[validos]
+
+    # Top N por total, solo entre las categorías que aparecen
+    totales = np.bincount(codigos_fila, weights=montos, minlength=len(etiquetas_fila))
+    presentes = np.flatnonzero(np.bincount(codigos_fila, minlength=len(etiquetas_fila)))
+    top = presentes[np.argsort(-totales[presentes], kind="stable")[:n]]
+
+    # Posición en la matriz de cada categoría de fila (-1 = fuera del top)
+    rango = np.full(len(etiquetas_fila), -1)
+    rango[top] = np.arange(len(top))
+    en_top = rango[codigos_fila] >= 0
+
+    # Columnas: las categorías que aparecen en los registros
+    cols = np.flatnonzero(np.bincount(codigos_col, minlength=len(etiquetas_col)))
+    posicion_col = np.full(len(etiquetas_col), -1)
+    posicion_col[cols] = np.arange(len(cols))
+
+    matriz = np.zeros((len(top), len(cols)))
+    np.add.at(matriz, (rango[codigos_fila[en_top]], posicion_col[codigos_col[en_top]]), montos[en_top])
+    return pd.DataFrame(
+        matriz,
+        index=pd.Index(np.asarray(etiquetas_fila)[top], name=filas),
+        columns=pd.Index(np.asarray(etiquetas_col)[cols], name=columnas),
+    )
@@ -0,0 +1,116 @@
+# En utils/refresco.py
+"""
+Conjunto de datos compartido por todas las sesiones y su refresco periódico.
+
+Un hilo en segundo plano sincroniza las hojas cada cierto intervalo, arma los
+DataFrames nuevos fuera del camino de las visitas y los publica reemplazando
+una única referencia. Las sesiones siempre leen un conjunto completo y listo.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import streamlit as st
+
+from utils.data_loader import HOJAS_DASHBOARD, cargar_hojas, sincronizar_hojas
+from utils.snapshot import SNAPSHOT_TTL
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre sincronizaciones en segundo plano
+REFRESCO_INTERVALO = int(os.getenv("REFRESCO_INTERVALO", str(SNAPSHOT_TTL)))
+
+
+@dataclass(frozen=True)
+class ConjuntoDatos:
+    """
+    Instantánea inmutable de todas las hojas del dashboard.
+
+    Los DataFrames se comparten entre sesiones: se leen, nunca se modifican.
+    """
+    hojas: dict
+    versiones: dict
+    actualizado: float
+
+    @property
+    def version(self) -> str:
+        """Versión combinada de todas las hojas."""
+        return "|".join(f"{nombre}:{self.versiones[nombre]}" for nombre in sorted(self.versiones))
+
+
+class RefrescadorDatos:
+    """
+    Mantiene el ConjuntoDatos vigente y lo renueva en un hilo propio.
+
+    Args:
+        sheet_names (tuple): Hojas a mantener
+        intervalo (int): Segundos entre sincronizaciones
+    """
+
+    def __init__(self, sheet_names=HOJAS_DASHBOARD, intervalo=REFRESCO_INTERVALO):
+        self.sheet_names = tuple(sheet_names)
+        self.intervalo = intervalo
+        self._datos = None
+        self._despertar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """
+        Publica los datos iniciales (snapshots o descarga) y arranca el hilo.
+        """
+        hojas, versiones, vencidas = cargar_hojas(self.sheet_names)
+        self._publicar(hojas, versiones)
+        if vencidas:
+            # Revalidar enseguida sin esperar el primer intervalo
+            self._despertar.set()
+        self._hilo = threading.Thread(target=self._bucle, name="refresco-datos", daemon=True)
+        self._hilo.start()
+
+    def datos(self) -> ConjuntoDatos:
+        """Devuelve el conjunto vigente (nunca bloquea por la red)."""
+        return self._datos
+
+    def refrescar_ahora(self):
+        """Adelanta la próxima sincronización."""
+        self._despertar.set()
+
+    def _publicar(self, hojas, versiones):
+        # Reemplazo atómico de la referencia: los lectores ven el conjunto
+        # anterior completo o el nuevo completo, nunca una mezcla
+        self._datos = ConjuntoDatos(hojas=hojas, versiones=versiones, actualizado=time.time())
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                hojas, versiones = sincronizar_hojas(self.sheet_names)
+                if versiones != self._datos.versiones:
+                    self._publicar(hojas, versiones)
+            except Exception as e:
+                logger.warning("Error al refrescar los datos: %s", e)
+
+
+@st.cache_resource
+def obtener_refrescador() -> RefrescadorDatos:
+    """
+    Devuelve el refrescador único del proceso, iniciándolo la primera vez.
+
+    Returns:
+        RefrescadorDatos: Refrescador compartido por todas las sesiones
+    """
+    refrescador = RefrescadorDatos()
+    refrescador.iniciar()
+    return refrescador
+
+
+def obtener_datos() -> ConjuntoDatos:
+    """
+    Devuelve el conjunto de datos vigente.
+
+    Returns:
+        ConjuntoDatos: Hojas limpias y sus versiones
+    """
+    return obtener_refrescador().datos()
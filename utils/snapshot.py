@@ -0,0 +1,109 @@
+# En utils/snapshot.py
+"""
+Snapshots en disco (Parquet) de las hojas ya limpias.
+
+Cada hoja se guarda en un archivo Parquet con sus metadatos (fecha de
+escritura y datos de sincronización) dentro del esquema del propio archivo,
+de modo que un reinicio del contenedor pueda servir los datos desde disco
+sin esperar a Google Sheets.
+"""
+import json
+import logging
+import os
+import re
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Configuración por variables de entorno
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", ".snapshots")
+SNAPSHOT_TTL = int(os.getenv("SNAPSHOT_TTL", "600"))  # segundos
+
+_CLAVE_METADATOS = b"rescataditos_snapshot"
+
+
+def _ruta_snapshot(sheet_name: str) -> str:
+    """
+    Ruta del archivo Parquet de una hoja.
+
+    Args:
+        sheet_name (str): Nombre de la hoja
+
+    Returns:
+        str: Ruta del snapshot
+    """
+    nombre = re.sub(r"[^0-9a-z]+", "_", sheet_name.lower()).strip("_")
+    return os.path.join(SNAPSHOT_DIR, f"{nombre}.parquet")
+
+
+def guardar_snapshot(sheet_name: str, df: pd.DataFrame, metadatos: dict = None) -> bool:
+    """
+    Escribe el snapshot de una hoja de forma atómica.
+
+    Args:
+        sheet_name (str): Nombre de la hoja
+        df (pd.DataFrame): DataFrame limpio
+        metadatos (dict, opcional): Datos extra a guardar junto al snapshot
+
+    Returns:
+        bool: True si se pudo escribir
+    """
+    meta = dict(metadatos or {})
+    meta["timestamp"] = time.time()
+
+    ruta = _ruta_snapshot(sheet_name)
+    temporal = f"{ruta}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        esquema = dict(tabla.schema.metadata or {})
+        esquema[_CLAVE_METADATOS] = json.dumps(meta).encode("utf-8")
+        pq.write_table(tabla.replace_schema_metadata(esquema), temporal)
+        # Reemplazo atómico: los lectores ven el archivo viejo o el nuevo
+        os.replace(temporal, ruta)
+        return True
+    except Exception as e:
+        logger.warning("No se pudo guardar el snapshot de %s: %s", sheet_name, e)
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+
+
+def leer_snapshot(sheet_name: str):
+    """
+    Lee el snapshot de una hoja si existe.
+
+    Args:
+        sheet_name (str): Nombre de la hoja
+
+    Returns:
+        tuple: (DataFrame, metadatos) o None si no hay snapshot válido
+    """
+    ruta = _ruta_snapshot(sheet_name)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        tabla = pq.read_table(ruta)
+        meta = json.loads((tabla.schema.metadata or {}).get(_CLAVE_METADATOS, b"{}"))
+        return tabla.to_pandas(), meta
+    except Exception as e:
+        logger.warning("Snapshot ilegible para %s: %s", sheet_name, e)
+        return None
+
+
+def snapshot_vigente(metadatos: dict, ttl: int = SNAPSHOT_TTL) -> bool:
+    """
+    Indica si un snapshot todavía está dentro de su TTL.
+
+    Args:
+        metadatos (dict): Metadatos devueltos por leer_snapshot
+        ttl (int, opcional): Segundos de validez
+
+    Returns:
+        bool: True si el snapshot no venció
+    """
+    return time.time() - metadatos.get("timestamp", 0) < ttl
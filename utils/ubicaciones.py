@@ -0,0 +1,102 @@
+# En utils/ubicaciones.py
+"""
+Nomenclador de barrios: traduce el texto libre de "Ubicacion" a coordenadas.
+
+La lista de lugares se lee de un CSV (nombre, latitud, longitud), por defecto
+utils/datos/barrios.csv. Todos los nombres se compilan en una sola expresión
+regular (alternativa ordenada de más largo a más corto, sin distinguir
+mayúsculas), y cada valor distinto de Ubicacion se resuelve una sola vez.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+BARRIOS_ARCHIVO = os.getenv(
+    "BARRIOS_ARCHIVO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "barrios.csv"),
+)
+
+# Coordenadas por defecto (Capital)
+COORDENADAS_DEFECTO = (-34.6037, -58.3816)
+
+
+class Nomenclador:
+    """
+    Busca nombres de lugares dentro de un texto y devuelve sus coordenadas.
+
+    Se usa la primera coincidencia dentro del texto; si en la misma posición
+    coinciden varios nombres ("CABA" y "CABALLITO"), gana el más largo.
+
+    Args:
+        lugares (pd.DataFrame): Columnas nombre, latitud y longitud
+        defecto (tuple): Coordenadas para textos sin coincidencia
+    """
+
+    def __init__(self, lugares: pd.DataFrame, defecto=COORDENADAS_DEFECTO):
+        lugares = lugares.dropna(subset=["nombre"])
+        nombres = lugares["nombre"].astype(str).str.strip()
+        claves = nombres.str.casefold()
+        lugares = lugares.assign(clave=claves).drop_duplicates("clave", keep="first")
+
+        self._indices = {clave: i for i, clave in enumerate(lugares["clave"])}
+        # Última posición: coordenadas por defecto
+        self._latitudes = np.append(lugares["latitud"].to_numpy(dtype=float), defecto[0])
+        self._longitudes = np.append(lugares["longitud"].to_numpy(dtype=float), defecto[1])
+
+        alternativas = sorted(self._indices, key=len, reverse=True)
+        self._patron = re.compile(
+            "|".join(re.escape(clave) for clave in alternativas) or r"(?!)",
+            re.IGNORECASE,
+        )
+
+    @classmethod
+    def desde_archivo(cls, ruta: str = BARRIOS_ARCHIVO) -> "Nomenclador":
+        """
+        Crea el nomenclador a partir de un CSV con columnas nombre, latitud y longitud.
+
+        Args:
+            ruta (str): Ruta del archivo
+
+        Returns:
+            Nomenclador: Nomenclador listo para usar
+        """
+        return cls(pd.read_csv(ruta, encoding="utf-8"))
+
+    def _indice(self, texto: str) -> int:
+        coincidencia = self._patron.search(texto)
+        if coincidencia is None:
+            return len(self._latitudes) - 1
+        return self._indices[coincidencia.group(0).casefold()]
+
+    def coordenadas(self, ubicaciones: pd.Series) -> tuple:
+        """
+        Resuelve las coordenadas de una columna de ubicaciones.
+
+        Args:
+            ubicaciones (pd.Series): Textos de ubicación (admite nulos)
+
+        Returns:
+            tuple: (latitudes, longitudes) como pd.Series con el mismo índice
+        """
+        codigos, unicos = pd.factorize(ubicaciones)
+        # Los nulos quedan con código -1, que apunta a las coordenadas por defecto
+        indices = np.array([self._indice(str(valor)) for valor in unicos] + [len(self._latitudes) - 1],
+                           dtype=np.intp)[codigos]
+        return (
+            pd.Series(self._latitudes[indices], index=ubicaciones.index, name="Latitud"),
+            pd.Series(self._longitudes[indices], index=ubicaciones.index, name="Longitud"),
+        )
+
+
+@st.cache_resource
+def obtener_nomenclador() -> Nomenclador:
+    """
+    Carga el nomenclador de BARRIOS_ARCHIVO una vez por proceso.
+
+    Returns:
+        Nomenclador: Nomenclador compartido
+    """
+    return Nomenclador.desde_archivo()